@@ -2,7 +2,16 @@ __version__ = "0.3.0"
 
 from kis import calc, domestic, overseas, snapshot
 from kis.async_client import AsyncKIS
-from kis.auth import Env, get_token, get_token_async, get_ws_key, get_ws_key_async
+from kis.auth import (
+    Env,
+    FileTokenStore,
+    get_token,
+    get_token_async,
+    get_ws_key,
+    get_ws_key_async,
+    set_token_store,
+)
+from kis.cache import Cache
 from kis.client import KIS
 from kis.errors import (
     AccessDeniedError,
@@ -20,13 +29,20 @@ from kis.errors import (
     TokenExpiredError,
     WebSocketError,
 )
-from kis.types import Exchange
+from kis.metrics import Metrics
+from kis.pool import KISPool
+from kis.resilience import RetryBudget, RetryPolicy, SharedLimiter
+from kis.transport import PoolConfig
+from kis.types import Exchange, Orderbook, OverseasQuote, Quote
 from kis.ws import WSClient
 
 __all__ = [
     # Core
-    "KIS", "AsyncKIS", "Env", "Exchange",
+    "KIS", "AsyncKIS", "KISPool", "Env", "Exchange", "PoolConfig", "SharedLimiter", "Cache",
+    "RetryPolicy", "RetryBudget", "Metrics",
     "get_token", "get_token_async", "get_ws_key", "get_ws_key_async",
+    "FileTokenStore", "set_token_store",
+    "Quote", "Orderbook", "OverseasQuote",
     "WSClient",
     # Modules
     "domestic", "overseas", "calc", "snapshot",
@@ -1,20 +1,112 @@
 import asyncio
-from collections import deque
+import heapq
+import itertools
 from time import time
 
 import httpx
 
-from kis.auth import Env, _base_url, get_token_async
-from kis.client import _parse_response, _split_account
-from kis.errors import CircuitBreakerError, NetworkError, RateLimitError
-from kis.resilience import CB_OPEN, cb_on_failure, cb_state, throttle_wait
+from kis import transport
+from kis.auth import Env, get_token_async, invalidate_token
+from kis.cache import Cache
+from kis.client import (
+    _auth_headers,
+    _check_response,
+    _flight_key,
+    _parse_response,
+    _refresh_delay,
+    _settle,
+    _split_account,
+)
+from kis.errors import CircuitBreakerError, NetworkError, RateLimitError, TokenExpiredError
+from kis.metrics import Metrics
+from kis.resilience import (
+    CB_NAMES,
+    AdaptiveBucket,
+    CircuitBreaker,
+    LatencyWindow,
+    RetryPolicy,
+    SharedLimiter,
+    TokenBucket,
+    backoff,
+    endpoint_group,
+    order_buckets,
+    tr_kind,
+)
+from kis.transport import PoolConfig
+
+PRIORITY = {"order": 0, "account": 1, "quote": 2}
+
+
+class _Scheduler:
+    """Grants throttle slots by priority (order > account > quote), FIFO within a class.
+
+    Uncontended requests take the fast path; otherwise one dispatcher task hands out slots
+    as they free up, re-checking the queue head whenever a new request arrives.
+    """
+
+    __slots__ = ("stale_after", "_heap", "_seq", "_wakeup", "_task")
+
+    def __init__(self, stale_after: float | None = None):
+        self.stale_after = stale_after
+        self._heap: list = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def ready(self, limiters: tuple) -> bool:
+        """True if a slot would be granted right now (nobody queued, every limiter free)."""
+        return not self._heap and all(lim.delay(time()) <= 0 for lim in limiters)
+
+    async def acquire(self, kind: str, limiters: tuple) -> None:
+        if self.ready(limiters):
+            await self._take(limiters)
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (PRIORITY[kind], next(self._seq), time(), fut, limiters))
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._dispatch())
+        await fut
+
+    async def _dispatch(self) -> None:
+        self._wakeup = asyncio.Event()  # 현재 루프에 바인딩
+        while self._heap:
+            prio, _, queued, fut, limiters = self._heap[0]
+            now = time()
+            if fut.done():  # 호출자가 취소함
+                heapq.heappop(self._heap)
+                continue
+            if prio == PRIORITY["quote"] and self.stale_after and now - queued > self.stale_after:
+                heapq.heappop(self._heap)
+                fut.set_exception(RateLimitError("STALE", "시세 요청이 throttle 대기 중 만료됨"))
+                continue
+            if (delay := max(lim.delay(now) for lim in limiters)) > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._heap)
+            await self._take(limiters)
+            if not fut.done():
+                fut.set_result(None)
+
+    @staticmethod
+    async def _take(limiters: tuple) -> None:
+        # delay() 확인 뒤 다른 프로세스가 SharedLimiter 슬롯을 가져갔으면 예약된 시각까지 대기
+        if (wait := max(lim.wait(time()) for lim in limiters)) > 0:
+            await asyncio.sleep(wait)
 
 
 class AsyncKIS:
     __slots__ = (
         "app_key", "app_secret", "account", "env", "max_retries", "retry_delay",
-        "throttle_rate", "cb_threshold", "cb_recovery_time",
-        "_client", "_throttle_ts", "_cb_failures", "_cb_open_until",
+        "throttle_rate", "cb_threshold", "cb_recovery_time", "pool", "limiter",
+        "throttle_burst", "order_reserve", "stale_after", "coalesce", "cache",
+        "_client", "_bucket", "_buckets", "_scheduler", "_breakers",
+        "_inflight", "_auth", "token_refresh", "_refresher", "retry", "_latency", "adaptive",
+        "metrics", "__weakref__",
     )
 
     def __init__(
@@ -28,15 +120,42 @@ class AsyncKIS:
         throttle_rate: int = 20,
         cb_threshold: int = 5,
         cb_recovery_time: float = 30.0,
+        pool: PoolConfig | None = None,
+        limiter: SharedLimiter | None = None,
+        throttle_burst: int | None = None,
+        order_reserve: int = 0,
+        stale_after: float | None = None,
+        coalesce: bool = False,
+        cache: Cache | None = None,
+        token_refresh: float | None = None,
+        retry: RetryPolicy | None = None,
+        adaptive: bool = False,
+        metrics: Metrics | None = None,
     ):
+        if adaptive and limiter is not None:  # 공유 리미터의 rate는 프로세스별로 조정할 수 없음
+            raise ValueError("adaptive=True cannot be combined with a shared limiter")
         self.app_key, self.app_secret, self.account = app_key, app_secret, account
         self.env, self.max_retries, self.retry_delay = env, max_retries, retry_delay
         self.throttle_rate, self.cb_threshold, self.cb_recovery_time = (
             throttle_rate, cb_threshold, cb_recovery_time
         )
-        self._client = httpx.AsyncClient(base_url=_base_url(env), timeout=10.0)
-        self._throttle_ts: deque = deque()
-        self._cb_failures, self._cb_open_until = 0, 0.0
+        self.pool, self.limiter = pool or PoolConfig(), limiter
+        self.throttle_burst, self.order_reserve = throttle_burst, order_reserve
+        self._client = transport.acquire(self, env, self.pool, is_async=True)
+        self.adaptive = adaptive
+        self._bucket = (AdaptiveBucket if adaptive else TokenBucket)(throttle_rate, throttle_burst)
+        self._buckets = order_buckets(throttle_rate, throttle_burst, order_reserve, limiter)
+        self.stale_after, self._scheduler = stale_after, _Scheduler(stale_after)
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._auth: tuple[float, dict, dict] = (0.0, {}, {})
+        self.coalesce, self.cache = coalesce, cache
+        self._inflight: dict[tuple, asyncio.Future] = {}
+        self.token_refresh = token_refresh
+        self._refresher: asyncio.Task | None = None
+        self.retry, self._latency = retry or RetryPolicy(), LatencyWindow()
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.bind(self)
 
     @property
     def is_paper(self) -> bool:
@@ -50,56 +169,213 @@ class AsyncKIS:
         return AsyncKIS(
             self.app_key, self.app_secret, self.account, env,
             self.max_retries, self.retry_delay,
-            self.throttle_rate, self.cb_threshold, self.cb_recovery_time,
+            self.throttle_rate, self.cb_threshold, self.cb_recovery_time, self.pool,
+            self.limiter and self.limiter.switch(env), self.throttle_burst, self.order_reserve,
+            self.stale_after, self.coalesce, self.cache, self.token_refresh, self.retry,
+            self.adaptive, self.metrics,
         )
 
+    def _limiters(self, tr_id: str) -> tuple:
+        main = self.limiter or self._bucket
+        return (kind, main) if (kind := self._buckets.get(tr_kind(tr_id))) else (main,)
+
     async def _headers(self, tr_id: str) -> dict:
-        return {
-            "authorization": f"Bearer {await get_token_async(self.app_key, self.app_secret, self.env)}",
-            "appkey": self.app_key,
-            "appsecret": self.app_secret,
-            "tr_id": tr_id,
-            "content-type": "application/json; charset=utf-8",
-        }
+        until, base, by_tr = self._auth
+        if time() >= until:
+            token = await get_token_async(self.app_key, self.app_secret, self.env)
+            until, base, by_tr = self._auth = _auth_headers(self, token)
+        if (headers := by_tr.get(tr_id)) is None:
+            headers = by_tr[tr_id] = {**base, "tr_id": tr_id}
+        return headers
+
+    async def _refresh_loop(self) -> None:
+        """Renew the token token_refresh seconds before expiry so no request pays for issuance."""
+        ahead, failed = self.token_refresh or 0.0, False
+        while True:
+            await asyncio.sleep(_refresh_delay(self, ahead, failed))
+            try:
+                token = await get_token_async(self.app_key, self.app_secret, self.env, ahead)
+            except Exception:  # 1분 뒤 재시도 (그 사이 요청은 기존 토큰 사용)
+                failed = True
+                continue
+            failed = False
+            if self._auth[1].get("authorization") != f"Bearer {token}":
+                self._auth = (0.0, {}, {})
+
+    def _expire_token(self) -> None:
+        invalidate_token(self.app_key, self.env, self._auth[1].get("authorization", "")[7:])
+        self._auth = (0.0, {}, {})
 
     async def _request(self, method: str, path: str, tr_id: str, **kwargs) -> dict:
+        if self.token_refresh is not None and self._refresher is None:
+            self._refresher = asyncio.create_task(self._refresh_loop())
+        try:
+            try:
+                return await self._send(method, path, tr_id, **kwargs)
+            except TokenExpiredError:  # EGW00123: 재발급 후 한 번만 재시도
+                self._expire_token()
+                if self.metrics is not None:
+                    self.metrics.retried("token", 0.0)
+                return await self._send(method, path, tr_id, **kwargs)
+        except Exception as e:
+            if self.metrics is not None:
+                self.metrics.error(e)
+            raise
+
+    def _breaker(self, group: str) -> CircuitBreaker:
+        if (breaker := self._breakers.get(group)) is None:
+            breaker = self._breakers.setdefault(
+                group, CircuitBreaker(self.cb_threshold, self.cb_recovery_time)
+            )
+        return breaker
+
+    def circuit_states(self) -> dict[str, str]:
+        """State of each endpoint group's breaker seen so far: 'closed', 'open' or 'half_open'."""
+        now = time()
+        return {group: CB_NAMES[b.state(now)] for group, b in self._breakers.items()}
+
+    def _may_retry(self, attempt: int) -> bool:
+        budget = self.retry.budget
+        return attempt < self.max_retries and (budget is None or budget.withdraw(time()))
+
+    async def _send(
+        self, method: str, path: str, tr_id: str, page: str | None = None,
+        granted: asyncio.Event | None = None, **kwargs,
+    ):
+        if self.retry.budget is not None:
+            self.retry.budget.deposit()
+        group, m = endpoint_group(path, tr_id), self.metrics
+        breaker = self._breaker(group)
         for attempt in range(self.max_retries + 1):
-            now = time()
-            if cb_state(self._cb_failures, self.cb_threshold, self._cb_open_until, now) == CB_OPEN:
-                raise CircuitBreakerError("CB_OPEN", "Circuit breaker is open")
-            if (wait := throttle_wait(self._throttle_ts, self.throttle_rate, now)) > 0:
-                await asyncio.sleep(wait)
+            if not breaker.allow(time()):
+                raise CircuitBreakerError("CB_OPEN", f"Circuit breaker is open: {group}")
+            queued = time()
+            await self._scheduler.acquire(tr_kind(tr_id), self._limiters(tr_id))
+            if granted is not None:  # hedge 대기는 슬롯을 받은 뒤부터
+                granted.set()
+            if m is not None and (waited := time() - queued) > 0.001:  # 빠른 경로(대기 없음)는 제외
+                m.throttled(waited)
             try:
-                resp = await getattr(self._client, method)(
-                    path, headers=await self._headers(tr_id), **kwargs
-                )
+                headers = await self._headers(tr_id)
+                if page is not None:  # 연속조회: (전체 본문, 응답 tr_cont) 반환
+                    headers = {**headers, "tr_cont": page}
+                start = time()  # 토큰 발급 시간은 왕복 지연에서 제외
+                resp = await getattr(self._client, method)(path, headers=headers, **kwargs)
             except (httpx.ConnectError, httpx.TimeoutException) as e:
-                self._cb_failures, self._cb_open_until = cb_on_failure(
-                    self._cb_failures, self.cb_threshold, self.cb_recovery_time, time()
-                )
-                if attempt == self.max_retries:
+                breaker.on_failure(time())
+                if not self._may_retry(attempt):
                     raise NetworkError("NETWORK", str(e)) from e
-                await asyncio.sleep(self.retry_delay * (2 ** attempt))
-                continue
-            if resp.status_code == 429:
-                if attempt == self.max_retries:
-                    raise RateLimitError("429", "API 호출 한도 초과")
-                await asyncio.sleep(
-                    float(resp.headers.get("Retry-After", self.retry_delay * (2 ** attempt)))
-                )
+                delay = backoff(self.retry_delay, attempt, self.retry.jitter)
+                if m is not None:
+                    m.retried("network", delay)
+                await asyncio.sleep(delay)
                 continue
-            self._cb_failures = 0
-            return _parse_response(resp)
+            if m is not None:
+                m.observe(tr_id, time() - start)
+            _settle(breaker, resp, time())
+            err = None
+            if resp.status_code != 429:
+                try:
+                    if page is None:
+                        result: dict | tuple[dict, str] = _parse_response(resp)
+                    else:
+                        result = _check_response(resp), resp.headers.get("tr_cont", "")
+                except RateLimitError as e:  # EGW00201(초당 거래건수 초과)도 429처럼 감속 후 재시도
+                    err = e
+                else:
+                    if self.retry.hedge is not None:
+                        self._latency.add(time() - start)
+                    if self.adaptive:
+                        self._bucket.on_success(time())
+                    return result
+            if self.adaptive:
+                self._bucket.on_overload(time())
+            if not self._may_retry(attempt):
+                raise err or RateLimitError("429", "API 호출 한도 초과")
+            retry_after = resp.headers.get("Retry-After")
+            delay = float(retry_after or backoff(self.retry_delay, attempt, self.retry.jitter))
+            if m is not None:
+                m.retried(err.code if err else "429", delay)
+            await asyncio.sleep(delay)
         raise RateLimitError("429", "API 호출 한도 초과")
 
     async def get(self, path: str, params: dict, tr_id: str) -> dict:
-        return await self._request("get", path, tr_id, params=params)
+        if not self.coalesce and self.cache is None:
+            return await self._fetch(path, params, tr_id)
+        key = _flight_key(path, params, tr_id)
+        if self.cache is not None and (hit := self.cache.get(key, time())) is not None:
+            return hit
+        if self.coalesce:
+            result = await self._coalesced(key, path, params, tr_id)
+        else:
+            result = await self._fetch(path, params, tr_id)
+        if self.cache is not None:
+            self.cache.put(key, result, time())
+        return result
+
+    async def _coalesced(self, key: tuple, path: str, params: dict, tr_id: str) -> dict:
+        # 동일 (path, params, tr_id) 동시 요청은 하나의 HTTP 요청과 결과를 공유
+        if (task := self._inflight.get(key)) is None:
+            task = self._inflight[key] = asyncio.ensure_future(self._fetch(path, params, tr_id))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)  # 한 호출자의 취소가 공유 요청을 취소하지 않도록
+
+    async def _fetch(self, path: str, params: dict, tr_id: str) -> dict:
+        if (hedge := self.retry.hedge) is None or tr_kind(tr_id) != "quote":
+            return await self._request("get", path, tr_id, params=params)
+        return await self._hedged(path, params, tr_id, hedge)
+
+    def _may_hedge(self, tr_id: str) -> bool:
+        # 중복 요청은 재시도로 취급: 슬롯이 바로 비어 있고 재시도 예산이 남을 때만
+        if not self._scheduler.ready(self._limiters(tr_id)):
+            return False
+        budget = self.retry.budget
+        return budget is None or budget.withdraw(time())
+
+    async def _hedged(self, path: str, params: dict, tr_id: str, hedge: float) -> dict:
+        # 첫 요청이 슬롯을 받은 뒤 지연 백분위까지 응답이 없으면 같은 GET을 한 번 더 보냄
+        delay = self._latency.percentile(hedge) or self.retry.hedge_delay
+        granted = asyncio.Event()
+
+        def send(**kwargs) -> asyncio.Future:
+            return asyncio.ensure_future(
+                self._request("get", path, tr_id, params=params, **kwargs)
+            )
+
+        tasks = [send(granted=granted)]
+        tasks[0].add_done_callback(lambda _: granted.set())  # 슬롯 전에 실패한 경우
+        try:
+            await granted.wait()
+            if not (await asyncio.wait(tasks, timeout=delay))[0] and self._may_hedge(tr_id):
+                tasks.append(send())
+            pending = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                if ok := [t for t in done if t.exception() is None]:
+                    return ok[0].result()
+                if not pending:
+                    return done.pop().result()
+        finally:
+            for t in tasks:
+                t.cancel()  # 늦은 쪽(또는 호출자 취소 시 전부) 취소
+
+    async def page(
+        self, path: str, params: dict, tr_id: str, cont: bool = False
+    ) -> tuple[dict, bool]:
+        """One page of a continued inquiry: (full response body, more pages follow)."""
+        data, tr_cont = await self._request(
+            "get", path, tr_id, page="N" if cont else "", params=params
+        )
+        return data, tr_cont in ("F", "M")
 
     async def post(self, path: str, body: dict, tr_id: str) -> dict:
         return await self._request("post", path, tr_id, json=body)
 
     async def close(self):
-        await self._client.aclose()
+        if self._refresher:
+            self._refresher.cancel()
+        if transport.release(self, self._client):
+            await self._client.aclose()
 
     async def __aenter__(self):
         return self
@@ -1,11 +1,87 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
 import time
-from typing import Literal
+from pathlib import Path
+from typing import Literal, Protocol
 
 import httpx
 
 Env = Literal["prod", "paper"]
 _tokens: dict[tuple[str, str], tuple[str, float]] = {}
-_async_client: httpx.AsyncClient | None = None
+_ws_keys: dict[tuple[str, str], tuple[str, float]] = {}
+WS_KEY_TTL = 23 * 3600.0  # 접속키 유효기간 24시간, 1시간 여유
+_async_client: tuple[asyncio.AbstractEventLoop, httpx.AsyncClient] | None = None  # 루프별
+# (env, app_key)별 발급 잠금: 동시에 토큰이 비어 있어도 /oauth2/tokenP는 한 번만 호출
+_locks: dict[tuple[str, str], threading.Lock] = {}
+_async_locks: dict[tuple[str, str], tuple[asyncio.AbstractEventLoop, asyncio.Lock]] = {}
+_locks_guard = threading.Lock()
+
+
+class TokenStore(Protocol):
+    def load(self, key: tuple[str, str]) -> tuple[str, float] | None: ...
+    def save(self, key: tuple[str, str], token: str, expires_at: float) -> None: ...
+    def lock(self) -> int: ...
+    def unlock(self, handle: int) -> None: ...
+
+
+class FileTokenStore:
+    """Token cache shared by every process on the host: owner-only file, atomic replace, flock.
+
+    POSIX only (fcntl). Enable with `set_token_store(FileTokenStore())`.
+    """
+
+    __slots__ = ("path",)
+
+    def __init__(self, path: str | Path | None = None):
+        self.path = Path(path or Path.home() / ".cache" / "kis-wrapper" / "tokens.json")
+        self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+    @staticmethod
+    def _name(key: tuple[str, str]) -> str:
+        return f"{key[0]}:{hashlib.sha256(key[1].encode()).hexdigest()[:16]}"
+
+    def _read(self) -> dict:
+        try:
+            return json.loads(self.path.read_text())
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def load(self, key: tuple[str, str]) -> tuple[str, float] | None:
+        entry = self._read().get(self._name(key))
+        return (entry[0], entry[1]) if entry else None
+
+    def save(self, key: tuple[str, str], token: str, expires_at: float) -> None:
+        data = {k: v for k, v in self._read().items() if v[1] > time.time()}
+        data[self._name(key)] = [token, expires_at]
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=".tokens-")  # mode 0600
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def lock(self) -> int:
+        """Block until this process holds the issuance lock. Returns a handle for unlock()."""
+        import fcntl
+
+        fd = os.open(self.path.with_suffix(".lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return fd
+
+    def unlock(self, handle: int) -> None:
+        os.close(handle)  # close가 flock을 해제
+
+
+_store: TokenStore | None = None
+
+
+def set_token_store(store: TokenStore | None) -> None:
+    """Persist tokens through store (e.g. FileTokenStore()) so restarts and sibling processes
+    reuse a valid token instead of issuing a new one. None disables persistence."""
+    global _store
+    _store = store
 
 _URLS = {
     "prod": "https://openapi.koreainvestment.com:9443",
@@ -18,7 +94,9 @@ def _base_url(env: Env) -> str:
 
 
 def _issue_token(app_key: str, app_secret: str, env: Env) -> tuple[str, float]:
-    resp = httpx.post(
+    from kis.transport import find
+
+    resp = (find(env) or httpx).post(
         f"{_base_url(env)}/oauth2/tokenP",
         json={"grant_type": "client_credentials", "appkey": app_key, "appsecret": app_secret},
     )
@@ -26,31 +104,110 @@ def _issue_token(app_key: str, app_secret: str, env: Env) -> tuple[str, float]:
     return data["access_token"], time.time() + data["expires_in"] - 60
 
 
-def get_token(app_key: str, app_secret: str, env: Env = "prod") -> str:
+def _cached(key: tuple[str, str], ahead: float = 0.0) -> str | None:
+    entry = _tokens.get(key)
+    return entry[0] if entry and entry[1] > time.time() + 60 + ahead else None
+
+
+def _stored(key: tuple[str, str], ahead: float = 0.0) -> str | None:
+    entry = _store.load(key) if _store else None
+    if entry and entry[1] > time.time() + 60 + ahead:
+        _tokens[key] = entry
+        return entry[0]
+    return None
+
+
+def _lock(key: tuple[str, str]) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def _async_lock(key: tuple[str, str]) -> asyncio.Lock:
+    loop = asyncio.get_running_loop()
+    with _locks_guard:
+        entry = _async_locks.get(key)
+        if entry is None or entry[0] is not loop:
+            entry = _async_locks[key] = (loop, asyncio.Lock())
+        return entry[1]
+
+
+def get_token(app_key: str, app_secret: str, env: Env = "prod", ahead: float = 0.0) -> str:
+    """Cached token, issued anew if it would be refreshed within `ahead` seconds."""
     key = (env, app_key)
-    if key in _tokens and _tokens[key][1] > time.time() + 60:
-        return _tokens[key][0]
-    _tokens[key] = _issue_token(app_key, app_secret, env)
-    return _tokens[key][0]
+    if token := _cached(key, ahead):
+        return token
+    with _lock(key):
+        if token := _cached(key, ahead) or _stored(key, ahead):  # 다른 스레드/프로세스가 발급함
+            return token
+        if _store is None:
+            _tokens[key] = _issue_token(app_key, app_secret, env)
+            return _tokens[key][0]
+        handle = _store.lock()
+        try:
+            if token := _stored(key, ahead):
+                return token
+            _tokens[key] = _issue_token(app_key, app_secret, env)
+            _store.save(key, *_tokens[key])
+            return _tokens[key][0]
+        finally:
+            _store.unlock(handle)
+
+
+def token_valid_until(app_key: str, env: Env) -> float:
+    """Time until which get_token keeps returning the cached token (0 if none cached)."""
+    entry = _tokens.get((env, app_key))
+    return entry[1] - 60 if entry else 0.0
+
+
+def invalidate_token(app_key: str, env: Env, token: str) -> None:
+    """Drop `token` (rejected by the server as expired) so the next get_token issues a new one.
+
+    No-op if the cached token has already been replaced, so concurrent callers do not
+    trigger repeated issuance."""
+    key = (env, app_key)
+    if (entry := _tokens.get(key)) and entry[0] == token:
+        del _tokens[key]
+    if _store is None:
+        return
+    handle = _store.lock()  # 다른 프로세스가 막 저장한 새 토큰을 덮어쓰지 않도록
+    try:
+        if (entry := _store.load(key)) and entry[0] == token:
+            _store.save(key, token, 0.0)
+    finally:
+        _store.unlock(handle)
+
+
+def _cached_ws_key(key: tuple[str, str]) -> str | None:
+    entry = _ws_keys.get(key)
+    return entry[0] if entry and entry[1] > time.time() else None
 
 
 def get_ws_key(app_key: str, app_secret: str, env: Env = "prod") -> str:
-    resp = httpx.post(
+    from kis.transport import find
+
+    key = (env, app_key)
+    if ws_key := _cached_ws_key(key):
+        return ws_key
+    resp = (find(env) or httpx).post(
         f"{_base_url(env)}/oauth2/Approval",
         json={"grant_type": "client_credentials", "appkey": app_key, "secretkey": app_secret},
     )
-    return resp.raise_for_status().json()["approval_key"]
+    _ws_keys[key] = (resp.raise_for_status().json()["approval_key"], time.time() + WS_KEY_TTL)
+    return _ws_keys[key][0]
 
 
 async def _get_async_client() -> httpx.AsyncClient:
     global _async_client
-    if _async_client is None:
-        _async_client = httpx.AsyncClient()
-    return _async_client
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client[0] is not loop:  # 이전 asyncio.run의 연결은 못 씀
+        _async_client = (loop, httpx.AsyncClient())
+    return _async_client[1]
 
 
 async def _issue_token_async(app_key: str, app_secret: str, env: Env) -> tuple[str, float]:
-    client = await _get_async_client()
+    from kis.transport import find
+
+    client = find(env, is_async=True) or await _get_async_client()
     resp = await client.post(
         f"{_base_url(env)}/oauth2/tokenP",
         json={"grant_type": "client_credentials", "appkey": app_key, "appsecret": app_secret},
@@ -59,18 +216,58 @@ async def _issue_token_async(app_key: str, app_secret: str, env: Env) -> tuple[s
     return data["access_token"], time.time() + data["expires_in"] - 60
 
 
-async def get_token_async(app_key: str, app_secret: str, env: Env = "prod") -> str:
+async def _store_lock_async(store: TokenStore) -> int:
+    # 다른 프로세스 발급 대기 중 루프를 막지 않음. 대기 중 취소되면 스레드가 뒤늦게 얻은 잠금을 해제
+    fut = asyncio.ensure_future(asyncio.to_thread(store.lock))
+    try:
+        return await asyncio.shield(fut)
+    except asyncio.CancelledError:
+        def release(f: asyncio.Future) -> None:
+            if not f.cancelled() and f.exception() is None:
+                store.unlock(f.result())
+
+        fut.add_done_callback(release)
+        raise
+
+
+async def get_token_async(
+    app_key: str, app_secret: str, env: Env = "prod", ahead: float = 0.0
+) -> str:
     key = (env, app_key)
-    if key in _tokens and _tokens[key][1] > time.time() + 60:
-        return _tokens[key][0]
-    _tokens[key] = await _issue_token_async(app_key, app_secret, env)
-    return _tokens[key][0]
+    if token := _cached(key, ahead):
+        return token
+    async with _async_lock(key):
+        if token := _cached(key, ahead) or _stored(key, ahead):  # 다른 코루틴/프로세스가 발급함
+            return token
+        if _store is None:
+            _tokens[key] = await _issue_token_async(app_key, app_secret, env)
+            return _tokens[key][0]
+        handle = await _store_lock_async(_store)
+        try:
+            if token := _stored(key, ahead):
+                return token
+            _tokens[key] = await _issue_token_async(app_key, app_secret, env)
+            _store.save(key, *_tokens[key])
+            return _tokens[key][0]
+        finally:
+            _store.unlock(handle)
 
 
 async def get_ws_key_async(app_key: str, app_secret: str, env: Env = "prod") -> str:
-    client = await _get_async_client()
+    from kis.transport import find
+
+    key = (env, app_key)
+    if ws_key := _cached_ws_key(key):
+        return ws_key
+    client = find(env, is_async=True) or await _get_async_client()
     resp = await client.post(
         f"{_base_url(env)}/oauth2/Approval",
         json={"grant_type": "client_credentials", "appkey": app_key, "secretkey": app_secret},
     )
-    return resp.raise_for_status().json()["approval_key"]
+    _ws_keys[key] = (resp.raise_for_status().json()["approval_key"], time.time() + WS_KEY_TTL)
+    return _ws_keys[key][0]
+
+
+def invalidate_ws_key(app_key: str, env: Env) -> None:
+    """Drop the cached approval key so the next connect requests a new one."""
+    _ws_keys.pop((env, app_key), None)
@@ -0,0 +1,175 @@
+"""Daily candle backfill: pages backwards by date under the client's throttle, resumable.
+
+Per symbol the engine first fetches bars newer than the newest stored one, then keeps paging
+back towards `start` until the listing date. Progress goes to an append-only checkpoint after
+every page, so an interrupted run resumes where it stopped. Bars are handed to `sink` before the
+checkpoint records them: a page may be delivered twice after a crash, never skipped. The newest
+stored bar is always delivered again, so a bar taken during the session is replaced once final.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from collections.abc import Callable, Generator, Iterable
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from kis import domestic, overseas
+from kis.cache import KST
+from kis.types import Candle, Exchange
+from kis.utils import fan_out, is_async
+
+Sink = Callable[[str, list[Candle]], None]
+Plan = Generator[str, list[Candle], int]  # 다음 페이지 끝 날짜를 내고, 그 페이지를 받음
+
+
+class Checkpoint:
+    """Per-symbol progress {newest, oldest, complete} as JSON lines; last line per key wins.
+
+    path=None keeps progress in memory only.
+    """
+
+    __slots__ = ("path", "state", "_lock")
+
+    def __init__(self, path: str | Path | None = None):
+        self.path = Path(path) if path else None
+        self.state: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if self.path and self.path.exists():
+            for line in self.path.read_text().splitlines():
+                try:
+                    key, entry = json.loads(line)
+                except ValueError:  # 중단 시 잘린 마지막 줄
+                    continue
+                self.state[key] = entry
+            self._compact(self.path)
+
+    def _compact(self, path: Path) -> None:
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".ckpt-")
+        with os.fdopen(fd, "w") as f:
+            f.writelines(json.dumps([k, v]) + "\n" for k, v in self.state.items())
+        os.replace(tmp, path)
+
+    def get(self, key: str) -> dict:
+        return dict(self.state.get(key, {}))
+
+    def update(self, key: str, **fields) -> None:
+        with self._lock:
+            entry = self.state[key] = {**self.state.get(key, {}), **fields}
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps([key, entry]) + "\n")
+
+
+def _ymd(d: int) -> date:
+    return date(d // 10000, d // 100 % 100, d % 100)
+
+
+def _before(d: int) -> str:
+    return (_ymd(d) - timedelta(days=1)).strftime("%Y%m%d")
+
+
+def _plan(
+    key: str, start: int, end: str, ckpt: Checkpoint, sink: Sink
+) -> Plan:
+    """Yields the end date of the next page to fetch, receives that page (newest first).
+
+    Shared by the sync and async drivers; returns the number of bars delivered.
+    """
+    st, sent = ckpt.get(key), 0
+    newest, oldest = st.get("newest"), st.get("oldest")
+    if newest:  # 1) 지난 실행 이후의 새 봉. 끝까지 받은 뒤에만 newest 갱신 (중단 시 구멍 방지)
+        cursor, top = end, 0
+        while page := (yield cursor):
+            # newest 당일 봉도 다시 보냄: 장중에 받은 미완성 봉을 확정 값으로 덮어씀
+            fresh = [c for c in page if c.date >= newest]
+            if fresh:
+                sink(key, fresh)
+                sent, top = sent + len(fresh), max(top, fresh[0].date)
+            if page[-1].date <= newest:
+                break
+            cursor = _before(page[-1].date)
+        if top:
+            newest = top
+            ckpt.update(key, newest=newest)
+    if st.get("complete"):
+        return sent
+    cursor = _before(oldest) if oldest else end  # 2) 과거 방향
+    while True:
+        raw = yield cursor
+        page = [c for c in raw if c.date >= start]
+        if page:
+            sink(key, page)
+            sent, oldest, newest = sent + len(page), page[-1].date, newest or page[0].date
+        done = not page or len(page) < len(raw) or (oldest and _before(oldest) >= cursor)
+        ckpt.update(key, newest=newest, oldest=oldest, complete=bool(done))
+        if done:
+            return sent
+        cursor = _before(page[-1].date)  # = oldest
+
+
+def _drive(plan: Plan, fetch: Callable[[str], list[Candle]]) -> int:
+    try:
+        cursor = next(plan)
+        while True:
+            cursor = plan.send(fetch(cursor))
+    except StopIteration as e:
+        return e.value
+
+
+async def _adrive(plan: Plan, fetch: Callable) -> int:
+    try:
+        cursor = next(plan)
+        while True:
+            cursor = plan.send(await fetch(cursor))
+    except StopIteration as e:
+        return e.value
+
+
+def _candles(rows: list[dict], parse: Callable[[dict], Candle], field: str) -> list[Candle]:
+    return sorted((parse(r) for r in rows if r.get(field)), reverse=True)  # 빈 행 제외, 최신순
+
+
+def _fetcher(kis, symbol: str | tuple[str, Exchange], start: str) -> Callable:
+    if isinstance(symbol, str):
+        def rows(cursor):
+            return domestic.daily_range(kis, symbol, start, cursor)
+        parse, field = Candle.parse_domestic, "stck_bsop_date"
+    else:
+        def rows(cursor):
+            return overseas.daily(kis, symbol[0], symbol[1], end=cursor)
+        parse, field = Candle.parse_overseas, "xymd"
+    if is_async(kis):
+        async def fetch(cursor):
+            return _candles(await rows(cursor), parse, field)
+        return fetch
+    return lambda cursor: _candles(rows(cursor), parse, field)
+
+
+def symbol_key(symbol: str | tuple[str, Exchange]) -> str:
+    """Checkpoint/sink key: '005930' for domestic, 'NAS:AAPL' for overseas."""
+    return symbol if isinstance(symbol, str) else f"{symbol[1]}:{symbol[0]}"
+
+
+def backfill(
+    kis, symbols: Iterable[str | tuple[str, Exchange]], start: str, sink: Sink,
+    checkpoint: Checkpoint | str | Path | None = None, end: str = "", concurrency: int = 4,
+):
+    """Fetch daily bars from `start` (YYYYMMDD) up to `end` (default today KST) for every symbol.
+
+    symbols: domestic codes or (symbol, exchange) pairs. sink(key, bars) receives each page,
+    newest first, and must be thread-safe for KIS. Returns (bars delivered, errors) keyed by
+    symbol_key; a coroutine for AsyncKIS. Re-running with the same checkpoint only fetches bars
+    newer than the last run plus whatever history is still missing.
+    """
+    ckpt = checkpoint if isinstance(checkpoint, Checkpoint) else Checkpoint(checkpoint)
+    end = end or datetime.now(KST).strftime("%Y%m%d")
+    drive = _adrive if is_async(kis) else _drive
+    by_key = {symbol_key(s): s for s in symbols}
+
+    def run(key: str):
+        plan = _plan(key, int(start), end, ckpt, sink)
+        return drive(plan, _fetcher(kis, by_key[key], start))
+
+    return fan_out(kis, run, by_key, concurrency)
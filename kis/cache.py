@@ -0,0 +1,65 @@
+"""TTL + LRU response cache for read-only quotation TRs."""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+KST = timezone(timedelta(hours=9))
+EOD = -1.0  # 다음 자정(KST)까지 유효
+
+# tr_id -> TTL(초). 여기 없는 TR은 캐시하지 않음
+DEFAULT_TTL: dict[str, float] = {
+    "FHKST01010100": 1.0,  # 국내 현재가
+    "FHKST01010200": 1.0,  # 국내 호가
+    "FHKST01010400": EOD,  # 국내 일/주/월봉
+    "HHDFS00000300": 1.0,  # 해외 현재가
+    "HHDFS76200200": 1.0,  # 해외 호가
+    "HHDFS76240000": EOD,  # 해외 기간별 시세
+}
+
+
+def end_of_day(now: float) -> float:
+    """Timestamp of the next midnight in KST."""
+    d = datetime.fromtimestamp(now, KST).date() + timedelta(days=1)
+    return datetime(d.year, d.month, d.day, tzinfo=KST).timestamp()
+
+
+class Cache:
+    """Bounded LRU cache of parsed responses keyed by (path, tr_id, params), TTL per tr_id."""
+
+    __slots__ = ("maxsize", "ttl", "hits", "misses", "evictions", "_data")
+
+    def __init__(self, maxsize: int = 1024, ttl: dict[str, float] | None = None):
+        self.maxsize, self.ttl = maxsize, {**DEFAULT_TTL, **(ttl or {})}
+        self.hits = self.misses = self.evictions = 0
+        self._data: OrderedDict[tuple, tuple[float, dict]] = OrderedDict()
+
+    def get(self, key: tuple, now: float) -> dict | None:
+        if key[1] not in self.ttl:
+            return None
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= now:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: tuple, value: dict, now: float) -> None:
+        if (ttl := self.ttl.get(key[1])) is None:
+            return
+        self._data[key] = (end_of_day(now) if ttl == EOD else now + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
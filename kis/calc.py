@@ -1,4 +1,9 @@
+from array import array
+from collections.abc import Iterable
 from decimal import Decimal
+from operator import mul, sub
+
+from kis.types import _int
 
 
 def profit_rate(buy_price: int, current_price: int) -> Decimal:
@@ -27,3 +32,81 @@ def total_profit(positions: list[dict]) -> int:
 
 def verify_balance(balance: dict, positions: list[dict]) -> bool:
     return abs(int(balance.get("tot_evlu_amt", 0)) - total_value(positions)) < 1
+
+
+class Portfolio:
+    """Domestic holdings as parallel int64 columns, parsed once from positions() rows.
+
+    Amounts stay exact integer KRW; sums and products run over `array('q')` in C, so a book of
+    thousands of positions costs no per-call string parsing. Ratios (weights, returns) are floats.
+    """
+
+    __slots__ = ("symbols", "accounts", "qty", "price", "cost", "value")
+
+    def __init__(
+        self, symbols: Iterable[str] = (), accounts: Iterable[str] = (),
+        qty: Iterable[int] = (), price: Iterable[int] = (),
+        cost: Iterable[int] = (), value: Iterable[int] = (),
+    ):
+        self.symbols, self.accounts = tuple(symbols), tuple(accounts)
+        self.qty, self.price = array("q", qty), array("q", price)
+        self.cost, self.value = array("q", cost), array("q", value)
+
+    @classmethod
+    def from_positions(cls, positions: list[dict], account: str = "") -> "Portfolio":
+        """Build from domestic.positions() / iter_positions() rows, tagged with `account`."""
+        rows = [p for p in positions if _int(p.get("hldg_qty"))]  # 전량 매도 후 남는 0주 행 제외
+        return cls(
+            (p["pdno"] for p in rows), (account,) * len(rows),
+            (_int(p.get("hldg_qty")) for p in rows), (_int(p.get("prpr")) for p in rows),
+            (_int(p.get("pchs_amt")) for p in rows), (_int(p.get("evlu_amt")) for p in rows),
+        )
+
+    @classmethod
+    def concat(cls, books: Iterable["Portfolio"]) -> "Portfolio":
+        """One book from several (e.g. one per account); rows keep their account tag."""
+        out = cls()
+        for b in books:
+            out.symbols += b.symbols
+            out.accounts += b.accounts
+            for name in ("qty", "price", "cost", "value"):
+                getattr(out, name).extend(getattr(b, name))
+        return out
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def reprice(self, prices: dict[str, int]) -> None:
+        """Mark to new prices (e.g. from domestic.prices); symbols not in `prices` keep theirs."""
+        self.price = array("q", (prices.get(s, p) for s, p in zip(self.symbols, self.price)))
+        self.value = array("q", map(mul, self.qty, self.price))
+
+    def total_value(self) -> int:
+        return sum(self.value)
+
+    def total_cost(self) -> int:
+        return sum(self.cost)
+
+    def total_profit(self) -> int:
+        return self.total_value() - self.total_cost()
+
+    def profits(self) -> array:
+        return array("q", map(sub, self.value, self.cost))
+
+    def weights(self) -> list[float]:
+        total = self.total_value()
+        return [v / total for v in self.value] if total else [0.0] * len(self)
+
+    def returns(self) -> list[float]:
+        return [(v - c) / c if c else 0.0 for v, c in zip(self.value, self.cost)]
+
+    def by_account(self) -> dict[str, int]:
+        """Evaluation amount per account tag."""
+        totals: dict[str, int] = {}
+        for account, v in zip(self.accounts, self.value):
+            totals[account] = totals.get(account, 0) + v
+        return totals
+
+    def verify(self, balance: dict) -> bool:
+        """Same check as verify_balance, against the book's value column."""
+        return int(balance.get("tot_evlu_amt", 0)) == self.total_value()
@@ -1,32 +1,106 @@
-from collections import deque
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
 from time import sleep, time
+from typing import TYPE_CHECKING
 
 import httpx
 
-from kis.auth import Env, _base_url, get_token
-from kis.errors import CircuitBreakerError, NetworkError, RateLimitError, raise_for_code
-from kis.resilience import CB_OPEN, cb_on_failure, cb_state, throttle_wait
+from kis import codec, transport
+from kis.auth import Env, get_token, invalidate_token, token_valid_until
+from kis.cache import Cache
+from kis.errors import (
+    CircuitBreakerError,
+    NetworkError,
+    RateLimitError,
+    TokenExpiredError,
+    raise_for_code,
+)
+from kis.metrics import Metrics
+from kis.resilience import (
+    CB_NAMES,
+    AdaptiveBucket,
+    CircuitBreaker,
+    LatencyWindow,
+    RetryPolicy,
+    SharedLimiter,
+    TokenBucket,
+    backoff,
+    endpoint_group,
+    order_buckets,
+    tr_kind,
+)
+from kis.transport import PoolConfig
 
+if TYPE_CHECKING:
+    from kis.async_client import AsyncKIS
 
-def _parse_response(resp: httpx.Response) -> dict:
-    resp.raise_for_status()
-    data = resp.json()
+
+def _kis_body(resp: httpx.Response) -> bool:
+    return b'"msg_cd"' in resp.content  # EGW 오류는 HTTP 500 + 본문 msg_cd
+
+
+def _check_response(resp: httpx.Response) -> dict:
+    """Full response body, raising the mapped KISError if rt_cd is not "0"."""
+    if resp.is_error and not _kis_body(resp):
+        resp.raise_for_status()
+    data = codec.loads(resp.content)  # resp.json()은 항상 stdlib json
     if data.get("rt_cd") != "0":
         raise_for_code(data.get("msg_cd", "UNKNOWN"), data.get("msg1", "Unknown error"))
+    return data
+
+
+def _parse_response(resp: httpx.Response) -> dict:
+    data = _check_response(resp)
     if "output1" in data and "output2" in data:
         return data
     return data.get("output") or data.get("output1") or data
 
 
+def _settle(breaker: CircuitBreaker, resp: httpx.Response, now: float) -> None:
+    """Feed one HTTP response to its endpoint group's breaker."""
+    if resp.status_code == 429:  # 한도 초과는 장애 아님: probe만 풀어 자체 재시도가 막히지 않게
+        breaker.release()
+    elif resp.is_server_error and not _kis_body(resp):  # 본문 없는 5xx = 게이트웨이 장애
+        breaker.on_failure(now)
+    else:  # KIS 본문이 있으면(EGW00201 포함) 서버는 응답 중
+        breaker.on_success()
+
+
 def _split_account(account: str) -> dict:
     return {"CANO": account[:8], "ACNT_PRDT_CD": account[9:11]}
 
 
+def _auth_headers(kis: "KIS | AsyncKIS", token: str) -> tuple[float, dict, dict]:
+    # 토큰 교체 시 (유효기한, 공통 헤더, tr_id별 헤더)를 통째로 바꿔 끼움
+    base = {
+        "authorization": f"Bearer {token}",
+        "appkey": kis.app_key,
+        "appsecret": kis.app_secret,
+        "content-type": "application/json; charset=utf-8",
+    }
+    return token_valid_until(kis.app_key, kis.env), base, {}
+
+
+def _refresh_delay(kis: "KIS | AsyncKIS", ahead: float, failed: bool = False) -> float:
+    # 토큰 만료 ahead초 전에 깨어남 (토큰 정보가 없으면 1초 후 재확인)
+    # 발급 실패 후에는 최소 1분 대기: 발급은 1분에 1회 제한이라 바로 재시도하면 계속 거절됨
+    floor = 60.0 if failed else 1.0
+    return max(floor, token_valid_until(kis.app_key, kis.env) - ahead - time())
+
+
+def _flight_key(path: str, params: dict, tr_id: str) -> tuple:
+    return path, tr_id, tuple(sorted(params.items()))
+
+
 class KIS:
     __slots__ = (
         "app_key", "app_secret", "account", "env", "max_retries", "retry_delay",
-        "throttle_rate", "cb_threshold", "cb_recovery_time",
-        "_client", "_throttle_ts", "_cb_failures", "_cb_open_until",
+        "throttle_rate", "cb_threshold", "cb_recovery_time", "pool", "limiter",
+        "throttle_burst", "order_reserve", "coalesce", "cache",
+        "_client", "_bucket", "_buckets", "_breakers", "_inflight",
+        "_inflight_lock", "_auth", "token_refresh", "_refresher", "_stop", "retry", "_latency",
+        "_executor", "adaptive", "metrics", "__weakref__",
     )
 
     def __init__(
@@ -40,15 +114,44 @@ class KIS:
         throttle_rate: int = 20,
         cb_threshold: int = 5,
         cb_recovery_time: float = 30.0,
+        pool: PoolConfig | None = None,
+        limiter: SharedLimiter | None = None,
+        throttle_burst: int | None = None,
+        order_reserve: int = 0,
+        coalesce: bool = False,
+        cache: Cache | None = None,
+        token_refresh: float | None = None,
+        retry: RetryPolicy | None = None,
+        adaptive: bool = False,
+        metrics: Metrics | None = None,
     ):
+        if adaptive and limiter is not None:  # 공유 리미터의 rate는 프로세스별로 조정할 수 없음
+            raise ValueError("adaptive=True cannot be combined with a shared limiter")
         self.app_key, self.app_secret, self.account = app_key, app_secret, account
         self.env, self.max_retries, self.retry_delay = env, max_retries, retry_delay
         self.throttle_rate, self.cb_threshold, self.cb_recovery_time = (
             throttle_rate, cb_threshold, cb_recovery_time
         )
-        self._client = httpx.Client(base_url=_base_url(env), timeout=10.0)
-        self._throttle_ts: deque = deque()
-        self._cb_failures, self._cb_open_until = 0, 0.0
+        self.pool, self.limiter = pool or PoolConfig(), limiter
+        self.throttle_burst, self.order_reserve = throttle_burst, order_reserve
+        self._client = transport.acquire(self, env, self.pool)
+        self.adaptive = adaptive
+        self._bucket = (AdaptiveBucket if adaptive else TokenBucket)(throttle_rate, throttle_burst)
+        self._buckets = order_buckets(throttle_rate, throttle_burst, order_reserve, limiter)
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._auth: tuple[float, dict, dict] = (0.0, {}, {})
+        self.coalesce, self._inflight_lock = coalesce, threading.Lock()
+        self._inflight: dict[tuple, Future] = {}
+        self.cache, self.token_refresh, self._stop = cache, token_refresh, threading.Event()
+        self._refresher = None
+        self._executor: ThreadPoolExecutor | None = None  # hedge용, 처음 쓸 때 생성
+        self.retry, self._latency = retry or RetryPolicy(), LatencyWindow()
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.bind(self)
+        if token_refresh is not None:
+            self._refresher = threading.Thread(target=self._refresh_loop, daemon=True)
+            self._refresher.start()
 
     @property
     def is_paper(self) -> bool:
@@ -62,52 +165,222 @@ class KIS:
         return KIS(
             self.app_key, self.app_secret, self.account, env,
             self.max_retries, self.retry_delay,
-            self.throttle_rate, self.cb_threshold, self.cb_recovery_time,
+            self.throttle_rate, self.cb_threshold, self.cb_recovery_time, self.pool,
+            self.limiter and self.limiter.switch(env), self.throttle_burst, self.order_reserve,
+            self.coalesce, self.cache, self.token_refresh, self.retry, self.adaptive,
+            self.metrics,
         )
 
+    def _limiters(self, tr_id: str) -> tuple:
+        main = self.limiter or self._bucket
+        return (kind, main) if (kind := self._buckets.get(tr_kind(tr_id))) else (main,)
+
     def _headers(self, tr_id: str) -> dict:
-        return {
-            "authorization": f"Bearer {get_token(self.app_key, self.app_secret, self.env)}",
-            "appkey": self.app_key,
-            "appsecret": self.app_secret,
-            "tr_id": tr_id,
-            "content-type": "application/json; charset=utf-8",
-        }
+        until, base, by_tr = self._auth
+        if time() >= until:
+            token = get_token(self.app_key, self.app_secret, self.env)
+            until, base, by_tr = self._auth = _auth_headers(self, token)
+        if (headers := by_tr.get(tr_id)) is None:
+            headers = by_tr[tr_id] = {**base, "tr_id": tr_id}
+        return headers
+
+    def _refresh_loop(self) -> None:
+        """Renew the token token_refresh seconds before expiry so no request pays for issuance."""
+        ahead, failed = self.token_refresh or 0.0, False
+        while not self._stop.wait(_refresh_delay(self, ahead, failed)):
+            try:
+                token = get_token(self.app_key, self.app_secret, self.env, ahead)
+            except Exception:  # 1분 뒤 재시도 (그 사이 요청은 기존 토큰 사용)
+                failed = True
+                continue
+            failed = False
+            if self._auth[1].get("authorization") != f"Bearer {token}":
+                self._auth = (0.0, {}, {})
+
+    def _expire_token(self) -> None:
+        invalidate_token(self.app_key, self.env, self._auth[1].get("authorization", "")[7:])
+        self._auth = (0.0, {}, {})
 
     def _request(self, method: str, path: str, tr_id: str, **kwargs) -> dict:
+        try:
+            try:
+                return self._send(method, path, tr_id, **kwargs)
+            except TokenExpiredError:  # EGW00123: 재발급 후 한 번만 재시도
+                self._expire_token()
+                if self.metrics is not None:
+                    self.metrics.retried("token", 0.0)
+                return self._send(method, path, tr_id, **kwargs)
+        except Exception as e:
+            if self.metrics is not None:
+                self.metrics.error(e)
+            raise
+
+    def _breaker(self, group: str) -> CircuitBreaker:
+        if (breaker := self._breakers.get(group)) is None:
+            breaker = self._breakers.setdefault(
+                group, CircuitBreaker(self.cb_threshold, self.cb_recovery_time)
+            )
+        return breaker
+
+    def circuit_states(self) -> dict[str, str]:
+        """State of each endpoint group's breaker seen so far: 'closed', 'open' or 'half_open'."""
+        now = time()
+        return {group: CB_NAMES[b.state(now)] for group, b in self._breakers.items()}
+
+    def _may_retry(self, attempt: int) -> bool:
+        budget = self.retry.budget
+        return attempt < self.max_retries and (budget is None or budget.withdraw(time()))
+
+    def _send(
+        self, method: str, path: str, tr_id: str, page: str | None = None,
+        granted: threading.Event | None = None, **kwargs,
+    ):
+        if self.retry.budget is not None:
+            self.retry.budget.deposit()
+        group, m = endpoint_group(path, tr_id), self.metrics
+        breaker = self._breaker(group)
         for attempt in range(self.max_retries + 1):
-            now = time()
-            if cb_state(self._cb_failures, self.cb_threshold, self._cb_open_until, now) == CB_OPEN:
-                raise CircuitBreakerError("CB_OPEN", "Circuit breaker is open")
-            if (wait := throttle_wait(self._throttle_ts, self.throttle_rate, now)) > 0:
-                sleep(wait)
+            if not breaker.allow(time()):
+                raise CircuitBreakerError("CB_OPEN", f"Circuit breaker is open: {group}")
+            waited = 0.0
+            for limiter in self._limiters(tr_id):
+                if (wait := limiter.wait(time())) > 0:
+                    sleep(wait)
+                    waited += wait
+            if m is not None and waited > 0:  # 요청당 한 번 (리미터가 둘이어도)
+                m.throttled(waited)
+            if granted is not None:  # hedge 대기는 슬롯을 받은 뒤부터
+                granted.set()
             try:
-                resp = getattr(self._client, method)(path, headers=self._headers(tr_id), **kwargs)
+                headers = self._headers(tr_id)
+                if page is not None:  # 연속조회: (전체 본문, 응답 tr_cont) 반환
+                    headers = {**headers, "tr_cont": page}
+                start = time()  # 토큰 발급 시간은 왕복 지연에서 제외
+                resp = getattr(self._client, method)(path, headers=headers, **kwargs)
             except (httpx.ConnectError, httpx.TimeoutException) as e:
-                self._cb_failures, self._cb_open_until = cb_on_failure(
-                    self._cb_failures, self.cb_threshold, self.cb_recovery_time, time()
-                )
-                if attempt == self.max_retries:
+                breaker.on_failure(time())
+                if not self._may_retry(attempt):
                     raise NetworkError("NETWORK", str(e)) from e
-                sleep(self.retry_delay * (2 ** attempt))
+                delay = backoff(self.retry_delay, attempt, self.retry.jitter)
+                if m is not None:
+                    m.retried("network", delay)
+                sleep(delay)
                 continue
-            if resp.status_code == 429:
-                if attempt == self.max_retries:
-                    raise RateLimitError("429", "API 호출 한도 초과")
-                sleep(float(resp.headers.get("Retry-After", self.retry_delay * (2 ** attempt))))
-                continue
-            self._cb_failures = 0
-            return _parse_response(resp)
+            if m is not None:
+                m.observe(tr_id, time() - start)
+            _settle(breaker, resp, time())
+            err = None
+            if resp.status_code != 429:
+                try:
+                    if page is None:
+                        result: dict | tuple[dict, str] = _parse_response(resp)
+                    else:
+                        result = _check_response(resp), resp.headers.get("tr_cont", "")
+                except RateLimitError as e:  # EGW00201(초당 거래건수 초과)도 429처럼 감속 후 재시도
+                    err = e
+                else:
+                    if self.retry.hedge is not None:
+                        self._latency.add(time() - start)
+                    if self.adaptive:
+                        self._bucket.on_success(time())
+                    return result
+            if self.adaptive:
+                self._bucket.on_overload(time())
+            if not self._may_retry(attempt):
+                raise err or RateLimitError("429", "API 호출 한도 초과")
+            retry_after = resp.headers.get("Retry-After")
+            delay = float(retry_after or backoff(self.retry_delay, attempt, self.retry.jitter))
+            if m is not None:
+                m.retried(err.code if err else "429", delay)
+            sleep(delay)
         raise RateLimitError("429", "API 호출 한도 초과")
 
     def get(self, path: str, params: dict, tr_id: str) -> dict:
-        return self._request("get", path, tr_id, params=params)
+        if not self.coalesce and self.cache is None:
+            return self._fetch(path, params, tr_id)
+        key = _flight_key(path, params, tr_id)
+        if self.cache is not None and (hit := self.cache.get(key, time())) is not None:
+            return hit
+        if self.coalesce:
+            result = self._coalesced(key, path, params, tr_id)
+        else:
+            result = self._fetch(path, params, tr_id)
+        if self.cache is not None:
+            self.cache.put(key, result, time())
+        return result
+
+    def _coalesced(self, key: tuple, path: str, params: dict, tr_id: str) -> dict:
+        # 동일 (path, params, tr_id) 동시 요청은 하나의 HTTP 요청과 결과를 공유
+        with self._inflight_lock:
+            fut = self._inflight.get(key)
+            if leader := fut is None:
+                fut = self._inflight[key] = Future()
+        if not leader:
+            return fut.result()
+        try:
+            fut.set_result(self._fetch(path, params, tr_id))
+        except BaseException as e:
+            fut.set_exception(e)
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+        return fut.result()
+
+    def _fetch(self, path: str, params: dict, tr_id: str) -> dict:
+        if (hedge := self.retry.hedge) is None or tr_kind(tr_id) != "quote":
+            return self._request("get", path, tr_id, params=params)
+        return self._hedged(path, params, tr_id, hedge)
+
+    def _may_hedge(self, tr_id: str) -> bool:
+        # 중복 요청은 재시도로 취급: 슬롯이 바로 비어 있고 재시도 예산이 남을 때만
+        if any(lim.delay(time()) > 0 for lim in self._limiters(tr_id)):
+            return False
+        budget = self.retry.budget
+        return budget is None or budget.withdraw(time())
+
+    def _hedged(self, path: str, params: dict, tr_id: str, hedge: float) -> dict:
+        # 첫 요청이 슬롯을 받은 뒤 지연 백분위까지 응답이 없으면 같은 GET을 한 번 더 보냄
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(8, thread_name_prefix="kis-hedge")
+        delay = self._latency.percentile(hedge) or self.retry.hedge_delay
+        granted = threading.Event()
+        first = self._executor.submit(
+            self._request, "get", path, tr_id, granted=granted, params=params
+        )
+        first.add_done_callback(lambda _: granted.set())  # 슬롯 전에 실패한 경우
+        granted.wait()
+        try:
+            return first.result(timeout=delay)
+        except FutureTimeout:
+            pass
+        if not self._may_hedge(tr_id):
+            return first.result()
+        pending = {first, self._executor.submit(self._request, "get", path, tr_id, params=params)}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            if ok := [f for f in done if f.exception() is None]:
+                return ok[0].result()
+            if not pending:
+                return done.pop().result()
+
+    def page(self, path: str, params: dict, tr_id: str, cont: bool = False) -> tuple[dict, bool]:
+        """One page of a continued inquiry: (full response body, more pages follow).
+
+        cont=True requests the next page (tr_cont: N); pass the ctx_area_* values from the
+        previous body as CTX_AREA_* params. Not cached or coalesced.
+        """
+        data, tr_cont = self._request("get", path, tr_id, page="N" if cont else "", params=params)
+        return data, tr_cont in ("F", "M")
 
     def post(self, path: str, body: dict, tr_id: str) -> dict:
         return self._request("post", path, tr_id, json=body)
 
     def close(self):
-        self._client.close()
+        self._stop.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        if transport.release(self, self._client):
+            self._client.close()
 
     def __enter__(self):
         return self
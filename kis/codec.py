@@ -0,0 +1,27 @@
+"""JSON codec for the REST and WebSocket hot paths: orjson when installed, stdlib otherwise."""
+
+import json
+from collections.abc import Callable
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pip install kis-wrapper[fast]
+    orjson = None  # type: ignore[assignment]
+
+BACKENDS: dict[str, tuple[Callable[[str | bytes], Any], Callable[[Any], str]]] = {
+    "json": (json.loads, json.dumps),
+}
+if orjson is not None:
+    BACKENDS["orjson"] = (orjson.loads, lambda obj: orjson.dumps(obj).decode())
+
+backend = "orjson" if orjson is not None else "json"
+loads, dumps = BACKENDS[backend]
+
+
+def use(name: str) -> None:
+    """Force a backend ("json" or "orjson"). Callers must go through `codec.loads`/`codec.dumps`."""
+    global backend, loads, dumps
+    if name not in BACKENDS:
+        raise ValueError(f"JSON backend not available: {name}")
+    backend, (loads, dumps) = name, BACKENDS[name]
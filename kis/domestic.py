@@ -1,31 +1,77 @@
+from collections.abc import Iterable, Iterator
 from datetime import date
 
 from kis.client import KIS
-from kis.utils import ensure_list
+from kis.errors import SymbolError
+from kis.types import Orderbook, Quote
+from kis.utils import ensure_list, fan_out, paginate, then
+
+MULTI_MAX = 30  # FHKST11300006 1회 최대 종목 수
 
 
 def _tr(kis: KIS, paper: str, real: str) -> str:
     return paper if kis.is_paper else real
 
 
-def price(kis: KIS, symbol: str) -> dict:
-    return kis.get(
+def price(kis: KIS, symbol: str, typed: bool = False) -> dict | Quote:
+    resp = kis.get(
         "/uapi/domestic-stock/v1/quotations/inquire-price",
         {"FID_COND_MRKT_DIV_CODE": "J", "FID_INPUT_ISCD": symbol},
         "FHKST01010100",
     )
-
-
-def orderbook(kis: KIS, symbol: str) -> dict:
-    return kis.get(
+    return then(resp, Quote.parse) if typed else resp
+
+
+def prices(
+    kis: KIS, symbols: Iterable[str], typed: bool = False, concurrency: int = 8,
+    multi: bool = False,
+) -> tuple[dict, dict]:
+    """Quotes for many symbols: (results, errors) keyed by symbol. Coroutine for AsyncKIS.
+
+    multi=True uses the multi-symbol TR (FHKST11300006, 30 symbols per call, 실전 only);
+    its rows carry that TR's field names (inter2_prpr, ...).
+    """
+    if not multi:
+        return fan_out(kis, lambda s: price(kis, s, typed), symbols, concurrency)
+    symbols = list(dict.fromkeys(symbols))
+    chunks = [tuple(symbols[i:i + MULTI_MAX]) for i in range(0, len(symbols), MULTI_MAX)]
+    batch = fan_out(kis, lambda chunk: _multi_price(kis, chunk), chunks, concurrency)
+    return then(batch, lambda b: _split_multi(b, typed))
+
+
+def _multi_price(kis: KIS, symbols: tuple[str, ...]):
+    params = {}
+    for i, symbol in enumerate(symbols, 1):
+        params[f"FID_COND_MRKT_DIV_CODE_{i}"], params[f"FID_INPUT_ISCD_{i}"] = "J", symbol
+    return kis.get("/uapi/domestic-stock/v1/quotations/intstock-multprice", params, "FHKST11300006")
+
+
+def _split_multi(batch: tuple[dict, dict], typed: bool) -> tuple[dict, dict]:
+    # 묶음 결과를 종목별로 풀고, 실패한 묶음의 에러는 소속 종목 모두에 기록
+    results, errors = {}, {}
+    for chunk, resp in batch[0].items():
+        rows = {row.get("inter_shrn_iscd"): row for row in ensure_list(resp)}
+        for symbol in chunk:
+            if (row := rows.get(symbol)) is None:
+                errors[symbol] = SymbolError("NOT_FOUND", f"{symbol}: 멀티종목 응답에 없음")
+            else:
+                results[symbol] = Quote.parse_multi(row) if typed else row
+    for chunk, err in batch[1].items():
+        errors.update(dict.fromkeys(chunk, err))
+    return results, errors
+
+
+def orderbook(kis: KIS, symbol: str, typed: bool = False) -> dict | Orderbook:
+    resp = kis.get(
         "/uapi/domestic-stock/v1/quotations/inquire-asking-price-exp-ccn",
         {"FID_COND_MRKT_DIV_CODE": "J", "FID_INPUT_ISCD": symbol},
         "FHKST01010200",
     )
+    return then(resp, Orderbook.parse) if typed else resp
 
 
 def daily(kis: KIS, symbol: str, period: str = "D") -> list[dict]:
-    return ensure_list(
+    return then(
         kis.get(
             "/uapi/domestic-stock/v1/quotations/inquire-daily-price",
             {
@@ -35,7 +81,27 @@ def daily(kis: KIS, symbol: str, period: str = "D") -> list[dict]:
                 "FID_ORG_ADJ_PRC": "0",
             },
             "FHKST01010400",
-        )
+        ),
+        ensure_list,
+    )
+
+
+def daily_range(kis: KIS, symbol: str, start: str, end: str, period: str = "D") -> list[dict]:
+    """Bars between start and end (YYYYMMDD), newest first, at most 100 per call (FHKST03010100)."""
+    return then(
+        kis.get(
+            "/uapi/domestic-stock/v1/quotations/inquire-daily-itemchartprice",
+            {
+                "FID_COND_MRKT_DIV_CODE": "J",
+                "FID_INPUT_ISCD": symbol,
+                "FID_INPUT_DATE_1": start,
+                "FID_INPUT_DATE_2": end,
+                "FID_PERIOD_DIV_CODE": period,
+                "FID_ORG_ADJ_PRC": "0",
+            },
+            "FHKST03010100",
+        ),
+        lambda resp: ensure_list(resp, "output2") or ensure_list(resp),
     )
 
 
@@ -89,7 +155,11 @@ def modify(kis: KIS, order_no: str, qty: int, price: int) -> dict:
 
 
 def balance(kis: KIS) -> dict:
-    return kis.get(
+    return kis.get(*_balance_args(kis))
+
+
+def _balance_args(kis: KIS) -> tuple[str, dict, str]:
+    return (
         "/uapi/domestic-stock/v1/trading/inquire-balance",
         {
             **kis.account_params,
@@ -107,53 +177,76 @@ def balance(kis: KIS) -> dict:
     )
 
 
+def iter_positions(kis: KIS) -> Iterator[dict]:
+    """Holdings (balance output1) across every page. Async generator for AsyncKIS."""
+    return paginate(kis, *_balance_args(kis), "output1")
+
+
 def positions(kis: KIS) -> list[dict]:
-    return ensure_list(balance(kis), "output1")
+    return then(balance(kis), lambda resp: ensure_list(resp, "output1"))
 
 
 def orders(kis: KIS, start_date: str = "", end_date: str = "") -> list[dict]:
+    return then(kis.get(*_orders_args(kis, start_date, end_date)), ensure_list)
+
+
+def _orders_args(kis: KIS, start_date: str, end_date: str) -> tuple[str, dict, str]:
     today = date.today().strftime("%Y%m%d")
-    return ensure_list(
-        kis.get(
-            "/uapi/domestic-stock/v1/trading/inquire-daily-ccld",
-            {
-                **kis.account_params,
-                "INQR_STRT_DT": start_date or today,
-                "INQR_END_DT": end_date or today,
-                "SLL_BUY_DVSN_CD": "00",
-                "INQR_DVSN": "00",
-                "PDNO": "",
-                "CCLD_DVSN": "00",
-                "ORD_GNO_BRNO": "",
-                "ODNO": "",
-                "INQR_DVSN_3": "00",
-                "INQR_DVSN_1": "",
-                "CTX_AREA_FK100": "",
-                "CTX_AREA_NK100": "",
-            },
-            _tr(kis, "VTTC8001R", "TTTC8001R"),
-        )
+    return (
+        "/uapi/domestic-stock/v1/trading/inquire-daily-ccld",
+        {
+            **kis.account_params,
+            "INQR_STRT_DT": start_date or today,
+            "INQR_END_DT": end_date or today,
+            "SLL_BUY_DVSN_CD": "00",
+            "INQR_DVSN": "00",
+            "PDNO": "",
+            "CCLD_DVSN": "00",
+            "ORD_GNO_BRNO": "",
+            "ODNO": "",
+            "INQR_DVSN_3": "00",
+            "INQR_DVSN_1": "",
+            "CTX_AREA_FK100": "",
+            "CTX_AREA_NK100": "",
+        },
+        _tr(kis, "VTTC8001R", "TTTC8001R"),
     )
 
 
+def iter_orders(kis: KIS, start_date: str = "", end_date: str = "") -> Iterator[dict]:
+    """Executions (output1) across every page. Async generator for AsyncKIS."""
+    return paginate(kis, *_orders_args(kis, start_date, end_date), "output1")
+
+
 def pending_orders(kis: KIS) -> list[dict]:
-    return ensure_list(
-        kis.get(
-            "/uapi/domestic-stock/v1/trading/inquire-psbl-rvsecncl",
-            {
-                **kis.account_params,
-                "INQR_DVSN_1": "0",
-                "INQR_DVSN_2": "0",
-                "CTX_AREA_FK100": "",
-                "CTX_AREA_NK100": "",
-            },
-            _tr(kis, "VTTC8036R", "TTTC8036R"),
-        )
+    return then(kis.get(*_pending_args(kis)), ensure_list)
+
+
+def _pending_args(kis: KIS) -> tuple[str, dict, str]:
+    return (
+        "/uapi/domestic-stock/v1/trading/inquire-psbl-rvsecncl",
+        {
+            **kis.account_params,
+            "INQR_DVSN_1": "0",
+            "INQR_DVSN_2": "0",
+            "CTX_AREA_FK100": "",
+            "CTX_AREA_NK100": "",
+        },
+        _tr(kis, "VTTC8036R", "TTTC8036R"),
     )
 
 
+def iter_pending_orders(kis: KIS) -> Iterator[dict]:
+    """Modifiable/cancellable orders across every page. Async generator for AsyncKIS."""
+    return paginate(kis, *_pending_args(kis), "output")
+
+
 def position(kis: KIS, symbol: str) -> dict | None:
-    p = next((p for p in positions(kis) if p["pdno"] == symbol), None)
+    return then(positions(kis), lambda ps: _position(ps, symbol))
+
+
+def _position(positions: list[dict], symbol: str) -> dict | None:
+    p = next((p for p in positions if p["pdno"] == symbol), None)
     if not p:
         return None
     return {
@@ -170,7 +263,10 @@ def position(kis: KIS, symbol: str) -> dict | None:
 
 
 def sell_all(kis: KIS, symbol: str) -> dict:
-    p = position(kis, symbol)
+    return then(position(kis, symbol), lambda p: _sell_all(kis, symbol, p))
+
+
+def _sell_all(kis: KIS, symbol: str, p: dict | None) -> dict:
     if not p or p["qty"] == 0:
         raise ValueError(f"No position for {symbol}")
     return sell(kis, symbol, qty=p["qty"])
@@ -0,0 +1,120 @@
+"""Request metrics for KIS/AsyncKIS: where a call's time goes, exportable as Prometheus text.
+
+Pass one `Metrics` to any number of clients (`metrics=`). Recording is a few dict updates under
+a lock per request; clients without metrics skip it entirely. Compare `throttle.seconds` with the
+sum of `requests.*.sum` to tell whether the process is throttle-bound or network-bound.
+"""
+
+import threading
+import weakref
+from bisect import bisect_left
+
+# 초 단위 상한 (Prometheus 기본 버킷)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metrics:
+    """Per-tr_id latency histograms, throttle/backoff time, retries, errors and breaker states."""
+
+    __slots__ = ("buckets", "_latency", "_counters", "_retries", "_errors", "_clients", "_lock")
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._latency: dict[str, list] = {}  # tr_id -> [버킷별 count..., +Inf count, sum]
+        self._counters = {"throttle_waits": 0, "throttle_seconds": 0.0,
+                          "backoff_sleeps": 0, "backoff_seconds": 0.0}
+        self._retries: dict[str, int] = {}
+        self._errors: dict[str, int] = {}
+        self._clients: weakref.WeakSet = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def bind(self, client) -> None:
+        """Report client's circuit breaker states (called by the client constructor)."""
+        self._clients.add(client)
+
+    def observe(self, tr_id: str, seconds: float) -> None:
+        """One HTTP round trip (any status), excluding throttle, backoff and token issuance."""
+        with self._lock:
+            if (h := self._latency.get(tr_id)) is None:
+                h = self._latency[tr_id] = [0] * (len(self.buckets) + 1) + [0.0]
+            h[bisect_left(self.buckets, seconds)] += 1
+            h[-1] += seconds
+
+    def throttled(self, seconds: float) -> None:
+        with self._lock:
+            self._counters["throttle_waits"] += 1
+            self._counters["throttle_seconds"] += seconds
+
+    def retried(self, reason: str, seconds: float) -> None:
+        """A retry after `reason` ('network', '429', 'EGW00201', 'token'), sleeping `seconds`."""
+        with self._lock:
+            self._retries[reason] = self._retries.get(reason, 0) + 1
+            if seconds > 0:
+                self._counters["backoff_sleeps"] += 1
+                self._counters["backoff_seconds"] += seconds
+
+    def error(self, exc: BaseException) -> None:
+        """A request that finally raised, counted by exception class."""
+        name = type(exc).__name__
+        with self._lock:
+            self._errors[name] = self._errors.get(name, 0) + 1
+
+    def snapshot(self) -> dict:
+        """Point-in-time copy; histogram buckets are cumulative like Prometheus."""
+        with self._lock:
+            requests = {}
+            for tr_id, h in self._latency.items():
+                total, cumulative = 0, {}
+                for bound, n in zip((*self.buckets, float("inf")), h):
+                    total += n
+                    cumulative[bound] = total
+                requests[tr_id] = {"count": total, "sum": h[-1], "buckets": cumulative}
+            c = self._counters
+            snap = {
+                "requests": requests,
+                "throttle": {"waits": c["throttle_waits"], "seconds": c["throttle_seconds"]},
+                "backoff": {"sleeps": c["backoff_sleeps"], "seconds": c["backoff_seconds"]},
+                "retries": dict(self._retries),
+                "errors": dict(self._errors),
+            }
+        circuits: dict[str, str] = {}
+        for client in list(self._clients):
+            for group, state in client.circuit_states().items():
+                if circuits.get(group, "closed") == "closed":  # 여러 클라이언트 중 나쁜 쪽
+                    circuits[group] = state
+        snap["circuits"] = circuits
+        return snap
+
+    def prometheus(self, prefix: str = "kis") -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        snap = self.snapshot()
+        out: list[str] = []
+
+        def family(name: str, kind: str, help_: str) -> None:
+            out.extend((f"# HELP {prefix}_{name} {help_}", f"# TYPE {prefix}_{name} {kind}"))
+
+        family("request_duration_seconds", "histogram", "HTTP round trip per tr_id.")
+        hist = f"{prefix}_request_duration_seconds"
+        for tr_id, h in sorted(snap["requests"].items()):
+            for bound, n in h["buckets"].items():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                out.append(f'{hist}_bucket{{tr_id="{tr_id}",le="{le}"}} {n}')
+            out.append(f'{hist}_sum{{tr_id="{tr_id}"}} {h["sum"]!r}')
+            out.append(f'{hist}_count{{tr_id="{tr_id}"}} {h["count"]}')
+        for name, key, help_ in (("throttle", "waits", "Requests that waited for a throttle slot."),
+                                 ("backoff", "sleeps", "Sleeps before a retry.")):
+            family(f"{name}_{key}_total", "counter", help_)
+            out.append(f"{prefix}_{name}_{key}_total {snap[name][key]}")
+            family(f"{name}_seconds_total", "counter", f"Time spent in {name} waits.")
+            out.append(f"{prefix}_{name}_seconds_total {snap[name]['seconds']!r}")
+        family("retries_total", "counter", "Retries by reason.")
+        out.extend(f'{prefix}_retries_total{{reason="{r}"}} {n}'
+                   for r, n in sorted(snap["retries"].items()))
+        family("errors_total", "counter", "Failed requests by exception class.")
+        out.extend(f'{prefix}_errors_total{{error="{e}"}} {n}'
+                   for e, n in sorted(snap["errors"].items()))
+        family("circuit_state", "gauge", "Circuit breaker state: 0 closed, 1 open, 2 half_open.")
+        codes = {"closed": 0, "open": 1, "half_open": 2}
+        out.extend(f'{prefix}_circuit_state{{group="{g}"}} {codes[s]}'
+                   for g, s in sorted(snap["circuits"].items()))
+        return "\n".join(out) + "\n"
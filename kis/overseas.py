@@ -1,6 +1,8 @@
+from collections.abc import Iterable, Iterator
+
 from kis.client import KIS
-from kis.types import Exchange
-from kis.utils import ensure_list
+from kis.types import Exchange, OverseasQuote
+from kis.utils import ensure_list, fan_out, paginate, then
 
 _TR_BUY = {
     "NAS": "JTTT1002U",
@@ -53,16 +55,30 @@ def _output_list(result: object) -> list:
     return ensure_list(result) or ensure_list(result, "output")
 
 
-def price(kis: KIS, symbol: str, exchange: Exchange) -> dict:
-    return kis.get(
+def price(kis: KIS, symbol: str, exchange: Exchange, typed: bool = False) -> dict | OverseasQuote:
+    resp = kis.get(
         "/uapi/overseas-price/v1/quotations/price",
         {"AUTH": "", "EXCD": exchange, "SYMB": symbol},
         "HHDFS00000300",
     )
+    return then(resp, OverseasQuote.parse) if typed else resp
+
+
+def prices(
+    kis: KIS, symbols: Iterable[tuple[str, Exchange]], typed: bool = False, concurrency: int = 8
+) -> tuple[dict, dict]:
+    """Quotes for many (symbol, exchange) pairs: (results, errors) keyed by the pair.
+
+    Coroutine for AsyncKIS. There is no multi-symbol overseas quote TR, so each pair is one call.
+    """
+    return fan_out(kis, lambda key: price(kis, key[0], key[1], typed), symbols, concurrency)
 
 
-def daily(kis: KIS, symbol: str, exchange: Exchange, period: str = "D", count: int = 30) -> list:
-    return ensure_list(
+def daily(
+    kis: KIS, symbol: str, exchange: Exchange, period: str = "D", count: int = 30, end: str = ""
+) -> list:
+    """Bars up to `end` (YYYYMMDD, default latest), newest first, about 100 per call."""
+    return then(
         kis.get(
             "/uapi/overseas-price/v1/quotations/dailyprice",
             {
@@ -70,11 +86,12 @@ def daily(kis: KIS, symbol: str, exchange: Exchange, period: str = "D", count: i
                 "EXCD": exchange,
                 "SYMB": symbol,
                 "GUBN": {"D": "0", "W": "1", "M": "2"}.get(period, "0"),
-                "BYMD": "",
+                "BYMD": end,
                 "MODP": "1",
             },
             "HHDFS76240000",
-        )
+        ),
+        lambda resp: ensure_list(resp) or ensure_list(resp, "output2"),
     )
 
 
@@ -110,7 +127,11 @@ def cancel(kis: KIS, exchange: Exchange, order_no: str, qty: int) -> dict:
 
 
 def balance(kis: KIS, exchange: Exchange | None = None) -> dict:
-    return kis.get(
+    return kis.get(*_balance_args(kis, exchange))
+
+
+def _balance_args(kis: KIS, exchange: Exchange | None) -> tuple[str, dict, str]:
+    return (
         "/uapi/overseas-stock/v1/trading/inquire-balance",
         {
             **kis.account_params,
@@ -146,47 +167,72 @@ def modify(kis: KIS, exchange: Exchange, order_no: str, qty: int, price: float)
 
 
 def orders(kis: KIS, exchange: Exchange | None = None) -> list:
-    return _output_list(
-        kis.get(
-            "/uapi/overseas-stock/v1/trading/inquire-ccnl",
-            {
-                **kis.account_params,
-                "OVRS_EXCG_CD": exchange or "",
-                "SORT_SQN": "DS",
-                "CTX_AREA_FK200": "",
-                "CTX_AREA_NK200": "",
-            },
-            "VTTS3035R" if kis.is_paper else "TTTS3035R",
-        )
+    return then(kis.get(*_orders_args(kis, exchange)), _output_list)
+
+
+def _orders_args(kis: KIS, exchange: Exchange | None) -> tuple[str, dict, str]:
+    return (
+        "/uapi/overseas-stock/v1/trading/inquire-ccnl",
+        {
+            **kis.account_params,
+            "OVRS_EXCG_CD": exchange or "",
+            "SORT_SQN": "DS",
+            "CTX_AREA_FK200": "",
+            "CTX_AREA_NK200": "",
+        },
+        "VTTS3035R" if kis.is_paper else "TTTS3035R",
     )
 
 
+def iter_orders(kis: KIS, exchange: Exchange | None = None) -> Iterator[dict]:
+    """Executions across every page. Async generator for AsyncKIS."""
+    return paginate(kis, *_orders_args(kis, exchange), "output")
+
+
 def pending_orders(kis: KIS, exchange: Exchange | None = None) -> list:
-    return _output_list(
-        kis.get(
-            "/uapi/overseas-stock/v1/trading/inquire-nccs",
-            {
-                **kis.account_params,
-                "OVRS_EXCG_CD": exchange or "",
-                "SORT_SQN": "DS",
-                "CTX_AREA_FK200": "",
-                "CTX_AREA_NK200": "",
-            },
-            "VTTS3018R" if kis.is_paper else "TTTS3018R",
-        )
+    return then(kis.get(*_pending_args(kis, exchange)), _output_list)
+
+
+def _pending_args(kis: KIS, exchange: Exchange | None) -> tuple[str, dict, str]:
+    return (
+        "/uapi/overseas-stock/v1/trading/inquire-nccs",
+        {
+            **kis.account_params,
+            "OVRS_EXCG_CD": exchange or "",
+            "SORT_SQN": "DS",
+            "CTX_AREA_FK200": "",
+            "CTX_AREA_NK200": "",
+        },
+        "VTTS3018R" if kis.is_paper else "TTTS3018R",
     )
 
 
+def iter_pending_orders(kis: KIS, exchange: Exchange | None = None) -> Iterator[dict]:
+    """Unfilled orders across every page. Async generator for AsyncKIS."""
+    return paginate(kis, *_pending_args(kis, exchange), "output")
+
+
+def iter_positions(kis: KIS, exchange: Exchange | None = None) -> Iterator[dict]:
+    """Holdings (balance output1) across every page. Async generator for AsyncKIS."""
+    return paginate(kis, *_balance_args(kis, exchange), "output1")
+
+
 def positions(kis: KIS, exchange: Exchange | None = None) -> list:
-    return ensure_list(balance(kis, exchange), "output1")
+    return then(balance(kis, exchange), lambda resp: ensure_list(resp, "output1"))
 
 
 def position(kis: KIS, symbol: str, exchange: Exchange) -> dict | None:
-    return next((p for p in positions(kis, exchange) if p.get("ovrs_pdno") == symbol), None)
+    return then(
+        positions(kis, exchange),
+        lambda ps: next((p for p in ps if p.get("ovrs_pdno") == symbol), None),
+    )
 
 
 def sell_all(kis: KIS, symbol: str, exchange: Exchange) -> dict | None:
-    pos = position(kis, symbol, exchange)
+    return then(position(kis, symbol, exchange), lambda p: _sell_all(kis, symbol, exchange, p))
+
+
+def _sell_all(kis: KIS, symbol: str, exchange: Exchange, pos: dict | None) -> dict | None:
     if not pos or (qty := int(pos.get("ovrs_cblc_qty", 0))) <= 0:
         return None
     return sell(kis, symbol, exchange, qty)
@@ -0,0 +1,87 @@
+"""Several app keys behind one client: quote traffic load-balanced, account/order calls pinned."""
+
+import inspect
+import itertools
+from collections.abc import Sequence
+from time import time
+
+from kis.async_client import AsyncKIS
+from kis.client import KIS
+from kis.resilience import tr_kind
+
+
+class KISPool:
+    """Duck-types as KIS/AsyncKIS for the domestic/overseas modules.
+
+    Quote GETs go to the member whose limiters free up first (ties rotate), so quote throughput
+    grows with the number of keys. Account and order TRs always use `primary`, the key that owns
+    the account. Each member keeps its own token, limiter, cache and circuit breakers.
+    """
+
+    __slots__ = ("clients", "primary", "_rr")
+
+    def __init__(self, clients: Sequence[KIS | AsyncKIS], primary: int = 0):
+        if not clients:
+            raise ValueError("KISPool needs at least one client")
+        self.clients, self.primary = tuple(clients), clients[primary]
+        self._rr = itertools.count()
+
+    @property
+    def env(self):
+        return self.primary.env
+
+    @property
+    def account(self) -> str:
+        return self.primary.account
+
+    @property
+    def is_paper(self) -> bool:
+        return self.primary.is_paper
+
+    @property
+    def account_params(self) -> dict:
+        return self.primary.account_params
+
+    def _pick(self, tr_id: str) -> KIS | AsyncKIS:
+        if tr_kind(tr_id) != "quote" or len(self.clients) == 1:
+            return self.primary
+        now, n = time(), len(self.clients)
+        start = next(self._rr) % n
+        best, best_delay = self.primary, float("inf")
+        for i in range(start, start + n):  # 남은 한도가 가장 많은(대기가 가장 짧은) 키
+            c = self.clients[i % n]
+            if (delay := max(lim.delay(now) for lim in c._limiters(tr_id))) <= 0:
+                return c
+            if delay < best_delay:
+                best, best_delay = c, delay
+        return best
+
+    def get(self, path: str, params: dict, tr_id: str):
+        return self._pick(tr_id).get(path, params, tr_id)
+
+    def page(self, path: str, params: dict, tr_id: str, cont: bool = False):
+        return self.primary.page(path, params, tr_id, cont)  # 연속조회는 계좌 TR
+
+    def post(self, path: str, body: dict, tr_id: str):
+        return self.primary.post(path, body, tr_id)
+
+    def close(self):
+        """Close every member. Returns an awaitable when members are AsyncKIS."""
+        pending = [r for c in self.clients if inspect.isawaitable(r := c.close())]
+        if pending:
+            async def _wait():
+                for r in pending:
+                    await r
+            return _wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
@@ -1,9 +1,18 @@
 """Resilience utilities: throttle & circuit breaker."""
 
+import hashlib
+import os
+import random
+import struct
+import tempfile
+import threading
 from collections import deque
+from pathlib import Path
+from typing import NamedTuple
 
 # Circuit breaker states
 CB_CLOSED, CB_OPEN, CB_HALF_OPEN = 0, 1, 2
+CB_NAMES = ("closed", "open", "half_open")
 
 
 def throttle_wait(ts: deque, rate: int, now: float) -> float:
@@ -31,3 +40,281 @@ def cb_on_failure(failures: int, threshold: int, recovery: float, now: float) ->
     """Record failure. Returns (new_failures, new_open_until)."""
     failures += 1
     return (failures, now + recovery) if failures >= threshold else (failures, 0.0)
+
+
+def endpoint_group(path: str, tr_id: str) -> str:
+    """Breaker key: 'overseas' or 'domestic-order' / 'domestic-account' / 'domestic-quote'."""
+    return "overseas" if "/overseas" in path else f"domestic-{tr_kind(tr_id)}"
+
+
+class CircuitBreaker:
+    """Breaker for one endpoint group. Half-open admits a single probe; other requests fail fast
+    until it settles (or until `recovery` seconds pass without an answer)."""
+
+    __slots__ = ("threshold", "recovery", "failures", "open_until", "_probe_at", "_lock")
+
+    def __init__(self, threshold: int, recovery: float):
+        self.threshold, self.recovery = threshold, recovery
+        self.failures, self.open_until, self._probe_at = 0, 0.0, 0.0
+        self._lock = threading.Lock()
+
+    def state(self, now: float) -> int:
+        return cb_state(self.failures, self.threshold, self.open_until, now)
+
+    def allow(self, now: float) -> bool:
+        if self.failures < self.threshold or self.threshold <= 0:
+            return True
+        with self._lock:
+            if self.state(now) != CB_HALF_OPEN or now - self._probe_at < self.recovery:
+                return False
+            self._probe_at = now  # 이 요청이 probe
+            return True
+
+    def on_success(self) -> None:
+        self.failures, self._probe_at = 0, 0.0
+
+    def release(self) -> None:
+        """Give up the half-open probe without a verdict (429), so the next request may probe."""
+        self._probe_at = 0.0
+
+    def on_failure(self, now: float) -> None:
+        with self._lock:
+            self.failures, self.open_until = cb_on_failure(
+                self.failures, self.threshold, self.recovery, now
+            )
+            self._probe_at = 0.0
+
+
+def backoff(delay: float, attempt: int, jitter: bool = False) -> float:
+    """Exponential backoff. Full jitter draws uniformly from [0, delay * 2**attempt]."""
+    cap = delay * (2 ** attempt)
+    return random.uniform(0, cap) if jitter else cap
+
+
+class RetryBudget:
+    """Caps retries at `ratio` of requests (plus `min_per_sec`) so retries cannot amplify an outage.
+
+    Each request deposits `ratio`, each retry withdraws 1. Share one budget across clients to
+    make it process-wide.
+    """
+
+    __slots__ = ("ratio", "min_per_sec", "max_balance", "_balance", "_t")
+
+    def __init__(self, ratio: float = 0.1, min_per_sec: float = 1.0, max_balance: float = 10.0):
+        self.ratio, self.min_per_sec, self.max_balance = ratio, min_per_sec, max_balance
+        self._balance, self._t = max_balance, 0.0
+
+    def deposit(self) -> None:
+        self._balance = min(self.max_balance, self._balance + self.ratio)
+
+    def withdraw(self, now: float) -> bool:
+        """Take one retry from the budget. False if exhausted (fail fast instead)."""
+        refill = (now - self._t) * self.min_per_sec if self._t else 0.0
+        self._balance, self._t = min(self.max_balance, self._balance + refill), now
+        if self._balance < 1.0:
+            return False
+        self._balance -= 1.0
+        return True
+
+
+class RetryPolicy(NamedTuple):
+    jitter: bool = False  # full jitter
+    budget: RetryBudget | None = None  # None: 제한 없음
+    hedge: float | None = None  # 시세 GET 지연 백분위 (예: 0.95) 경과 시 중복 요청, None: 끔
+    hedge_delay: float = 0.2  # 지연 표본이 부족할 때 쓰는 hedge 대기 시간
+
+
+class LatencyWindow:
+    """Latencies of the last `size` successful requests, for the hedge delay percentile."""
+
+    __slots__ = ("_samples",)
+
+    MIN_SAMPLES = 20
+
+    def __init__(self, size: int = 256):
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, p: float) -> float | None:
+        """p-th percentile (0..1), or None until MIN_SAMPLES latencies are recorded."""
+        if len(self._samples) < self.MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[int(p * (len(ordered) - 1))]
+
+
+def gcra(tat: float, rate: float, burst: int, now: float) -> tuple[float, float]:
+    """Token bucket as a single timestamp (GCRA). Returns (wait, new_tat); the slot is reserved."""
+    interval = 1.0 / rate
+    tat = max(tat, now)
+    return max(0.0, tat - (burst - 1) * interval - now), tat + interval
+
+
+def tr_kind(tr_id: str) -> str:
+    """Classify a TR: 'order' (…U 주문/정정/취소), 'account' (…R 계좌 조회), else 'quote' (시세)."""
+    return "order" if tr_id.endswith("U") else "account" if tr_id.endswith("R") else "quote"
+
+
+class TokenBucket:
+    """In-process token bucket (GCRA): O(1) per request, up to `burst` requests back to back."""
+
+    __slots__ = ("rate", "burst", "_tat", "_lock")
+
+    def __init__(self, rate: int, burst: int | None = None):
+        self.rate: float = rate  # AdaptiveBucket은 소수 rate로 조정
+        self.burst, self._tat = burst or max(rate, 1), 0.0
+        self._lock = threading.Lock()  # 스레드 풀(prices 등)에서 동시에 예약해도 슬롯 유실 없음
+
+    def wait(self, now: float) -> float:
+        """Reserve a slot. Returns seconds to sleep before sending (0 if ok)."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            wait, self._tat = gcra(self._tat, self.rate, self.burst, now)
+        return wait
+
+    def delay(self, now: float) -> float:
+        """Seconds until a slot is free, without reserving it."""
+        return gcra(self._tat, self.rate, self.burst, now)[0] if self.rate > 0 else 0.0
+
+    def on_overload(self, now: float) -> None:
+        """Server feedback hook (429/EGW00201); a fixed-rate bucket ignores it."""
+
+    def on_success(self, now: float) -> None:
+        """Server feedback hook (successful response); a fixed-rate bucket ignores it."""
+
+
+class AdaptiveBucket(TokenBucket):
+    """TokenBucket whose rate follows AIMD between `floor` and the initial rate.
+
+    on_overload (429/EGW00201) multiplies the rate by `factor`; each second of successful traffic
+    adds `step` back, so the bucket settles just under the server's real per-key limit.
+    """
+
+    __slots__ = ("ceiling", "floor", "step", "factor", "max_burst", "_changed")
+
+    def __init__(
+        self, rate: int, burst: int | None = None, floor: float = 1.0, step: float = 1.0,
+        factor: float = 0.5,
+    ):
+        super().__init__(rate, burst)
+        self.ceiling, self.floor, self.step, self.factor = rate, floor, step, factor
+        self.max_burst, self._changed = self.burst, 0.0
+
+    def _set(self, rate: float, now: float) -> None:
+        self.rate, self._changed = rate, now
+        self.burst = max(1, min(self.max_burst, int(rate)))
+
+    def on_overload(self, now: float) -> None:
+        # 같은 1초 창의 후속 신호(이미 보낸 요청들)로 연달아 줄이지 않음
+        if self.ceiling > 0 and now - self._changed >= 1.0:
+            self._set(max(self.floor, self.rate * self.factor), now)
+
+    def on_success(self, now: float) -> None:
+        if self.rate < self.ceiling and now - self._changed >= 1.0:
+            self._set(min(self.ceiling, self.rate + self.step), now)
+
+
+def order_buckets(
+    rate: int, burst: int | None, reserve: int, limiter: "SharedLimiter | None" = None
+) -> dict:
+    """Buckets for non-order TRs capped at rate - reserve: quotes can never take the order share.
+
+    With a SharedLimiter the cap is taken from it and shared across processes as well, so the
+    quotes of all workers together still leave `reserve` per second for orders.
+    """
+    if limiter is not None:
+        rate = limiter.rate
+    if reserve <= 0 or rate <= 0:
+        return {}
+    if limiter is not None:
+        shared: TokenBucket | SharedLimiter = limiter.reserving(reserve)
+    else:
+        shared = TokenBucket(max(1, rate - reserve), burst)
+    return {"quote": shared, "account": shared}
+
+
+class SharedLimiter:
+    """Rate limiter shared by every process on the host via a locked file, keyed by (env, app_key).
+
+    POSIX only (fcntl). Pass as `limiter=` to KIS/AsyncKIS so that all workers on one app key
+    stay within `rate` requests per second together.
+    """
+
+    __slots__ = (
+        "env", "app_key", "rate", "burst", "directory", "name", "path", "_fd", "_pid", "_lock",
+    )
+
+    def __init__(
+        self, env: str, app_key: str, rate: int = 20, burst: int | None = None,
+        directory: str | None = None, name: str = "throttle",
+    ):
+        self.env, self.app_key, self.rate, self.burst = env, app_key, rate, burst or rate
+        self.directory, self.name = directory, name
+        root = Path(directory or tempfile.gettempdir()) / "kis-wrapper"
+        root.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256(app_key.encode()).hexdigest()[:16]
+        self.path = root / f"{name}-{env}-{digest}"
+        self._fd, self._pid = -1, 0
+        # flock은 같은 fd를 쓰는 스레드끼리는 배타가 아님: 프로세스 안은 이 잠금으로 직렬화
+        self._lock = threading.Lock()
+
+    def switch(self, env: str) -> "SharedLimiter":
+        return SharedLimiter(env, self.app_key, self.rate, self.burst, self.directory, self.name)
+
+    def reserving(self, reserve: int) -> "SharedLimiter":
+        """Host-wide limiter at rate - reserve (own lock file) for the non-order share."""
+        rate = max(1, self.rate - reserve)
+        return SharedLimiter(
+            self.env, self.app_key, rate, min(self.burst, rate), self.directory,
+            f"{self.name}-r{reserve}",
+        )
+
+    def _open(self) -> int:
+        # flock은 open file description 단위라 fork 후에는 다시 열어야 프로세스 간 배타가 보장됨
+        if self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._pid = os.getpid()
+        return self._fd
+
+    def wait(self, now: float) -> float:
+        """Reserve a slot. Returns seconds to sleep before sending (0 if ok)."""
+        import fcntl
+
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            fd = self._open()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                raw = os.pread(fd, 8, 0)
+                tat = struct.unpack("d", raw)[0] if len(raw) == 8 else 0.0
+                wait, tat = gcra(tat, self.rate, self.burst, now)
+                os.pwrite(fd, struct.pack("d", tat), 0)
+                return wait
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def delay(self, now: float) -> float:
+        """Seconds until a slot is free, without reserving it."""
+        import fcntl
+
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:  # 다른 스레드의 LOCK_UN이 진행 중인 LOCK_EX를 풀지 않도록
+            fd = self._open()
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            try:
+                raw = os.pread(fd, 8, 0)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        tat = struct.unpack("d", raw)[0] if len(raw) == 8 else 0.0
+        return gcra(tat, self.rate, self.burst, now)[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pid == os.getpid():
+                os.close(self._fd)
+            self._fd, self._pid = -1, 0
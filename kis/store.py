@@ -0,0 +1,121 @@
+"""On-disk daily bar store: one columnar file per symbol, read through mmap without copying.
+
+File layout (native byte order): 32-byte header (magic, version, count, first date, last date),
+then `count` int64 dates ascending, then open/high/low/close as float64 and volume as int64,
+each column contiguous. 48 bytes per bar, so 10 years x 2,000 symbols is about 240 MB on disk
+and only the pages actually touched are read. Columns come back as memoryviews: slice or index
+them directly, or wrap with `numpy.asarray(col)` (zero-copy) when NumPy is around.
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable
+from pathlib import Path
+from typing import NamedTuple
+
+from kis.types import Candle
+
+_HEADER = struct.Struct("=4sIqqq")
+_MAGIC, _VERSION = b"KISB", 1
+_CODES = "qddddq"
+
+
+class Columns(NamedTuple):
+    """Zero-copy column views of one symbol, dates ascending."""
+
+    date: memoryview
+    open: memoryview
+    high: memoryview
+    low: memoryview
+    close: memoryview
+    volume: memoryview
+
+    def __len__(self) -> int:
+        return len(self.date)
+
+    def candles(self) -> list[Candle]:
+        return [Candle(*row) for row in zip(*self)]
+
+
+_EMPTY = Columns(*(memoryview(array(code)) for code in _CODES))
+
+
+def _filename(key: str) -> str:
+    return key.replace(":", "_") + ".bin"  # "NAS:AAPL" -> NAS_AAPL.bin
+
+
+def _key(filename: str) -> str:
+    return filename.removesuffix(".bin").replace("_", ":", 1)
+
+
+def _columns(mm: mmap.mmap) -> Columns:
+    # 오프셋은 매핑한 파일 자신의 헤더 기준 (다른 Store/쓰기가 파일을 교체했을 수 있음)
+    count = _HEADER.unpack_from(mm)[2]
+    view = memoryview(mm)[_HEADER.size:]
+    return Columns(*(view[i * 8 * count:(i + 1) * 8 * count].cast(code)  # type: ignore[call-overload]
+                     for i, code in enumerate(_CODES)))
+
+
+class Store:
+    """Daily bars per symbol key ('005930', 'NAS:AAPL') under `root`.
+
+    index: key -> (first date, last date, count), read from file headers on open.
+    `write` fits `backfill.backfill` as the sink: bars are merged by date, so re-delivered pages
+    overwrite instead of duplicating.
+    """
+
+    __slots__ = ("root", "index", "_maps", "_lock")
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index: dict[str, tuple[int, int, int]] = {}
+        self._maps: dict[str, mmap.mmap] = {}
+        self._lock = threading.RLock()  # write가 잠금 안에서 read 호출
+        for entry in os.scandir(self.root):
+            if entry.name.endswith(".bin"):
+                with open(entry.path, "rb") as f:
+                    magic, _, count, first, last = _HEADER.unpack(f.read(_HEADER.size))
+                if magic == _MAGIC:
+                    self.index[_key(entry.name)] = (first, last, count)
+
+    def read(self, key: str, start: int = 0, end: int = 0) -> Columns:
+        """Bars with start <= date <= end (YYYYMMDD ints, 0 = unbounded); empty if unknown."""
+        with self._lock:
+            if key not in self.index:
+                return _EMPTY
+            if (mm := self._maps.get(key)) is None:
+                with open(self.root / _filename(key), "rb") as f:
+                    mm = self._maps[key] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        cols = _columns(mm)
+        lo = bisect_left(cols.date, start) if start else 0
+        hi = bisect_right(cols.date, end) if end else len(cols)
+        return Columns(*(col[lo:hi] for col in cols))
+
+    def write(self, key: str, bars: Iterable[Candle]) -> None:
+        """Merge bars into key's file (same date overwrites) and replace it atomically."""
+        with self._lock:
+            merged = {c.date: c for c in self.read(key).candles()}
+            merged.update((c.date, c) for c in bars)
+            if not merged:
+                return
+            rows = [merged[d] for d in sorted(merged)]
+            body = b"".join(array(code, col).tobytes() for code, col in zip(_CODES, zip(*rows)))
+            header = _HEADER.pack(_MAGIC, _VERSION, len(rows), rows[0].date, rows[-1].date)
+            fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".store-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(header + body)
+            os.replace(tmp, self.root / _filename(key))
+            # 기존 mmap은 닫지 않음: 이미 넘겨준 view가 옛 파일을 계속 참조
+            self._maps.pop(key, None)
+            self.index[key] = (rows[0].date, rows[-1].date, len(rows))
+
+    def close(self) -> None:
+        """Drop cached maps; each is unmapped once no returned view refers to it."""
+        with self._lock:
+            self._maps.clear()
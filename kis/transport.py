@@ -0,0 +1,102 @@
+"""Shared HTTP transport: one connection pool per (base URL, config), reused across clients.
+
+Async pools are also keyed by event loop: an httpx.AsyncClient's connections belong to the loop
+that opened them and fail once that loop is closed (e.g. a second `asyncio.run`).
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Literal, NamedTuple, overload
+
+import httpx
+
+from kis.auth import Env, _base_url
+
+
+class PoolConfig(NamedTuple):
+    max_connections: int = 100
+    max_keepalive: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False  # requires `pip install httpx[http2]`
+    timeout: float = 10.0
+
+
+# (base_url, config, is_async, loop) -> (client, owners); loop는 sync면 None
+_pools: dict[tuple, tuple[httpx.Client | httpx.AsyncClient, weakref.WeakSet]] = {}
+_lock = threading.Lock()
+
+
+def _build(env: Env, config: PoolConfig, is_async: bool) -> httpx.Client | httpx.AsyncClient:
+    return (httpx.AsyncClient if is_async else httpx.Client)(
+        base_url=_base_url(env),
+        timeout=config.timeout,
+        http2=config.http2,
+        limits=httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive,
+            keepalive_expiry=config.keepalive_expiry,
+        ),
+    )
+
+
+def _loop(is_async: bool) -> asyncio.AbstractEventLoop | None:
+    if not is_async:
+        return None
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def acquire(owner: object, env: Env, config: PoolConfig | None = None, is_async: bool = False):
+    """Return the shared client for env/config and register owner as a user of it.
+
+    An AsyncKIS created outside a running loop gets its own client: the loop it will run on
+    is unknown, so its pool cannot be shared safely.
+    """
+    config = config or PoolConfig()
+    loop = _loop(is_async)
+    if is_async and loop is None:
+        return _build(env, config, is_async)
+    key = (_base_url(env), config, is_async, loop)
+    with _lock:
+        for k in [k for k in _pools if k[3] is not None and k[3].is_closed()]:
+            del _pools[k]  # 끝난 루프의 풀은 닫을 수도 없으므로 버림
+        entry = _pools.get(key)
+        if entry is None or entry[0].is_closed:
+            entry = _pools[key] = (_build(env, config, is_async), weakref.WeakSet())
+        entry[1].add(owner)
+        return entry[0]
+
+
+def release(owner: object, client: httpx.Client | httpx.AsyncClient) -> bool:
+    """Unregister owner. True if no owners remain and the caller should close the client."""
+    with _lock:
+        for key, (c, owners) in list(_pools.items()):
+            if c is client:
+                owners.discard(owner)
+                if owners:
+                    return False
+                del _pools[key]
+                return True
+    return not client.is_closed
+
+
+@overload
+def find(env: Env, is_async: Literal[False] = False) -> httpx.Client | None: ...
+@overload
+def find(env: Env, is_async: Literal[True]) -> httpx.AsyncClient | None: ...
+def find(env: Env, is_async: bool = False) -> httpx.Client | httpx.AsyncClient | None:
+    """Any live shared client for env (used by auth to reuse a warm connection).
+
+    Async clients are only returned to callers running on the loop that owns them.
+    """
+    base, loop = _base_url(env), _loop(is_async)
+    if is_async and loop is None:
+        return None
+    with _lock:
+        for (url, _, a, lp), (c, _) in _pools.items():
+            if url == base and a == is_async and lp is loop and not c.is_closed:
+                return c
+    return None
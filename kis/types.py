@@ -1,4 +1,107 @@
-from typing import Literal
+from typing import Literal, NamedTuple
 
 # 해외주식 거래소
 Exchange = Literal["NYS", "NAS", "AMS", "HKS", "SHS", "SZS", "TSE", "HNX", "HSX"]
+
+
+def _int(v: str | None) -> int:
+    return int(float(v)) if v and "." in v else int(v or 0)
+
+
+def _float(v: str | None) -> float:
+    return float(v or 0)
+
+
+class Quote(NamedTuple):
+    """domestic.price(typed=True): 국내 현재가 (FHKST01010100)"""
+
+    price: int
+    change: int
+    change_rate: float
+    volume: int
+    amount: int
+    open: int
+    high: int
+    low: int
+
+    @classmethod
+    def parse(cls, d: dict) -> "Quote":
+        return cls(
+            _int(d.get("stck_prpr")), _int(d.get("prdy_vrss")), _float(d.get("prdy_ctrt")),
+            _int(d.get("acml_vol")), _int(d.get("acml_tr_pbmn")), _int(d.get("stck_oprc")),
+            _int(d.get("stck_hgpr")), _int(d.get("stck_lwpr")),
+        )
+
+    @classmethod
+    def parse_multi(cls, d: dict) -> "Quote":
+        """One row of the multi-symbol quote TR (FHKST11300006)."""
+        return cls(
+            _int(d.get("inter2_prpr")), _int(d.get("inter2_prdy_vrss")),
+            _float(d.get("prdy_ctrt")), _int(d.get("acml_vol")), _int(d.get("acml_tr_pbmn")),
+            _int(d.get("inter2_oprc")), _int(d.get("inter2_hgpr")), _int(d.get("inter2_lwpr")),
+        )
+
+
+class Orderbook(NamedTuple):
+    """domestic.orderbook(typed=True): 호가 1~10단계, 응답에 있는 단계까지만 담음"""
+
+    asks: tuple[int, ...]
+    bids: tuple[int, ...]
+    ask_qty: tuple[int, ...]
+    bid_qty: tuple[int, ...]
+    total_ask_qty: int
+    total_bid_qty: int
+
+    @classmethod
+    def parse(cls, d: dict) -> "Orderbook":
+        n = next((i for i in range(1, 11) if f"askp{i}" not in d), 11) - 1
+        levels = range(1, n + 1)
+        return cls(
+            tuple(_int(d[f"askp{i}"]) for i in levels),
+            tuple(_int(d.get(f"bidp{i}")) for i in levels),
+            tuple(_int(d.get(f"askp_rsqn{i}")) for i in levels),
+            tuple(_int(d.get(f"bidp_rsqn{i}")) for i in levels),
+            _int(d.get("total_askp_rsqn")), _int(d.get("total_bidp_rsqn")),
+        )
+
+
+class Candle(NamedTuple):
+    """Daily bar; date is YYYYMMDD as int so bars sort and compare cheaply."""
+
+    date: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: int
+
+    @classmethod
+    def parse_domestic(cls, d: dict) -> "Candle":
+        return cls(
+            int(d["stck_bsop_date"]), _float(d.get("stck_oprc")), _float(d.get("stck_hgpr")),
+            _float(d.get("stck_lwpr")), _float(d.get("stck_clpr")), _int(d.get("acml_vol")),
+        )
+
+    @classmethod
+    def parse_overseas(cls, d: dict) -> "Candle":
+        return cls(
+            int(d["xymd"]), _float(d.get("open")), _float(d.get("high")), _float(d.get("low")),
+            _float(d.get("clos")), _int(d.get("tvol")),
+        )
+
+
+class OverseasQuote(NamedTuple):
+    """overseas.price(typed=True): 해외 현재가 (HHDFS00000300)"""
+
+    symbol: str
+    price: float
+    change: float
+    change_rate: float
+    volume: int
+
+    @classmethod
+    def parse(cls, d: dict) -> "OverseasQuote":
+        return cls(
+            d.get("rsym", ""), _float(d.get("last")), _float(d.get("diff")),
+            _float(d.get("rate")), _int(d.get("tvol")),
+        )
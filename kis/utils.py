@@ -1,11 +1,20 @@
+import asyncio
+import inspect
+from bisect import bisect_right
+from collections.abc import Awaitable, Callable, Hashable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar, overload
+
+T = TypeVar("T")
+R = TypeVar("R")
+
 _TICK_TABLE = [(2000, 1), (5000, 5), (20000, 10), (50000, 50), (200000, 100), (500000, 500)]
+_LIMITS = tuple(limit for limit, _ in _TICK_TABLE)
+_TICKS = (*(tick for _, tick in _TICK_TABLE), 1000)  # 마지막은 500,000원 이상
 
 
 def tick_size(price: int) -> int:
-    for limit, tick in _TICK_TABLE:
-        if price < limit:
-            return tick
-    return 1000
+    return _TICKS[bisect_right(_LIMITS, price)]
 
 
 def round_price(price: int, direction: str = "down") -> int:
@@ -17,6 +26,40 @@ def round_price(price: int, direction: str = "down") -> int:
     return round(price / tick) * tick
 
 
+def round_prices(prices: Iterable[int], direction: str = "down") -> list[int]:
+    """round_price over a whole batch; the direction is resolved once, not per price."""
+    limits, ticks = _LIMITS, _TICKS
+    if direction == "down":
+        return [p // (t := ticks[bisect_right(limits, p)]) * t for p in prices]
+    if direction == "up":
+        return [-(-p // (t := ticks[bisect_right(limits, p)])) * t for p in prices]
+    return [round(p / (t := ticks[bisect_right(limits, p)])) * t for p in prices]
+
+
+def ladder(price: int, n: int, side: str = "up") -> Iterator[int]:
+    """The n valid prices strictly above (side="up") or below ("down") price, nearest first.
+
+    Steps use the tick of the band being entered, so 1,999 -> 2,000 -> 2,005 going up and
+    2,000 -> 1,999 going down. Going down stops at the lowest valid price (1).
+    """
+    if side == "up":
+        p = round_price(price, "up")
+        if p == price:
+            p += tick_size(p)
+        for _ in range(n):
+            yield p
+            p += tick_size(p)
+        return
+    p = round_price(price, "down")
+    if p == price:
+        p -= tick_size(p - 1)
+    for _ in range(n):
+        if p < 1:
+            return
+        yield p
+        p -= tick_size(p - 1)
+
+
 def calc_cost(amount: int, rate: float) -> int:
     return int(amount * rate)
 
@@ -29,6 +72,99 @@ def order_status(order: dict) -> str:
     return "filled" if ccld_qty >= ord_qty else "partial"
 
 
+@overload
+def then(value: Awaitable[T], fn: Callable[[T], Any]) -> Awaitable[Any]: ...
+@overload
+def then(value: T, fn: Callable[[T], R]) -> R: ...
+def then(value: Any, fn: Callable) -> Any:
+    """fn(value), or a coroutine of fn(await value) when value is awaitable (AsyncKIS).
+
+    If fn itself returns an awaitable (e.g. a follow-up request), the coroutine awaits it too,
+    so sync and async callers share one chain of request-building code.
+    """
+    if inspect.isawaitable(value):
+        async def _await():
+            result = fn(await value)
+            return await result if inspect.isawaitable(result) else result
+        return _await()
+    return fn(value)
+
+
+def is_async(kis: Any) -> bool:
+    """True for AsyncKIS (or a KISPool of them): kis.get returns a coroutine."""
+    return inspect.iscoroutinefunction(getattr(kis, "primary", kis).get)
+
+
+def fan_out(kis: object, fn: Callable, keys: Iterable[Hashable], concurrency: int = 8):
+    """Call fn(key) for each distinct key, at most `concurrency` at a time.
+
+    Returns (results, errors) keyed like `keys`; one failing key does not fail the batch.
+    Runs on a thread pool for KIS and as tasks for AsyncKIS (returns a coroutine). Requests still
+    pass through the client's throttle, so concurrency only hides latency.
+    """
+    keys = list(dict.fromkeys(keys))
+    results, errors = {}, {}
+    if is_async(kis):
+        async def _run():
+            sem = asyncio.Semaphore(concurrency)
+
+            async def one(key):
+                async with sem:
+                    try:
+                        results[key] = await fn(key)
+                    except Exception as e:
+                        errors[key] = e
+
+            await asyncio.gather(*(one(k) for k in keys))
+            return results, errors
+        return _run()
+    with ThreadPoolExecutor(max(1, min(concurrency, len(keys)))) as pool:
+        for key, fut in [(k, pool.submit(fn, k)) for k in keys]:
+            try:
+                results[key] = fut.result()
+            except Exception as e:
+                errors[key] = e
+    return results, errors
+
+
+def _next_page(params: dict, data: dict, ctx: list[str]) -> dict | None:
+    # 응답 본문의 ctx_area_* 값을 다음 요청의 CTX_AREA_*로, 진전이 없으면 중단
+    nxt = {**params, **{k: data.get(k.lower(), "") for k in ctx}}
+    return nxt if ctx and nxt != params else None
+
+
+def paginate(kis: object, path: str, params: dict, tr_id: str, key: str):
+    """Rows under `key`, page by page, following tr_cont and the CTX_AREA_* continuation keys.
+
+    Generator for KIS, async generator for AsyncKIS. Only one page is held at a time, so rows
+    start flowing after the first response regardless of account size.
+    """
+    ctx = [k for k in params if k.startswith("CTX_AREA_")]
+    if is_async(kis):
+        return _apaginate(kis, path, params, tr_id, key, ctx)
+    return _paginate(kis, path, params, tr_id, key, ctx)
+
+
+def _paginate(kis, path: str, params: dict, tr_id: str, key: str, ctx: list[str]):
+    data, more = kis.page(path, params, tr_id)
+    yield from ensure_list(data, key)
+    while more and (nxt := _next_page(params, data, ctx)) is not None:
+        params = nxt
+        data, more = kis.page(path, params, tr_id, cont=True)
+        yield from ensure_list(data, key)
+
+
+async def _apaginate(kis, path: str, params: dict, tr_id: str, key: str, ctx: list[str]):
+    data, more = await kis.page(path, params, tr_id)
+    for row in ensure_list(data, key):
+        yield row
+    while more and (nxt := _next_page(params, data, ctx)) is not None:
+        params = nxt
+        data, more = await kis.page(path, params, tr_id, cont=True)
+        for row in ensure_list(data, key):
+            yield row
+
+
 def ensure_list(value: object, key: str | None = None) -> list:
     if isinstance(value, list):
         return value
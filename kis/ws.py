@@ -1,14 +1,16 @@
 import asyncio
 import base64
-import json
 from collections.abc import Awaitable, Callable
 
 import websockets
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import unpad
 
-from kis.auth import get_ws_key
+from kis import codec
+from kis.async_client import AsyncKIS
+from kis.auth import get_ws_key_async, invalidate_ws_key
 from kis.client import KIS
+from kis.errors import AuthError
 
 Callback = Callable[[dict], Awaitable[None]] | Callable[[dict], None]
 
@@ -27,7 +29,7 @@ class WSClient:
         "_key",
     )
 
-    def __init__(self, kis: KIS, max_retries: int = 5, retry_delay: float = 1.0):
+    def __init__(self, kis: KIS | AsyncKIS, max_retries: int = 5, retry_delay: float = 1.0):
         self.kis, self.max_retries, self.retry_delay = kis, max_retries, retry_delay
         self._ws, self._iv, self._key = None, None, None
         self._subscriptions: dict[str, set[str]] = {}
@@ -39,12 +41,14 @@ class WSClient:
         return f"ws://ops.koreainvestment.com:{'31000' if self.kis.env == 'paper' else '21000'}"
 
     async def connect(self) -> None:
+        # 접속키는 캐시되므로 재연결 시 REST 호출 없이 WS 핸드셰이크만 수행
+        approval_key = await get_ws_key_async(self.kis.app_key, self.kis.app_secret, self.kis.env)
         self._ws = await websockets.connect(self._ws_url)
         self._running, self._retry_count = True, 0
         await self._send(
             {
                 "header": {
-                    "approval_key": get_ws_key(self.kis.app_key, self.kis.app_secret, self.kis.env),
+                    "approval_key": approval_key,
                     "tr_type": "1",
                     "content-type": "utf-8",
                 },
@@ -79,7 +83,7 @@ class WSClient:
 
     async def _send(self, msg: dict) -> None:
         if self._ws:
-            await self._ws.send(json.dumps(msg))
+            await self._ws.send(codec.dumps(msg))
 
     async def run(self) -> None:
         while self._running:
@@ -89,12 +93,15 @@ class WSClient:
                     await self._restore_subscriptions()
                 async for message in self._ws:
                     await self._handle_message(message)
-            except Exception:
-                await self._reconnect()
+            except Exception as e:
+                await self._reconnect(e)
 
     async def _handle_message(self, raw: str) -> None:
         if not (raw.startswith("0|") or raw.startswith("1|")):
-            out = json.loads(raw).get("body", {}).get("output", {})
+            body = codec.loads(raw).get("body", {})
+            if body.get("rt_cd", "0") != "0" and "approval" in body.get("msg1", "").lower():
+                raise AuthError(body.get("msg_cd", "UNKNOWN"), body["msg1"])  # 접속키 거절
+            out = body.get("output", {})
             if "iv" in out:
                 self._iv = base64.b64decode(out["iv"])
             if "key" in out:
@@ -131,7 +138,9 @@ class WSClient:
             }
         return {"raw": data}
 
-    async def _reconnect(self) -> None:
+    async def _reconnect(self, error: Exception | None = None) -> None:
+        if isinstance(error, AuthError):  # 캐시된 접속키가 거절됨: 다음 connect에서 재발급
+            invalidate_ws_key(self.kis.app_key, self.kis.env)
         if self._retry_count >= self.max_retries:
             self._running = False
             raise ConnectionError(f"Max retries ({self.max_retries}) exceeded")
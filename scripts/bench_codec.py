@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""JSON codec 백엔드별 디코드/인코드 비용 측정
+
+사용법:
+    uv run python scripts/bench_codec.py [반복 횟수]
+
+측정 대상:
+    - balance 응답 (tests/fixtures/domestic_balance.json) 디코드
+    - WS 제어 프레임 (구독 응답) 디코드 / 구독 요청 인코드
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+from kis import codec
+
+BALANCE = (Path(__file__).parent.parent / "tests/fixtures/domestic_balance.json").read_bytes()
+CONTROL = (
+    '{"header":{"tr_id":"H0STCNT0","tr_key":"005930","encrypt":"N"},'
+    '"body":{"rt_cd":"0","msg_cd":"OPSP0000","msg1":"SUBSCRIBE SUCCESS",'
+    '"output":{"iv":"0123456789abcdef","key":"0123456789abcdef0123456789abcdef"}}}'
+)
+SUBSCRIBE = {
+    "header": {"approval_key": "x" * 36, "custtype": "P", "tr_type": "1", "content-type": "utf-8"},
+    "body": {"input": {"tr_id": "H0STCNT0", "tr_key": "005930"}},
+}
+
+
+def bench(n: int) -> None:
+    print(f"{'backend':<8} {'balance loads':>14} {'ws loads':>10} {'ws dumps':>10}  (us/op)")
+    for name in codec.BACKENDS:
+        codec.use(name)
+        cases = (lambda: codec.loads(BALANCE), lambda: codec.loads(CONTROL),
+                 lambda: codec.dumps(SUBSCRIBE))
+        us = [min(timeit.repeat(f, number=n, repeat=5)) / n * 1e6 for f in cases]
+        print(f"{name:<8} {us[0]:>14.2f} {us[1]:>10.2f} {us[2]:>10.2f}")
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -1,11 +1,15 @@
 """비동기 클라이언트 테스트"""
 
+import asyncio
+import time
 from unittest.mock import AsyncMock, patch
 
+import httpx
 import pytest
 
-from kis.async_client import AsyncKIS
+from kis.async_client import AsyncKIS, _Scheduler
 from kis.errors import KISError, RateLimitError
+from kis.resilience import RetryBudget, RetryPolicy, TokenBucket
 
 
 def test_init_and_switch():
@@ -118,3 +122,430 @@ async def test_overseas_price_via_async_kis(_, httpx_mock):
     httpx_mock.add_response(json={"rt_cd": "0", "output": {"last": "150.00"}})
     async with AsyncKIS("key", "secret", "12345678-01") as kis:
         assert (await overseas.price(kis, "AAPL", "NAS"))["last"] == "150.00"
+
+
+@patch("kis.async_client.get_token_async", new_callable=AsyncMock, return_value="test_token")
+async def test_domestic_price_typed_via_async_kis(_, httpx_mock):
+    from kis import domestic
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"stck_prpr": "70000"}})
+    async with AsyncKIS("key", "secret", "12345678-01") as kis:
+        assert (await domestic.price(kis, "005930", typed=True)).price == 70000
+
+
+BALANCE = {
+    "rt_cd": "0",
+    "output1": [{
+        "pdno": "005930", "prdt_name": "삼성전자", "hldg_qty": "10", "pchs_avg_pric": "68000.0",
+        "prpr": "70000", "pchs_amt": "680000", "evlu_amt": "700000", "evlu_pfls_amt": "20000",
+        "evlu_pfls_rt": "2.94", "ovrs_pdno": "AAPL", "ovrs_cblc_qty": "3",
+    }],
+    "output2": [{}],
+}
+
+
+@pytest.mark.parametrize("call, expected", [
+    (lambda k, d, o: d.daily(k, "005930"), [{"n": "1"}]),
+    (lambda k, d, o: d.orders(k), [{"n": "1"}]),
+    (lambda k, d, o: d.pending_orders(k), [{"n": "1"}]),
+    (lambda k, d, o: o.daily(k, "AAPL", "NAS"), [{"n": "1"}]),
+    (lambda k, d, o: o.orders(k), [{"n": "1"}]),
+    (lambda k, d, o: o.pending_orders(k, "NAS"), [{"n": "1"}]),
+])
+@patch("kis.async_client.get_token_async", new_callable=AsyncMock, return_value="test_token")
+async def test_list_functions_via_async_kis(_, call, expected, httpx_mock):
+    from kis import domestic, overseas
+    httpx_mock.add_response(json={"rt_cd": "0", "output": [{"n": "1"}]})
+    async with AsyncKIS("key", "secret", "12345678-01") as kis:
+        assert await call(kis, domestic, overseas) == expected
+
+
+@patch("kis.async_client.get_token_async", new_callable=AsyncMock, return_value="test_token")
+async def test_position_functions_via_async_kis(_, httpx_mock):
+    from kis import domestic, overseas
+    httpx_mock.add_response(json=BALANCE, is_reusable=True)
+    async with AsyncKIS("key", "secret", "12345678-01") as kis:
+        assert (await domestic.positions(kis))[0]["pdno"] == "005930"
+        assert (await domestic.position(kis, "005930"))["qty"] == 10
+        assert await domestic.position(kis, "000660") is None
+        assert (await overseas.position(kis, "AAPL", "NAS"))["ovrs_cblc_qty"] == "3"
+
+
+@patch("kis.async_client.get_token_async", new_callable=AsyncMock, return_value="test_token")
+async def test_sell_all_via_async_kis(_, httpx_mock):
+    import json
+
+    from kis import domestic, overseas
+    httpx_mock.add_response(json=BALANCE)
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"ODNO": "1"}})
+    httpx_mock.add_response(json=BALANCE)
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"ODNO": "2"}})
+    async with AsyncKIS("key", "secret", "12345678-01") as kis:
+        assert (await domestic.sell_all(kis, "005930"))["ODNO"] == "1"
+        assert (await overseas.sell_all(kis, "AAPL", "NAS"))["ODNO"] == "2"
+        httpx_mock.add_response(json=BALANCE)
+        with pytest.raises(ValueError):
+            await domestic.sell_all(kis, "000660")
+    requests = httpx_mock.get_requests()
+    assert json.loads(requests[1].content)["ORD_QTY"] == "10"
+    assert json.loads(requests[3].content)["ORD_QTY"] == "3"
+
+
+@patch("kis.async_client.get_token_async", new_callable=AsyncMock, return_value="test_token")
+async def test_iter_orders_via_async_kis(_, httpx_mock):
+    from kis import domestic, overseas
+    httpx_mock.add_response(
+        json={"rt_cd": "0", "output1": [{"odno": "1"}], "ctx_area_nk100": "NK1"},
+        headers={"tr_cont": "F"},
+    )
+    httpx_mock.add_response(
+        json={"rt_cd": "0", "output1": [{"odno": "2"}]}, headers={"tr_cont": "E"}
+    )
+    httpx_mock.add_response(json={"rt_cd": "0", "output": [{"odno": "9"}]})
+    async with AsyncKIS("key", "secret", "12345678-01") as kis:
+        assert [r["odno"] async for r in domestic.iter_orders(kis)] == ["1", "2"]
+        assert [r["odno"] async for r in overseas.iter_pending_orders(kis)] == ["9"]
+    assert httpx_mock.get_requests()[1].headers["tr_cont"] == "N"
+
+
+@patch("kis.async_client.get_token_async", new_callable=AsyncMock, return_value="test_token")
+async def test_domestic_prices_via_async_kis(_, httpx_mock):
+    from kis import domestic
+
+    def respond(request):
+        symbol = request.url.params["FID_INPUT_ISCD"]
+        if symbol == "BAD":
+            return httpx.Response(200, json={"rt_cd": "1", "msg_cd": "APBK0013", "msg1": "오류"})
+        return httpx.Response(200, json={"rt_cd": "0", "output": {"stck_prpr": "1"}})
+
+    httpx_mock.add_callback(respond, is_reusable=True)
+    async with AsyncKIS("key", "secret", "12345678-01") as kis:
+        results, errors = await domestic.prices(kis, ["005930", "000660", "BAD"], concurrency=2)
+    assert set(results) == {"005930", "000660"} and set(errors) == {"BAD"}
+
+
+# === 재시도 정책 테스트 ===
+
+
+@patch("kis.async_client.get_token_async", new_callable=AsyncMock, return_value="test_token")
+@patch("kis.async_client.asyncio.sleep", new_callable=AsyncMock)
+async def test_retry_budget_fails_fast(mock_sleep, _, httpx_mock):
+    budget = RetryBudget(ratio=0.0, min_per_sec=0.0, max_balance=0.0)
+    kis = AsyncKIS("key", "secret", "12345678-01", retry=RetryPolicy(budget=budget))
+    httpx_mock.add_response(status_code=429)
+
+    with pytest.raises(RateLimitError):
+        await kis.get("/test", {}, "TR001")
+
+    mock_sleep.assert_not_called()
+    await kis.close()
+
+
+def test_adaptive_rejects_shared_limiter(tmp_path):
+    from kis.resilience import SharedLimiter
+
+    limiter = SharedLimiter("paper", "key", directory=str(tmp_path))
+    with pytest.raises(ValueError, match="adaptive"):
+        AsyncKIS("key", "secret", "12345678-01", limiter=limiter, adaptive=True)
+
+
+@patch("kis.async_client.get_token_async", new_callable=AsyncMock, return_value="test_token")
+@patch("kis.async_client.asyncio.sleep", new_callable=AsyncMock)
+async def test_egw00201_retried_with_adaptive_throttle(mock_sleep, _, httpx_mock):
+    kis = AsyncKIS("key", "secret", "12345678-01", adaptive=True)
+    httpx_mock.add_response(
+        status_code=500, json={"rt_cd": "1", "msg_cd": "EGW00201", "msg1": "초당 거래건수 초과"}
+    )
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"ok": "1"}})
+
+    assert await kis.get("/test", {}, "TR001") == {"ok": "1"}
+    mock_sleep.assert_awaited_once_with(1.0)
+    assert kis._bucket.rate == 10
+    await kis.close()
+
+
+@patch("kis.async_client.get_token_async", new_callable=AsyncMock, return_value="test_token")
+async def test_hedged_quote_takes_first_response(_, httpx_mock):
+    kis = AsyncKIS("key", "secret", "12345678-01", retry=RetryPolicy(hedge=0.95, hedge_delay=0.05))
+    calls = []
+
+    async def respond(request):
+        calls.append(request)
+        if len(calls) == 1:
+            await asyncio.sleep(1.0)
+        return httpx.Response(200, json={"rt_cd": "0", "output": {"n": str(len(calls))}})
+
+    httpx_mock.add_callback(respond, is_reusable=True)
+
+    assert await kis.get("/quote", {}, "HHDFS00000300") == {"n": "2"}
+    assert len(calls) == 2
+    await kis.close()
+
+
+@patch("kis.async_client.get_token_async", new_callable=AsyncMock, return_value="test_token")
+async def test_hedge_not_sent_while_throttled(_, httpx_mock):
+    kis = AsyncKIS("key", "secret", "12345678-01", throttle_rate=2, throttle_burst=1,
+                   retry=RetryPolicy(hedge=0.95, hedge_delay=0.05))
+    calls = []
+
+    async def respond(request):
+        calls.append(request)
+        if len(calls) == 1:
+            await asyncio.sleep(0.8)  # 다음 슬롯(0.5초)보다 늦음
+        return httpx.Response(200, json={"rt_cd": "0", "output": {"n": str(len(calls))}})
+
+    httpx_mock.add_callback(respond, is_reusable=True)
+
+    assert await kis.get("/quote", {}, "HHDFS00000300") == {"n": "1"}
+    assert len(calls) == 1
+    await kis.close()
+
+
+@patch("kis.async_client.get_token_async", new_callable=AsyncMock, return_value="test_token")
+async def test_hedge_charged_to_retry_budget(_, httpx_mock):
+    budget = RetryBudget(max_balance=0.0)
+    kis = AsyncKIS("key", "secret", "12345678-01",
+                   retry=RetryPolicy(budget=budget, hedge=0.95, hedge_delay=0.05))
+
+    async def respond(request):
+        await asyncio.sleep(0.3)
+        return httpx.Response(200, json={"rt_cd": "0", "output": {"ok": "1"}})
+
+    httpx_mock.add_callback(respond, is_reusable=True)
+
+    assert await kis.get("/quote", {}, "HHDFS00000300") == {"ok": "1"}
+    assert len(httpx_mock.get_requests()) == 1
+    await kis.close()
+
+
+@patch("kis.async_client.get_token_async", new_callable=AsyncMock, return_value="test_token")
+async def test_circuit_breaker_isolated_per_endpoint_group(_, httpx_mock):
+    from kis.errors import CircuitBreakerError, NetworkError
+
+    kis = AsyncKIS("key", "secret", "12345678-01", max_retries=0, cb_threshold=1)
+    httpx_mock.add_exception(httpx.ConnectError("fail"))
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"ok": "1"}})
+
+    with pytest.raises(NetworkError):
+        await kis.get("/uapi/overseas-price/v1/quotations/price", {}, "HHDFS00000300")
+    with pytest.raises(CircuitBreakerError):
+        await kis.get("/uapi/overseas-price/v1/quotations/price", {}, "HHDFS00000300")
+    assert await kis.get("/uapi/domestic-stock/v1/quotations/x", {}, "FHKST01010100") == {"ok": "1"}
+    assert kis.circuit_states() == {"overseas": "open", "domestic-quote": "closed"}
+    await kis.close()
+
+
+@patch("kis.async_client.get_token_async", new_callable=AsyncMock, return_value="test_token")
+async def test_circuit_breaker_counts_gateway_5xx(_, httpx_mock):
+    from kis.errors import CircuitBreakerError
+
+    kis = AsyncKIS("key", "secret", "12345678-01", max_retries=0, cb_threshold=1)
+    httpx_mock.add_response(status_code=502, text="Bad Gateway")
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await kis.get("/test", {}, "TR001")
+    with pytest.raises(CircuitBreakerError):
+        await kis.get("/test", {}, "TR001")
+    await kis.close()
+
+
+@patch("kis.async_client.get_token_async", new_callable=AsyncMock, return_value="test_token")
+@patch("kis.async_client.asyncio.sleep", new_callable=AsyncMock)
+async def test_circuit_breaker_probe_retries_after_429(_, __, httpx_mock):
+    kis = AsyncKIS("key", "secret", "12345678-01", cb_threshold=1, cb_recovery_time=30.0,
+                   throttle_rate=0)
+    kis._breaker("domestic-quote").on_failure(time.time() - 60)  # half-open
+    httpx_mock.add_response(status_code=429)
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"ok": "1"}})
+
+    assert await kis.get("/test", {}, "TR001") == {"ok": "1"}
+    assert kis.circuit_states() == {"domestic-quote": "closed"}
+    await kis.close()
+
+
+# === 우선순위 스케줄러 테스트 ===
+
+
+async def _grant_order(scheduler, kinds, bucket):
+    done = []
+
+    async def req(i, kind):
+        await scheduler.acquire(kind, (bucket,))
+        done.append((i, kind))
+
+    tasks = []
+    for i, kind in enumerate(kinds):
+        tasks.append(asyncio.create_task(req(i, kind)))
+        await asyncio.sleep(0)  # 도착 순서 고정
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return done
+
+
+async def test_scheduler_order_jumps_queued_quotes():
+    done = await _grant_order(_Scheduler(), ["quote"] * 6 + ["order"], TokenBucket(100, burst=1))
+    assert done[0] == (0, "quote")  # 비경합 fast path
+    assert done[1] == (6, "order")
+    assert [i for i, _ in done[2:]] == [1, 2, 3, 4, 5]  # 같은 클래스 안에서는 FIFO
+
+
+async def test_scheduler_priority_classes():
+    kinds = ["quote", "quote", "account", "quote", "order"]
+    done = await _grant_order(_Scheduler(), kinds, TokenBucket(100, burst=1))
+    assert [k for _, k in done] == ["quote", "order", "account", "quote", "quote"]
+
+
+async def test_scheduler_drops_stale_quotes():
+    scheduler, bucket = _Scheduler(stale_after=0.01), TokenBucket(20, burst=1)
+    await scheduler.acquire("quote", (bucket,))
+    results = await asyncio.gather(
+        scheduler.acquire("quote", (bucket,)),
+        scheduler.acquire("quote", (bucket,)),
+        scheduler.acquire("order", (bucket,)),
+        return_exceptions=True,
+    )
+    assert results[2] is None
+    assert any(isinstance(r, RateLimitError) and r.code == "STALE" for r in results[:2])
+
+
+async def test_scheduler_skips_cancelled_waiters():
+    scheduler, bucket = _Scheduler(), TokenBucket(100, burst=1)
+    await scheduler.acquire("quote", (bucket,))
+    cancelled = asyncio.create_task(scheduler.acquire("quote", (bucket,)))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.wait_for(scheduler.acquire("quote", (bucket,)), 1.0)
+    assert cancelled.cancelled()
+
+
+class _RacedLimiter:
+    """delay()는 0이지만 wait() 직전에 다른 프로세스가 슬롯을 가져간 SharedLimiter."""
+
+    def __init__(self, lost: float):
+        self.lost, self.granted = lost, []
+
+    def delay(self, now):
+        return 0.0
+
+    def wait(self, now):
+        self.granted.append(now)
+        return self.lost
+
+
+async def test_scheduler_honours_wait_after_race():
+    scheduler, lim = _Scheduler(), _RacedLimiter(0.05)
+    start = time.monotonic()
+    await scheduler.acquire("quote", (lim,))
+    assert time.monotonic() - start >= 0.05
+    assert len(lim.granted) == 1
+
+
+async def test_scheduler_dispatch_honours_wait_after_race():
+    scheduler, bucket, lim = _Scheduler(), TokenBucket(100, burst=1), _RacedLimiter(0.05)
+    await scheduler.acquire("quote", (bucket,))
+    start = time.monotonic()
+    await scheduler.acquire("quote", (bucket, lim))  # 큐를 거쳐 dispatcher가 슬롯을 줌
+    assert time.monotonic() - start >= 0.05
+
+
+@patch("kis.async_client.get_token_async", new_callable=AsyncMock, return_value="test_token")
+async def test_order_sent_before_queued_quotes(_, httpx_mock):
+    """대기 중인 시세 요청보다 주문이 먼저 나감"""
+    sent = []
+
+    def record(request):
+        sent.append(request.headers["tr_id"])
+        return httpx.Response(200, json={"rt_cd": "0", "output": {}})
+
+    httpx_mock.add_callback(record, is_reusable=True)
+    kis = AsyncKIS("key", "secret", "12345678-01", throttle_rate=100, throttle_burst=1)
+    quotes = [asyncio.create_task(kis.get("/q", {}, "FHKST01010100")) for _ in range(5)]
+    await asyncio.sleep(0)
+    await kis.post("/order", {}, "TTTC0802U")
+    await asyncio.gather(*quotes)
+    assert sent.index("TTTC0802U") <= 1
+
+
+# === Coalescing 테스트 ===
+
+
+@patch("kis.async_client.get_token_async", new_callable=AsyncMock, return_value="test_token")
+async def test_coalesce_concurrent_gets(_, httpx_mock):
+    """동일한 동시 GET은 하나의 요청을 공유"""
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"price": "70000"}})
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"price": "80000"}})
+    kis = AsyncKIS("key", "secret", "12345678-01", coalesce=True)
+
+    results = await asyncio.gather(
+        *(kis.get("/p", {"sym": "005930"}, "FHKST01010100") for _ in range(5)),
+        kis.get("/p", {"sym": "000660"}, "FHKST01010100"),
+    )
+
+    assert results[:5] == [{"price": "70000"}] * 5
+    assert results[5] == {"price": "80000"}
+    assert len(httpx_mock.get_requests()) == 2
+    assert kis._inflight == {}
+
+
+@patch("kis.async_client.get_token_async", new_callable=AsyncMock, return_value="test_token")
+async def test_coalesce_propagates_error(_, httpx_mock):
+    httpx_mock.add_response(json={"rt_cd": "1", "msg_cd": "UNKNOWN", "msg1": "fail"})
+    kis = AsyncKIS("key", "secret", "12345678-01", coalesce=True)
+
+    calls = (kis.get("/p", {}, "TR") for _ in range(3))
+    results = await asyncio.gather(*calls, return_exceptions=True)
+
+    assert all(isinstance(r, KISError) for r in results)
+    assert len(httpx_mock.get_requests()) == 1
+
+
+# === 토큰 갱신 테스트 ===
+
+
+async def test_token_expired_reissues_and_retries_once(httpx_mock):
+    """EGW00123 시 토큰 재발급 후 한 번 재시도"""
+    from kis import auth
+
+    auth._tokens[("paper", "key")] = ("old", time.time() + 3600)
+    httpx_mock.add_response(
+        status_code=500, json={"rt_cd": "1", "msg_cd": "EGW00123", "msg1": "기간 만료된 token"}
+    )
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"ok": "1"}})
+    kis = AsyncKIS("key", "secret", "12345678-01")
+
+    with patch.object(auth, "_issue_token_async", return_value=("new", time.time() + 3600)):
+        assert await kis.get("/test", {}, "TR001") == {"ok": "1"}
+
+    auths = [r.headers["authorization"] for r in httpx_mock.get_requests()]
+    assert auths == ["Bearer old", "Bearer new"]
+    auth._tokens.clear()
+
+
+@patch("kis.async_client.get_token_async", new_callable=AsyncMock,
+       side_effect=httpx.ConnectError("down"))
+async def test_background_refresh_backs_off_after_failure(_):
+    kis = AsyncKIS("key", "secret", "12345678-01", token_refresh=300)
+    with patch("kis.async_client.asyncio.sleep", new_callable=AsyncMock,
+               side_effect=[None, None, asyncio.CancelledError]) as sleep, \
+            pytest.raises(asyncio.CancelledError):
+        await kis._refresh_loop()
+
+    assert [c.args[0] for c in sleep.call_args_list] == [1.0, 60.0, 60.0]
+
+
+async def test_background_refresh_renews_before_expiry(httpx_mock):
+    from kis import auth
+
+    auth._tokens[("paper", "key")] = ("old", time.time() + 200)
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"ok": "1"}})
+    kis = AsyncKIS("key", "secret", "12345678-01", token_refresh=300)
+    with patch.object(auth, "_issue_token_async", return_value=("new", time.time() + 86400)), \
+            patch("kis.async_client._refresh_delay", return_value=0.01):
+        await kis.get("/test", {}, "TR001")  # 첫 요청에서 갱신 태스크 시작
+        for _ in range(100):
+            if auth._tokens[("paper", "key")][0] == "new":
+                break
+            await asyncio.sleep(0.01)
+        await kis.close()
+
+    assert auth._tokens[("paper", "key")][0] == "new"
+    assert (await kis._headers("TR001"))["authorization"] == "Bearer new"
+    auth._tokens.clear()
@@ -1,3 +1,8 @@
+import asyncio
+import multiprocessing
+import stat
+import sys
+import threading
 import time
 from unittest.mock import patch
 
@@ -9,6 +14,16 @@ from kis import auth
 @pytest.fixture(autouse=True)
 def clear_tokens():
     auth._tokens.clear()
+    auth._ws_keys.clear()
+    yield
+    auth.set_token_store(None)
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = auth.FileTokenStore(tmp_path / "tokens.json")
+    auth.set_token_store(s)
+    return s
 
 
 def test_base_url():
@@ -41,6 +56,12 @@ def test_get_token_different_env():
         assert mock.call_count == 2
 
 
+def test_token_valid_until():
+    assert auth.token_valid_until("key", "paper") == 0.0
+    auth._tokens[("paper", "key")] = ("t", 5000.0)
+    assert auth.token_valid_until("key", "paper") == 4940.0
+
+
 def test_issue_token(httpx_mock):
     httpx_mock.add_response(json={"access_token": "test_token", "expires_in": 86400})
     token, expires_at = auth._issue_token("key", "secret", "paper")
@@ -52,3 +73,210 @@ def test_issue_token(httpx_mock):
 def test_get_ws_key(httpx_mock):
     httpx_mock.add_response(json={"approval_key": "ws_key_123"})
     assert auth.get_ws_key("key", "secret", "paper") == "ws_key_123"
+
+
+def test_get_ws_key_cached(httpx_mock):
+    httpx_mock.add_response(json={"approval_key": "ws_key_123"})
+    auth.get_ws_key("key", "secret", "paper")
+    assert auth.get_ws_key("key", "secret", "paper") == "ws_key_123"
+    assert len(httpx_mock.get_requests()) == 1
+
+
+def test_get_ws_key_expires(httpx_mock):
+    auth._ws_keys[("paper", "key")] = ("old", time.time() - 1)
+    httpx_mock.add_response(json={"approval_key": "new"})
+    assert auth.get_ws_key("key", "secret", "paper") == "new"
+
+
+async def test_get_ws_key_async_cached(httpx_mock):
+    httpx_mock.add_response(json={"approval_key": "ws_key_123"})
+    assert await auth.get_ws_key_async("key", "secret", "paper") == "ws_key_123"
+    assert auth.get_ws_key("key", "secret", "paper") == "ws_key_123"  # sync/async 캐시 공유
+    auth.invalidate_ws_key("key", "paper")
+    assert ("paper", "key") not in auth._ws_keys
+    assert len(httpx_mock.get_requests()) == 1
+
+
+def test_get_token_single_flight_threads():
+    calls = []
+
+    def issue(*args):
+        calls.append(args)
+        time.sleep(0.05)
+        return "token123", time.time() + 3600
+
+    results = []
+
+    def fetch():
+        results.append(auth.get_token("key", "secret", "paper"))
+
+    with patch.object(auth, "_issue_token", side_effect=issue):
+        threads = [threading.Thread(target=fetch) for _ in range(10)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert results == ["token123"] * 10
+    assert len(calls) == 1
+
+
+async def test_get_token_async_single_flight():
+    calls = []
+
+    async def issue(*args):
+        calls.append(args)
+        await asyncio.sleep(0.01)
+        return "token123", time.time() + 3600
+
+    with patch.object(auth, "_issue_token_async", side_effect=issue):
+        results = await asyncio.gather(
+            *(auth.get_token_async("key", "secret", "paper") for _ in range(100))
+        )
+
+    assert set(results) == {"token123"}
+    assert len(calls) == 1
+
+
+async def test_get_token_async_retries_after_failure():
+    async def fail(*args):
+        raise RuntimeError("boom")
+
+    with patch.object(auth, "_issue_token_async", side_effect=fail), pytest.raises(RuntimeError):
+        await auth.get_token_async("key", "secret", "paper")
+    with patch.object(auth, "_issue_token_async", return_value=("ok", time.time() + 3600)):
+        assert await auth.get_token_async("key", "secret", "paper") == "ok"
+
+
+# === 토큰 저장소 ===
+
+
+def test_store_reused_after_restart(store):
+    with patch.object(auth, "_issue_token", return_value=("token123", time.time() + 3600)) as mock:
+        assert auth.get_token("key", "secret", "paper") == "token123"
+        auth._tokens.clear()  # 프로세스 재시작
+        assert auth.get_token("key", "secret", "paper") == "token123"
+        assert mock.call_count == 1
+
+
+def test_store_expired_token_reissued(store):
+    store.save(("paper", "key"), "old", time.time() + 30)
+    with patch.object(auth, "_issue_token", return_value=("new", time.time() + 3600)):
+        assert auth.get_token("key", "secret", "paper") == "new"
+    assert store.load(("paper", "key"))[0] == "new"
+
+
+def test_store_file_is_owner_only_and_hides_app_key(store):
+    store.save(("paper", "secret_app_key"), "tok", time.time() + 3600)
+    assert stat.S_IMODE(store.path.stat().st_mode) == 0o600
+    assert "secret_app_key" not in store.path.read_text()
+    assert store.load(("prod", "secret_app_key")) is None
+
+
+def test_store_corrupt_file_ignored(store):
+    store.path.write_text("{not json")
+    assert store.load(("paper", "key")) is None
+
+
+async def test_store_async(store):
+    with patch.object(auth, "_issue_token_async", return_value=("token123", time.time() + 3600)):
+        assert await auth.get_token_async("key", "secret", "paper") == "token123"
+    auth._tokens.clear()
+    with patch.object(auth, "_issue_token_async") as mock:
+        assert await auth.get_token_async("key", "secret", "paper") == "token123"
+        mock.assert_not_called()
+
+
+def _lock_is_free(store) -> bool:
+    import fcntl
+    import os
+
+    fd = os.open(store.path.with_suffix(".lock"), os.O_RDWR)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        return False
+    finally:
+        os.close(fd)
+
+
+async def test_store_lock_released_when_cancelled_while_waiting(store):
+    holder = store.lock()  # 다른 프로세스가 발급 중
+    with pytest.raises(TimeoutError):
+        await asyncio.wait_for(auth.get_token_async("key", "secret", "paper"), 0.05)
+    store.unlock(holder)
+
+    for _ in range(100):  # 대기하던 스레드가 잠금을 얻은 뒤 바로 해제해야 함
+        await asyncio.sleep(0.01)
+        if _lock_is_free(store):
+            break
+    assert _lock_is_free(store)
+
+
+def test_invalidate_waits_for_store_lock(store):
+    store.save(("paper", "key"), "old", time.time() + 3600)
+    holder = store.lock()
+    t = threading.Thread(target=auth.invalidate_token, args=("key", "paper", "old"))
+    t.start()
+    t.join(0.05)
+    assert t.is_alive()  # 발급 중인 프로세스가 끝날 때까지 대기
+    store.save(("paper", "key"), "new", time.time() + 3600)  # 잠금 보유자가 새 토큰 저장
+    store.unlock(holder)
+    t.join()
+
+    assert store.load(("paper", "key"))[0] == "new"
+
+
+def _fetch_token(path, counter) -> None:
+    def issue(*args):
+        with open(counter, "a") as f:
+            f.write("x")
+        time.sleep(0.05)
+        return "shared", time.time() + 3600
+
+    auth._tokens.clear()
+    auth.set_token_store(auth.FileTokenStore(path))
+    with patch.object(auth, "_issue_token", side_effect=issue):
+        auth.get_token("key", "secret", "paper")
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX only")
+def test_store_single_issuance_across_processes(tmp_path):
+    counter = tmp_path / "issued"
+    counter.write_text("")
+    ctx = multiprocessing.get_context("fork")
+    procs = [
+        ctx.Process(target=_fetch_token, args=(tmp_path / "tokens.json", counter)) for _ in range(4)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert counter.read_text() == "x"
+    assert auth.FileTokenStore(tmp_path / "tokens.json").load(("paper", "key"))[0] == "shared"
+
+
+# === 토큰 무효화 / 선제 갱신 ===
+
+
+def test_invalidate_only_matching_token():
+    auth._tokens[("paper", "key")] = ("new", time.time() + 3600)
+    auth.invalidate_token("key", "paper", "old")  # 이미 교체됨
+    assert auth._tokens[("paper", "key")][0] == "new"
+    auth.invalidate_token("key", "paper", "new")
+    assert ("paper", "key") not in auth._tokens
+
+
+def test_invalidate_marks_store_entry_expired(store):
+    store.save(("paper", "key"), "tok", time.time() + 3600)
+    auth.invalidate_token("key", "paper", "tok")
+    with patch.object(auth, "_issue_token", return_value=("new", time.time() + 3600)):
+        assert auth.get_token("key", "secret", "paper") == "new"
+
+
+def test_get_token_ahead_forces_early_renewal():
+    auth._tokens[("paper", "key")] = ("old", time.time() + 600)
+    with patch.object(auth, "_issue_token", return_value=("new", time.time() + 86400)):
+        assert auth.get_token("key", "secret", "paper") == "old"
+        assert auth.get_token("key", "secret", "paper", ahead=900) == "new"
@@ -0,0 +1,172 @@
+from datetime import date, timedelta
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from kis import backfill
+from kis.backfill import Checkpoint
+from kis.types import Candle
+
+# 2024-01-01부터 250 거래일(평일), 최신순 제공
+DAYS = [
+    int(d.strftime("%Y%m%d"))
+    for d in (date(2024, 1, 1) + timedelta(days=i) for i in range(360))
+    if d.weekday() < 5
+][:250]
+
+
+@pytest.fixture(autouse=True)
+def no_wait():
+    with (
+        patch("kis.client.get_token", return_value="test_token"),
+        patch("kis.client.sleep"),
+    ):
+        yield
+
+
+def _history(days: list[int], page: int = 100):
+    """FHKST03010100/HHDFS76240000처럼 end 이전 최대 `page`개를 최신순으로 돌려주는 콜백."""
+    def respond(request: httpx.Request) -> httpx.Response:
+        q = request.url.params
+        if "FID_INPUT_DATE_2" in q:
+            start, end = int(q["FID_INPUT_DATE_1"]), int(q["FID_INPUT_DATE_2"])
+            rows = [d for d in reversed(days) if start <= d <= end][:page]
+            return httpx.Response(200, json={"rt_cd": "0", "output2": [
+                {"stck_bsop_date": str(d), "stck_clpr": "100", "acml_vol": "1"} for d in rows
+            ]})
+        end = int(q["BYMD"] or 99999999)
+        rows = [d for d in reversed(days) if d <= end][:page]
+        return httpx.Response(200, json={"rt_cd": "0", "output2": [
+            {"xymd": str(d), "clos": "1.5", "tvol": "2"} for d in rows
+        ]})
+    return respond
+
+
+class Sink:
+    def __init__(self):
+        self.bars: dict[str, dict[int, Candle]] = {}
+
+    def __call__(self, key: str, bars: list[Candle]) -> None:
+        self.bars.setdefault(key, {}).update((c.date, c) for c in bars)
+
+
+def test_pages_backwards_to_start(kis, httpx_mock):
+    httpx_mock.add_callback(_history(DAYS), is_reusable=True)
+    sink = Sink()
+
+    results, errors = backfill.backfill(kis, ["005930"], "20240101", sink, end="20241231")
+
+    assert errors == {} and results == {"005930": 250}
+    assert sorted(sink.bars["005930"]) == DAYS
+    ends = [r.url.params["FID_INPUT_DATE_2"] for r in httpx_mock.get_requests()]
+    assert ends[0] == "20241231" and len(ends) == 4  # 100 + 100 + 50 + 빈 페이지
+
+
+def test_overseas_stops_at_start(kis, httpx_mock):
+    httpx_mock.add_callback(_history(DAYS), is_reusable=True)
+    sink = Sink()
+
+    results, _ = backfill.backfill(kis, [("AAPL", "NAS")], "20240601", sink, end="20241231")
+
+    assert min(sink.bars["NAS:AAPL"]) >= 20240601
+    assert results["NAS:AAPL"] == len([d for d in DAYS if d >= 20240601])
+    assert sink.bars["NAS:AAPL"][DAYS[-1]].close == 1.5
+
+
+def test_resumes_after_interruption(kis, httpx_mock, tmp_path):
+    path = tmp_path / "ckpt.jsonl"
+    httpx_mock.add_callback(_history(DAYS), is_reusable=True)
+    calls = 0
+
+    def flaky(key, bars):
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            raise OSError("disk full")
+        sink(key, bars)
+
+    sink = Sink()
+    _, errors = backfill.backfill(kis, ["005930"], "20240101", flaky, path, end="20241231")
+    assert isinstance(errors["005930"], OSError)
+    assert Checkpoint(path).get("005930") == {
+        "newest": DAYS[-1], "oldest": DAYS[-100], "complete": False,
+    }
+
+    before = len(httpx_mock.get_requests())
+    results, errors = backfill.backfill(kis, ["005930"], "20240101", sink, path, end="20241231")
+
+    assert errors == {} and results["005930"] == 151  # newest 봉 재전송 포함
+    assert sorted(sink.bars["005930"]) == DAYS
+    first = httpx_mock.get_requests()[before]
+    assert first.url.params["FID_INPUT_DATE_2"] == "20241231"  # 신규 봉 확인 후
+    resumed = httpx_mock.get_requests()[before + 1]
+    assert int(resumed.url.params["FID_INPUT_DATE_2"]) < DAYS[-100]  # 멈춘 곳부터
+
+
+def test_incremental_run_fetches_only_new_bars(kis, httpx_mock, tmp_path):
+    path = tmp_path / "ckpt.jsonl"
+    httpx_mock.add_callback(_history(DAYS[:200]), is_reusable=True)
+    backfill.backfill(kis, ["005930"], "20240101", Sink(), path, end="20241231")
+    httpx_mock.reset()
+
+    httpx_mock.add_callback(_history(DAYS), is_reusable=True)
+    sink = Sink()
+    results, _ = backfill.backfill(kis, ["005930"], "20240101", sink, path, end="20241231")
+
+    assert results["005930"] == 51 and sorted(sink.bars["005930"]) == DAYS[199:]
+    assert len(httpx_mock.get_requests()) == 1
+    assert Checkpoint(path).get("005930")["newest"] == DAYS[-1]
+
+
+
+def test_rerun_replaces_intraday_newest_bar(kis, httpx_mock, tmp_path):
+    path = tmp_path / "ckpt.jsonl"
+
+    def respond(close):
+        def cb(request):
+            return httpx.Response(200, json={"rt_cd": "0", "output2": [
+                {"stck_bsop_date": str(d), "stck_clpr": close if d == 20260105 else "90"}
+                for d in (20260105, 20260102)
+                if d <= int(request.url.params["FID_INPUT_DATE_2"])
+            ]})
+        return cb
+
+    httpx_mock.add_callback(respond("100"), is_reusable=True)  # 장중 실행: 미완성 봉
+    backfill.backfill(kis, ["005930"], "20260102", Sink(), path, end="20260105")
+    httpx_mock.reset()
+
+    httpx_mock.add_callback(respond("120"), is_reusable=True)  # 다음 날: 확정 종가
+    sink = Sink()
+    backfill.backfill(kis, ["005930"], "20260102", sink, path, end="20260106")
+
+    assert sink.bars["005930"][20260105].close == 120
+    assert Checkpoint(path).get("005930")["newest"] == 20260105
+
+def test_checkpoint_skips_truncated_line_and_compacts(tmp_path):
+    path = tmp_path / "ckpt.jsonl"
+    ckpt = Checkpoint(path)
+    ckpt.update("005930", oldest=20240105)
+    ckpt.update("005930", oldest=20240102, complete=True)
+    with open(path, "a") as f:
+        f.write('["000660", {"old')
+
+    loaded = Checkpoint(path)
+
+    assert loaded.get("005930") == {"oldest": 20240102, "complete": True}
+    assert loaded.get("000660") == {}
+    assert len(path.read_text().splitlines()) == 1
+
+
+@patch("kis.async_client.get_token_async", new_callable=AsyncMock, return_value="test_token")
+async def test_async_backfill(_, async_kis, httpx_mock):
+    httpx_mock.add_callback(_history(DAYS), is_reusable=True)
+    sink = Sink()
+
+    results, errors = await backfill.backfill(
+        async_kis, ["005930", ("AAPL", "NAS")], "20240101", sink, end="20241231"
+    )
+
+    assert errors == {} and results == {"005930": 250, "NAS:AAPL": 250}
+    assert sorted(sink.bars["NAS:AAPL"]) == DAYS
+    await async_kis.close()
@@ -0,0 +1,80 @@
+"""cache.py 테스트"""
+
+from datetime import datetime
+from unittest.mock import patch
+
+from kis import domestic
+from kis.cache import EOD, KST, Cache, end_of_day
+from kis.client import KIS, _flight_key
+
+PRICE = _flight_key("/price", {"FID_INPUT_ISCD": "005930"}, "FHKST01010100")
+
+
+def test_hit_within_ttl():
+    cache = Cache()
+    cache.put(PRICE, {"stck_prpr": "70000"}, 1000.0)
+    assert cache.get(PRICE, 1000.5) == {"stck_prpr": "70000"}
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 0, "evictions": 0}
+
+
+def test_expires_after_ttl():
+    cache = Cache()
+    cache.put(PRICE, {"stck_prpr": "70000"}, 1000.0)
+    assert cache.get(PRICE, 1001.0) is None
+    assert cache.misses == 1
+
+
+def test_custom_ttl():
+    cache = Cache(ttl={"FHKST01010100": 10.0})
+    cache.put(PRICE, {}, 1000.0)
+    assert cache.get(PRICE, 1009.0) == {}
+
+
+def test_non_quote_tr_not_cached():
+    cache = Cache()
+    key = _flight_key("/balance", {}, "VTTC8434R")
+    cache.put(key, {"x": 1}, 1000.0)
+    assert cache.get(key, 1000.0) is None
+    assert cache.stats()["size"] == 0 and cache.misses == 0
+
+
+def test_lru_eviction():
+    cache = Cache(maxsize=2)
+    keys = [_flight_key("/price", {"s": s}, "FHKST01010100") for s in "abc"]
+    cache.put(keys[0], 0, 1000.0)
+    cache.put(keys[1], 1, 1000.0)
+    cache.get(keys[0], 1000.0)  # a가 최근 사용
+    cache.put(keys[2], 2, 1000.0)
+    assert cache.get(keys[1], 1000.0) is None
+    assert cache.get(keys[0], 1000.0) == 0
+    assert cache.evictions == 1
+
+
+def test_end_of_day():
+    now = datetime(2025, 1, 16, 15, 30, tzinfo=KST).timestamp()
+    assert end_of_day(now) == datetime(2025, 1, 17, tzinfo=KST).timestamp()
+
+
+def test_daily_expires_at_end_of_day():
+    cache = Cache()
+    key = _flight_key("/daily", {}, "FHKST01010400")
+    assert cache.ttl["FHKST01010400"] == EOD
+    now = datetime(2025, 1, 16, 9, 0, tzinfo=KST).timestamp()
+    cache.put(key, [{"stck_clpr": "70000"}], now)
+    assert cache.get(key, now + 3600 * 14) is not None
+    assert cache.get(key, now + 3600 * 15) is None
+
+
+@patch("kis.client.get_token", return_value="test_token")
+def test_client_serves_quotes_from_cache(_, httpx_mock):
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"stck_prpr": "70000"}})
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"dnca_tot_amt": "1"}}, is_reusable=True)
+    cache = Cache()
+    kis = KIS("key", "secret", "12345678-01", cache=cache)
+
+    assert domestic.price(kis, "005930") == domestic.price(kis, "005930")
+    domestic.balance(kis)
+    domestic.balance(kis)
+
+    assert len(httpx_mock.get_requests()) == 3  # price 1회 + balance 2회
+    assert cache.hits == 1
@@ -72,3 +72,63 @@ def test_verify_balance_mismatch():
         {"evlu_amt": "500000"},
     ]
     assert not calc.verify_balance(balance, positions)
+
+
+# === Portfolio ===
+
+
+def _pos(symbol, qty, price, cost):
+    return {
+        "pdno": symbol, "hldg_qty": str(qty), "prpr": str(price),
+        "pchs_amt": str(cost), "evlu_amt": str(qty * price),
+        "evlu_pfls_amt": str(qty * price - cost),
+    }
+
+
+def test_portfolio_matches_list_functions():
+    positions = [_pos("005930", 100, 71000, 7000000), _pos("000660", 10, 180000, 2000000)]
+
+    book = calc.Portfolio.from_positions(positions)
+
+    assert book.total_value() == calc.total_value(positions) == 8900000
+    assert book.total_profit() == calc.total_profit(positions) == -100000
+    assert list(book.profits()) == [100000, -200000]
+    assert book.weights() == [7100000 / 8900000, 1800000 / 8900000]
+    assert book.returns() == [100000 / 7000000, -0.1]
+
+
+def test_portfolio_skips_empty_rows_and_blank_fields():
+    book = calc.Portfolio.from_positions(
+        [_pos("005930", 0, 71000, 0), {"pdno": "000660", "hldg_qty": "5", "prpr": ""}]
+    )
+
+    assert book.symbols == ("000660",) and book.total_value() == 0
+    assert book.weights() == [0.0] and book.returns() == [0.0]
+
+
+def test_portfolio_concat_and_by_account():
+    a = calc.Portfolio.from_positions([_pos("005930", 10, 70000, 600000)], account="A")
+    b = calc.Portfolio.from_positions([_pos("005930", 1, 70000, 70000)], account="B")
+
+    book = calc.Portfolio.concat([a, b])
+
+    assert len(book) == 2 and book.accounts == ("A", "B")
+    assert book.by_account() == {"A": 700000, "B": 70000}
+    assert len(a) == 1  # 원본 유지
+
+
+def test_portfolio_reprice_is_exact_integer():
+    book = calc.Portfolio.from_positions([
+        _pos("005930", 3, 70000, 210000), _pos("000660", 7, 100000, 700000),
+    ])
+
+    book.reprice({"005930": 70001})
+
+    assert list(book.value) == [210003, 700000]
+    assert book.total_profit() == 3 and isinstance(book.total_value(), int)
+
+
+def test_portfolio_verify():
+    book = calc.Portfolio.from_positions([_pos("005930", 10, 70000, 0)])
+    assert book.verify({"tot_evlu_amt": "700000"})
+    assert not book.verify({"tot_evlu_amt": "700001"})
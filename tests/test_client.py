@@ -1,10 +1,18 @@
-from unittest.mock import patch
+import time
+from unittest.mock import Mock, patch
 
 import httpx
 import pytest
 
 from kis.client import KIS
-from kis.errors import CircuitBreakerError, KISError, NetworkError, RateLimitError
+from kis.errors import (
+    CircuitBreakerError,
+    KISError,
+    NetworkError,
+    RateLimitError,
+    TokenExpiredError,
+)
+from kis.resilience import RetryBudget, RetryPolicy
 
 
 def test_init_and_switch():
@@ -33,6 +41,26 @@ def test_headers(_, kis):
     assert headers["tr_id"] == "TR001"
 
 
+def test_headers_cached_until_token_rotates(kis):
+    from kis import auth
+
+    auth._tokens[("paper", "test_key")] = ("tok1", 1000.0 + 3600)
+    with patch("kis.client.get_token", return_value="tok1") as mock, \
+            patch("kis.client.time", return_value=1000.0):
+        h1 = kis._headers("TR001")
+        assert kis._headers("TR001") is h1
+        assert kis._headers("TR002")["tr_id"] == "TR002"
+        assert mock.call_count == 1
+
+    auth._tokens[("paper", "test_key")] = ("tok2", 1000.0 + 7200)
+    with patch("kis.client.get_token", return_value="tok2"), \
+            patch("kis.client.time", return_value=1000.0 + 3600):
+        h2 = kis._headers("TR001")
+    assert h2 is not h1 and h2["authorization"] == "Bearer tok2"
+    assert h1["authorization"] == "Bearer tok1"  # 기존 템플릿은 변경되지 않음
+    auth._tokens.clear()
+
+
 @patch("kis.client.get_token", return_value="test_token")
 def test_get_success(_, kis, httpx_mock):
     httpx_mock.add_response(json={"rt_cd": "0", "output": {"price": "70000"}})
@@ -106,6 +134,66 @@ def test_retry_on_429_max_retries_exceeded(mock_sleep, _, httpx_mock):
     assert mock_sleep.call_count == 2
 
 
+EGW00201 = {"rt_cd": "1", "msg_cd": "EGW00201", "msg1": "초당 거래건수를 초과하였습니다."}
+
+
+@patch("kis.client.get_token", return_value="test_token")
+@patch("kis.client.sleep")
+def test_egw00201_retried_like_429(mock_sleep, _, httpx_mock):
+    kis = KIS("key", "secret", "12345678-01", max_retries=2, retry_delay=1.0)
+    httpx_mock.add_response(status_code=500, json=EGW00201)
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"ok": "1"}})
+
+    assert kis.get("/test", {}, "TR001") == {"ok": "1"}
+    mock_sleep.assert_called_once_with(1.0)
+
+
+@patch("kis.client.get_token", return_value="test_token")
+@patch("kis.client.sleep")
+def test_egw00201_max_retries_keeps_code(mock_sleep, _, httpx_mock):
+    kis = KIS("key", "secret", "12345678-01", max_retries=1)
+    httpx_mock.add_response(json=EGW00201, is_reusable=True)
+
+    with pytest.raises(RateLimitError) as exc:
+        kis.get("/test", {}, "TR001")
+    assert exc.value.code == "EGW00201"
+
+
+@patch("kis.client.get_token", return_value="test_token")
+def test_http_error_without_kis_body(_, httpx_mock):
+    kis = KIS("key", "secret", "12345678-01", max_retries=0)
+    httpx_mock.add_response(status_code=502, text="Bad Gateway")
+
+    with pytest.raises(httpx.HTTPStatusError):
+        kis.get("/test", {}, "TR001")
+
+
+@patch("kis.client.get_token", return_value="test_token")
+@patch("kis.client.sleep")
+@patch("kis.client.time")
+def test_adaptive_throttle_backs_off_and_recovers(mock_time, mock_sleep, _, httpx_mock):
+    mock_time.return_value = 1000.0
+    kis = KIS("key", "secret", "12345678-01", adaptive=True)
+    httpx_mock.add_response(status_code=429)
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"ok": "1"}}, is_reusable=True)
+
+    kis.get("/test", {}, "TR001")
+    assert kis._bucket.rate == 10  # 20 * 0.5
+
+    mock_time.return_value = 1002.0
+    kis.get("/test", {}, "TR001")
+    assert kis._bucket.rate == 11
+    assert kis.switch("prod").adaptive
+
+
+def test_adaptive_rejects_shared_limiter(tmp_path):
+    from kis.resilience import SharedLimiter
+
+    limiter = SharedLimiter("paper", "key", directory=str(tmp_path))
+    with pytest.raises(ValueError, match="adaptive"):
+        KIS("key", "secret", "12345678-01", limiter=limiter, adaptive=True)
+
+
 # === Network Error Tests ===
 
 
@@ -134,6 +222,94 @@ def test_network_error_max_retries(mock_sleep, _, httpx_mock):
         kis.get("/test", {}, "TR001")
 
 
+@patch("kis.client.get_token", return_value="test_token")
+@patch("kis.client.sleep")
+def test_retry_full_jitter(mock_sleep, _, httpx_mock):
+    kis = KIS("key", "secret", "12345678-01", retry=RetryPolicy(jitter=True))
+    httpx_mock.add_response(status_code=429)
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"ok": "1"}})
+
+    with patch("kis.resilience.random.uniform", return_value=0.3) as uniform:
+        kis.get("/test", {}, "TR001")
+
+    uniform.assert_called_once_with(0, 1.0)
+    mock_sleep.assert_called_once_with(0.3)
+
+
+@patch("kis.client.get_token", return_value="test_token")
+@patch("kis.client.sleep")
+def test_retry_budget_fails_fast(mock_sleep, _, httpx_mock):
+    budget = RetryBudget(ratio=0.0, min_per_sec=0.0, max_balance=1.0)
+    kis = KIS("key", "secret", "12345678-01", cb_threshold=0, retry=RetryPolicy(budget=budget))
+    httpx_mock.add_exception(httpx.ConnectError("down"))
+    httpx_mock.add_exception(httpx.ConnectError("down"))
+
+    with pytest.raises(NetworkError):
+        kis.get("/test", {}, "TR001")  # 예산 1회만 재시도
+
+    assert mock_sleep.call_count == 1
+    assert len(httpx_mock.get_requests()) == 2
+
+
+@patch("kis.client.get_token", return_value="test_token")
+def test_hedged_quote_takes_first_response(_, httpx_mock):
+    kis = KIS("key", "secret", "12345678-01", retry=RetryPolicy(hedge=0.95, hedge_delay=0.05))
+    calls = []
+
+    def respond(request):
+        calls.append(request)
+        if len(calls) == 1:
+            time.sleep(0.5)  # 느린 첫 요청
+            return httpx.Response(200, json={"rt_cd": "0", "output": {"from": "first"}})
+        return httpx.Response(200, json={"rt_cd": "0", "output": {"from": "hedge"}})
+
+    httpx_mock.add_callback(respond, is_reusable=True)
+
+    assert kis.get("/quote", {}, "FHKST01010100") == {"from": "hedge"}
+    assert len(calls) == 2
+    kis.close()
+
+
+@patch("kis.client.get_token", return_value="test_token")
+def test_hedge_clock_starts_after_throttle_slot(_, httpx_mock):
+    kis = KIS("key", "secret", "12345678-01", throttle_rate=2, throttle_burst=1,
+              retry=RetryPolicy(hedge=0.95, hedge_delay=0.05))
+    kis._bucket.wait(time.time())  # 첫 요청은 0.5초 throttle 대기
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"ok": "1"}}, is_reusable=True)
+
+    assert kis.get("/quote", {}, "FHKST01010100") == {"ok": "1"}
+    kis._executor.shutdown(wait=True)
+    assert len(httpx_mock.get_requests()) == 1  # 대기 중에 중복 요청을 보내지 않음
+
+
+@patch("kis.client.get_token", return_value="test_token")
+def test_hedge_charged_to_retry_budget(_, httpx_mock):
+    budget = RetryBudget(max_balance=0.0)  # 재시도 여유 없음
+    kis = KIS("key", "secret", "12345678-01",
+              retry=RetryPolicy(budget=budget, hedge=0.95, hedge_delay=0.05))
+
+    def respond(request):
+        time.sleep(0.3)
+        return httpx.Response(200, json={"rt_cd": "0", "output": {"ok": "1"}})
+
+    httpx_mock.add_callback(respond, is_reusable=True)
+
+    assert kis.get("/quote", {}, "FHKST01010100") == {"ok": "1"}
+    assert len(httpx_mock.get_requests()) == 1
+    kis.close()
+
+
+@patch("kis.client.get_token", return_value="test_token")
+def test_hedge_skips_non_quote(_, httpx_mock):
+    kis = KIS("key", "secret", "12345678-01", retry=RetryPolicy(hedge=0.95, hedge_delay=0.0))
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"ok": "1"}})
+
+    kis.get("/balance", {}, "VTTC8434R")
+
+    assert kis._executor is None
+    assert len(httpx_mock.get_requests()) == 1
+
+
 # === Circuit Breaker Tests ===
 
 
@@ -157,12 +333,73 @@ def test_circuit_breaker_opens(mock_sleep, _, httpx_mock):
 def test_circuit_breaker_resets_on_success(_, httpx_mock):
     """성공 시 circuit breaker 리셋"""
     kis = KIS("key", "secret", "12345678-01", cb_threshold=3, throttle_rate=0)
-    kis._cb_failures = 2  # 임계값 직전
+    kis._breaker("domestic-quote").failures = 2  # 임계값 직전
 
     httpx_mock.add_response(json={"rt_cd": "0", "output": {}})
     kis.get("/test", {}, "TR001")
 
-    assert kis._cb_failures == 0
+    assert kis._breaker("domestic-quote").failures == 0
+
+
+@patch("kis.client.get_token", return_value="test_token")
+@patch("kis.client.sleep")
+def test_circuit_breaker_isolated_per_endpoint_group(mock_sleep, _, httpx_mock):
+    """해외 장애가 국내 주문 breaker를 열지 않음"""
+    kis = KIS("key", "secret", "12345678-01", max_retries=0, cb_threshold=1, throttle_rate=0)
+    httpx_mock.add_exception(httpx.ConnectError("fail"))
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"ODNO": "1"}})
+
+    with pytest.raises(NetworkError):
+        kis.get("/uapi/overseas-price/v1/quotations/price", {}, "HHDFS00000300")
+    with pytest.raises(CircuitBreakerError, match="overseas"):
+        kis.get("/uapi/overseas-price/v1/quotations/price", {}, "HHDFS00000300")
+    assert kis.post("/uapi/domestic-stock/v1/trading/order-cash", {}, "VTTC0802U") == {"ODNO": "1"}
+    assert kis.circuit_states() == {"overseas": "open", "domestic-order": "closed"}
+
+
+@patch("kis.client.get_token", return_value="test_token")
+@patch("kis.client.time")
+def test_circuit_breaker_half_open_single_probe(mock_time, _, httpx_mock):
+    mock_time.return_value = 1000.0
+    kis = KIS("key", "secret", "12345678-01", cb_threshold=1, cb_recovery_time=30.0)
+    breaker = kis._breaker("domestic-quote")
+    breaker.on_failure(900.0)  # 970에 half-open
+    assert kis.circuit_states() == {"domestic-quote": "half_open"}
+
+    assert breaker.allow(1000.0)  # probe
+    assert not breaker.allow(1000.1)  # probe 진행 중: 즉시 실패
+    with pytest.raises(CircuitBreakerError):
+        kis.get("/test", {}, "TR001")
+
+    breaker.on_success()
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"ok": "1"}})
+    assert kis.get("/test", {}, "TR001") == {"ok": "1"}
+    assert kis.circuit_states() == {"domestic-quote": "closed"}
+
+
+@patch("kis.client.get_token", return_value="test_token")
+def test_circuit_breaker_counts_gateway_5xx(_, httpx_mock):
+    kis = KIS("key", "secret", "12345678-01", max_retries=0, cb_threshold=1)
+    httpx_mock.add_response(status_code=502, text="Bad Gateway")
+
+    with pytest.raises(httpx.HTTPStatusError):
+        kis.get("/test", {}, "TR001")
+    with pytest.raises(CircuitBreakerError):
+        kis.get("/test", {}, "TR001")
+
+
+@patch("kis.client.get_token", return_value="test_token")
+@patch("kis.client.sleep")
+@patch("kis.client.time", return_value=1000.0)
+def test_circuit_breaker_probe_retries_after_429(mock_time, mock_sleep, _, httpx_mock):
+    kis = KIS("key", "secret", "12345678-01", cb_threshold=1, cb_recovery_time=30.0,
+              throttle_rate=0)
+    kis._breaker("domestic-quote").on_failure(900.0)  # half-open
+    httpx_mock.add_response(status_code=429)
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"ok": "1"}})
+
+    assert kis.get("/test", {}, "TR001") == {"ok": "1"}  # probe의 재시도가 막히지 않음
+    assert kis.circuit_states() == {"domestic-quote": "closed"}
 
 
 # === Throttle Tests ===
@@ -183,3 +420,170 @@ def test_throttle_delays_request(mock_time, mock_sleep, _, httpx_mock):
 
     # 3번째 요청에서 throttle 대기 발생
     assert any(call[0][0] > 0 for call in mock_sleep.call_args_list)
+
+
+@patch("kis.client.get_token", return_value="test_token")
+@patch("kis.client.sleep")
+@patch("kis.client.time", return_value=1000.0)
+def test_shared_limiter_replaces_local_throttle(mock_time, mock_sleep, _, tmp_path, httpx_mock):
+    """프로세스 간 공유 limiter 사용"""
+    from kis.resilience import SharedLimiter
+
+    limiter = SharedLimiter("paper", "key", rate=10, burst=1, directory=str(tmp_path))
+    kis = KIS("key", "secret", "12345678-01", limiter=limiter, cb_threshold=0)
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {}})
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {}})
+
+    kis.get("/test", {}, "TR001")
+    kis.get("/test", {}, "TR001")
+
+    assert [c[0][0] for c in mock_sleep.call_args_list] == pytest.approx([0.1])
+    assert kis.switch("prod").limiter.env == "prod"
+
+
+@patch("kis.client.get_token", return_value="test_token")
+@patch("kis.client.sleep")
+@patch("kis.client.time", return_value=1000.0)
+def test_order_reserve_keeps_orders_unthrottled(mock_time, mock_sleep, _, httpx_mock):
+    """시세 조회가 한도를 소진해도 주문 몫은 남아 있음"""
+    kis = KIS("key", "secret", "12345678-01", throttle_rate=4, order_reserve=2, cb_threshold=0)
+    for _ in range(4):
+        httpx_mock.add_response(json={"rt_cd": "0", "output": {}})
+
+    kis.get("/quote", {}, "FHKST01010100")
+    kis.get("/quote", {}, "FHKST01010100")
+    assert mock_sleep.call_count == 0
+    kis.post("/order", {}, "TTTC0802U")
+    kis.post("/order", {}, "TTTC0802U")
+    assert mock_sleep.call_count == 0
+    assert kis._buckets["quote"].wait(1000.0) > 0  # 시세 몫은 소진
+
+
+@patch("kis.client.get_token", return_value="test_token")
+@patch("kis.client.sleep")
+@patch("kis.client.time", return_value=1000.0)
+def test_order_reserve_with_shared_limiter(mock_time, mock_sleep, _, tmp_path, httpx_mock):
+    """여러 프로세스의 시세 조회가 합쳐서 rate - order_reserve를 넘지 않음"""
+    from kis.resilience import SharedLimiter
+
+    def worker():  # 프로세스마다 따로 만든 클라이언트
+        limiter = SharedLimiter("paper", "key", rate=4, directory=str(tmp_path))
+        return KIS("key", "secret", "12345678-01", limiter=limiter, order_reserve=2,
+                   cb_threshold=0)
+
+    a, b = worker(), worker()
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {}}, is_reusable=True)
+
+    a.get("/quote", {}, "FHKST01010100")
+    a.get("/quote", {}, "FHKST01010100")
+    assert mock_sleep.call_count == 0
+    b.get("/quote", {}, "FHKST01010100")  # 시세 몫(2)은 a가 이미 소진
+    assert mock_sleep.call_count == 1
+
+
+# === Coalescing Tests ===
+
+
+@patch("kis.client.get_token", return_value="test_token")
+def test_coalesce_concurrent_gets(_, httpx_mock):
+    """동일한 동시 GET은 한 번만 전송"""
+    import threading
+    import time as _time
+
+    gate, calls = threading.Event(), []
+
+    def respond(request):
+        calls.append(request.url)
+        gate.wait(2)
+        return httpx.Response(200, json={"rt_cd": "0", "output": {"price": "70000"}})
+
+    httpx_mock.add_callback(respond, is_reusable=True)
+    kis = KIS("key", "secret", "12345678-01", coalesce=True)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(kis.get("/p", {"a": "1"}, "TR")))]
+    threads[0].start()
+    while not kis._inflight:
+        _time.sleep(0.001)
+    threads.append(threading.Thread(target=lambda: results.append(kis.get("/p", {"a": "1"}, "TR"))))
+    threads[1].start()
+    _time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [{"price": "70000"}] * 2
+    assert kis._inflight == {}
+
+
+@patch("kis.client.get_token", return_value="test_token")
+def test_coalesce_error_clears_inflight(_, httpx_mock):
+    kis = KIS("key", "secret", "12345678-01", coalesce=True)
+    httpx_mock.add_response(json={"rt_cd": "1", "msg_cd": "UNKNOWN", "msg1": "fail"})
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"ok": "1"}})
+
+    with pytest.raises(KISError):
+        kis.get("/p", {}, "TR")
+    assert kis.get("/p", {}, "TR") == {"ok": "1"}
+
+
+# === Token Refresh Tests ===
+
+
+def test_token_expired_reissues_and_retries_once(httpx_mock):
+    """EGW00123 시 토큰 재발급 후 한 번 재시도"""
+    from kis import auth
+
+    auth._tokens[("paper", "key")] = ("old", time.time() + 3600)
+    # 실서버는 EGW 오류를 HTTP 500 + 본문 msg_cd로 보냄
+    httpx_mock.add_response(
+        status_code=500, json={"rt_cd": "1", "msg_cd": "EGW00123", "msg1": "기간 만료된 token"}
+    )
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"ok": "1"}})
+    kis = KIS("key", "secret", "12345678-01")
+
+    with patch.object(auth, "_issue_token", return_value=("new", time.time() + 3600)) as issue:
+        assert kis.get("/test", {}, "TR001") == {"ok": "1"}
+        issue.assert_called_once()
+
+    auths = [r.headers["authorization"] for r in httpx_mock.get_requests()]
+    assert auths == ["Bearer old", "Bearer new"]
+    auth._tokens.clear()
+
+
+@patch("kis.client.get_token", return_value="test_token")
+def test_token_expired_twice_raises(_, kis, httpx_mock):
+    expired = {"rt_cd": "1", "msg_cd": "EGW00123", "msg1": "기간 만료된 token"}
+    httpx_mock.add_response(json=expired)
+    httpx_mock.add_response(json=expired)
+
+    with pytest.raises(TokenExpiredError):
+        kis.get("/test", {}, "TR001")
+
+
+def test_background_refresh_backs_off_after_failure():
+    kis = KIS("key", "secret", "12345678-01")
+    kis.token_refresh = 300
+    kis._stop = Mock(wait=Mock(side_effect=[False, False, True]))
+    with patch("kis.client.get_token", side_effect=httpx.ConnectError("down")):
+        kis._refresh_loop()
+
+    assert [c.args[0] for c in kis._stop.wait.call_args_list] == [1.0, 60.0, 60.0]
+
+
+def test_background_refresh_renews_before_expiry():
+    from kis import auth
+
+    auth._tokens[("paper", "key")] = ("old", time.time() + 200)  # 300초 안에 만료
+    with patch.object(auth, "_issue_token", return_value=("new", time.time() + 86400)), \
+            patch("kis.client._refresh_delay", return_value=0.01):
+        kis = KIS("key", "secret", "12345678-01", token_refresh=300)
+        deadline = time.time() + 2
+        while auth._tokens[("paper", "key")][0] != "new" and time.time() < deadline:
+            time.sleep(0.01)
+        kis.close()
+
+    assert auth._tokens[("paper", "key")][0] == "new"
+    kis._refresher.join(1)
+    assert not kis._refresher.is_alive()
+    auth._tokens.clear()
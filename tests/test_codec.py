@@ -0,0 +1,40 @@
+"""codec.py 테스트"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from kis import codec
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+@pytest.fixture(params=list(codec.BACKENDS))
+def backend(request):
+    prev = codec.backend
+    codec.use(request.param)
+    yield request.param
+    codec.use(prev)
+
+
+def test_roundtrip(backend):
+    msg = {"header": {"tr_type": "1"}, "body": {"input": {"tr_id": "H0STCNT0", "tr_key": "005930"}}}
+    out = codec.dumps(msg)
+    assert isinstance(out, str)
+    assert codec.loads(out) == msg
+    assert codec.loads(out.encode()) == msg
+
+
+def test_matches_stdlib(backend):
+    raw = (FIXTURES / "domestic_balance.json").read_bytes()
+    assert codec.loads(raw) == json.loads(raw)
+
+
+def test_auto_selects_fastest():
+    assert codec.backend == ("orjson" if codec.orjson is not None else "json")
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        codec.use("ujson")
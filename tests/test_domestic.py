@@ -1,11 +1,14 @@
 import json
+import sys
 from pathlib import Path
 from unittest.mock import patch
 
+import httpx
 import pytest
 
 from kis import domestic
-from kis.errors import KISError
+from kis.errors import KISError, SymbolError
+from kis.types import Quote
 
 FIXTURES = Path(__file__).parent / "fixtures"
 
@@ -49,6 +52,78 @@ def test_orderbook_returns_bid_ask(kis, httpx_mock):
     assert result["bidp1"] == "70000"
 
 
+def test_price_typed(kis, httpx_mock):
+    raw = load_fixture("domestic_price.json")
+    httpx_mock.add_response(json={"rt_cd": "0", "output": raw})
+
+    q = domestic.price(kis, "005930", typed=True)
+
+    assert q == Quote(70000, -1000, -1.41, 12345678, 876543210000, 71000, 71500, 69500)
+    assert q.price == 70000 and q.change_rate == -1.41
+    assert sys.getsizeof(q) < sys.getsizeof(raw)
+
+
+def test_orderbook_typed(kis, httpx_mock):
+    httpx_mock.add_response(json={"rt_cd": "0", "output": load_fixture("domestic_orderbook.json")})
+
+    ob = domestic.orderbook(kis, "005930", typed=True)
+
+    assert ob.asks == (70100, 70200, 70300) and ob.bids == (70000, 69900, 69800)
+    assert ob.ask_qty == (1000, 2000, 3000) and ob.bid_qty == (1500, 2500, 3500)
+    assert (ob.total_ask_qty, ob.total_bid_qty) == (50000, 60000)
+
+
+def test_quote_parse_tolerates_blank_fields():
+    q = Quote.parse({"stck_prpr": "70000", "prdy_ctrt": ""})
+    assert q == Quote(70000, 0, 0.0, 0, 0, 0, 0, 0)
+
+
+def _price_by_symbol(request):
+    symbol = request.url.params["FID_INPUT_ISCD"]
+    if symbol == "BAD":
+        return httpx.Response(200, json={"rt_cd": "1", "msg_cd": "APBK0013", "msg1": "오류"})
+    return httpx.Response(200, json={"rt_cd": "0", "output": {"stck_prpr": symbol[-3:]}})
+
+
+def test_prices_collects_results_and_errors(kis, httpx_mock):
+    httpx_mock.add_callback(_price_by_symbol, is_reusable=True)
+
+    results, errors = domestic.prices(kis, ["005930", "BAD", "000660", "005930"])
+
+    assert results == {"005930": {"stck_prpr": "930"}, "000660": {"stck_prpr": "660"}}
+    assert isinstance(errors["BAD"], SymbolError)
+    assert len(httpx_mock.get_requests()) == 3  # 중복 종목은 한 번만
+
+
+def test_prices_typed(kis, httpx_mock):
+    httpx_mock.add_callback(_price_by_symbol, is_reusable=True)
+
+    results, _ = domestic.prices(kis, ["005930"], typed=True)
+
+    assert results["005930"].price == 930
+
+
+def test_prices_multi_symbol_tr(kis, httpx_mock):
+    def respond(request):
+        params = request.url.params
+        rows = [
+            {"inter_shrn_iscd": params[f"FID_INPUT_ISCD_{i}"], "inter2_prpr": "100"}
+            for i in range(1, 31) if f"FID_INPUT_ISCD_{i}" in params and i != 2
+        ]
+        return httpx.Response(200, json={"rt_cd": "0", "output": rows})
+
+    httpx_mock.add_callback(respond, is_reusable=True)
+    symbols = [f"{i:06d}" for i in range(35)]
+
+    results, errors = domestic.prices(kis, symbols, typed=True, multi=True)
+
+    requests = httpx_mock.get_requests()
+    assert len(requests) == 2  # 30 + 5
+    assert {r.headers["tr_id"] for r in requests} == {"FHKST11300006"}
+    assert set(errors) == {"000001", "000031"}  # 각 묶음의 2번째 종목 누락
+    assert results["000000"].price == 100 and len(results) == 33
+
+
 def test_daily_returns_list(kis, httpx_mock):
     httpx_mock.add_response(json={"rt_cd": "0", "output": load_fixture("domestic_daily.json")})
 
@@ -66,6 +141,18 @@ def test_daily_returns_empty_list_on_non_list_output(kis, httpx_mock):
     assert result == []
 
 
+def test_daily_range_sends_dates(kis, httpx_mock):
+    httpx_mock.add_response(json={"rt_cd": "0", "output1": {}, "output2": [
+        {"stck_bsop_date": "20240105"}, {"stck_bsop_date": "20240104"},
+    ]})
+
+    result = domestic.daily_range(kis, "005930", "20240101", "20240105")
+
+    assert [r["stck_bsop_date"] for r in result] == ["20240105", "20240104"]
+    params = httpx_mock.get_requests()[0].url.params
+    assert (params["FID_INPUT_DATE_1"], params["FID_INPUT_DATE_2"]) == ("20240101", "20240105")
+
+
 # === 주문 테스트 ===
 
 
@@ -203,6 +290,51 @@ def test_balance_uses_paper_tr_id(kis, httpx_mock):
     assert httpx_mock.get_request().headers["tr_id"] == "VTTC8434R"
 
 
+# === 연속조회 테스트 ===
+
+
+def _paged(pages: list[list[dict]], key: str, width: str = "100"):
+    """pages[i] 행을 돌려주고 다음 페이지 키는 NK{i+1}, 마지막 페이지는 tr_cont=D"""
+    seen = []
+
+    def respond(request):
+        n = len(seen)
+        seen.append(request)
+        last = n == len(pages) - 1
+        body = {"rt_cd": "0", key: pages[n], "output2": [{}],
+                f"ctx_area_fk{width}": "FK", f"ctx_area_nk{width}": f"NK{n + 1}"}
+        return httpx.Response(200, json=body, headers={"tr_cont": "D" if last else "M"})
+
+    return respond, seen
+
+
+def test_iter_orders_follows_continuation(kis, httpx_mock):
+    respond, seen = _paged([[{"odno": "1"}, {"odno": "2"}], [{"odno": "3"}], []], "output1")
+    httpx_mock.add_callback(respond, is_reusable=True)
+
+    rows = domestic.iter_orders(kis, "20250101", "20250131")
+    assert next(rows) == {"odno": "1"}
+    assert len(seen) == 1  # 첫 페이지만 받은 상태에서 행 전달
+
+    assert [r["odno"] for r in rows] == ["2", "3"]
+    assert [r.headers["tr_cont"] for r in seen] == ["", "N", "N"]
+    assert [r.url.params["CTX_AREA_NK100"] for r in seen] == ["", "NK1", "NK2"]
+    assert seen[1].url.params["CTX_AREA_FK100"] == "FK"
+
+
+def test_iter_positions_single_page(kis, httpx_mock):
+    httpx_mock.add_response(json={"rt_cd": "0", "output1": [{"pdno": "005930"}], "output2": []})
+
+    assert list(domestic.iter_positions(kis)) == [{"pdno": "005930"}]
+
+
+def test_iter_pending_orders_stops_without_progress(kis, httpx_mock):
+    body = {"rt_cd": "0", "output": [{"odno": "1"}], "ctx_area_fk100": "", "ctx_area_nk100": ""}
+    httpx_mock.add_response(json=body, headers={"tr_cont": "M"})  # 키 없이 M: 무한 루프 방지
+
+    assert len(list(domestic.iter_pending_orders(kis))) == 1
+
+
 # === 포지션 관리 테스트 ===
 
 
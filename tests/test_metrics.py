@@ -0,0 +1,187 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from kis.async_client import AsyncKIS
+from kis.client import KIS
+from kis.errors import NetworkError
+from kis.metrics import Metrics
+from kis.resilience import TokenBucket
+
+EGW00201 = {"rt_cd": "1", "msg_cd": "EGW00201", "msg1": "초당 거래건수를 초과하였습니다."}
+
+
+def test_histogram_is_cumulative():
+    m = Metrics(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.1, 0.5, 3.0):
+        m.observe("FHKST01010100", seconds)
+
+    h = m.snapshot()["requests"]["FHKST01010100"]
+
+    assert h["buckets"] == {0.1: 2, 1.0: 3, float("inf"): 4}
+    assert h["count"] == 4 and h["sum"] == pytest.approx(3.65)
+
+
+def test_counters():
+    m = Metrics()
+    m.throttled(0.25)
+    m.throttled(0.5)
+    m.retried("429", 1.0)
+    m.retried("token", 0.0)
+    m.error(NetworkError("NETWORK", "x"))
+
+    snap = m.snapshot()
+
+    assert snap["throttle"] == {"waits": 2, "seconds": 0.75}
+    assert snap["backoff"] == {"sleeps": 1, "seconds": 1.0}
+    assert snap["retries"] == {"429": 1, "token": 1}
+    assert snap["errors"] == {"NetworkError": 1}
+
+
+@patch("kis.client.get_token", return_value="test_token")
+@patch("kis.client.sleep")
+def test_client_records_retries_and_latency(mock_sleep, _, httpx_mock):
+    m = Metrics()
+    kis = KIS("key", "secret", "12345678-01", max_retries=3, retry_delay=1.0, metrics=m)
+    httpx_mock.add_response(status_code=429, headers={"Retry-After": "0.5"})
+    httpx_mock.add_response(status_code=500, json=EGW00201)
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {}})
+
+    kis.get("/test", {}, "TR001")
+
+    snap = m.snapshot()
+    assert snap["requests"]["TR001"]["count"] == 3
+    assert snap["retries"] == {"429": 1, "EGW00201": 1}
+    assert snap["backoff"] == {"sleeps": 2, "seconds": 2.5}
+    assert snap["errors"] == {} and snap["circuits"] == {"domestic-quote": "closed"}
+
+
+@patch("kis.client.get_token", return_value="test_token")
+@patch("kis.client.sleep")
+def test_client_counts_final_error_by_class(mock_sleep, _, httpx_mock):
+    m = Metrics()
+    kis = KIS("key", "secret", "12345678-01", max_retries=1, cb_threshold=2, metrics=m)
+    httpx_mock.add_exception(httpx.ConnectError("down"), is_reusable=True)
+
+    with pytest.raises(NetworkError):
+        kis.get("/test", {}, "TR001")
+
+    snap = m.snapshot()
+    assert snap["retries"] == {"network": 1} and snap["errors"] == {"NetworkError": 1}
+    assert snap["requests"] == {}  # 응답을 받지 못한 시도는 지연 히스토그램에서 제외
+    assert snap["circuits"] == {"domestic-quote": "open"}
+
+
+@patch("kis.client.get_token", return_value="test_token")
+@patch("kis.client.sleep")
+@patch("kis.client.time", return_value=1000.0)
+def test_client_records_throttle_wait(mock_time, mock_sleep, _, httpx_mock):
+    m = Metrics()
+    kis = KIS("key", "secret", "12345678-01", throttle_rate=2, metrics=m)
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {}}, is_reusable=True)
+
+    for _ in range(3):
+        kis.get("/test", {}, "TR001")
+
+    throttle = m.snapshot()["throttle"]
+    assert throttle["waits"] == 1 and throttle["seconds"] == pytest.approx(0.5)
+
+
+@patch("kis.client.get_token", return_value="test_token")
+@patch("kis.client.sleep")
+@patch("kis.client.time", return_value=1000.0)
+def test_client_records_one_throttle_wait_per_request(mock_time, mock_sleep, _, httpx_mock):
+    m = Metrics()
+    kis = KIS("key", "secret", "12345678-01", throttle_rate=1, metrics=m)
+    kis._buckets = {"quote": TokenBucket(1, 1)}  # 시세 버킷 + 공용 버킷 둘 다 대기
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {}}, is_reusable=True)
+
+    for _ in range(2):
+        kis.get("/test", {}, "FHKST01010100")
+
+    assert m.snapshot()["throttle"] == {"waits": 1, "seconds": pytest.approx(2.0)}
+
+
+def _slow_token(*_):
+    time.sleep(0.2)
+    return "test_token"
+
+
+@patch("kis.client.get_token", side_effect=_slow_token)
+def test_latency_excludes_token_issuance(_, httpx_mock):
+    m = Metrics(buckets=(0.1,))
+    kis = KIS("key", "secret", "12345678-01", metrics=m)
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {}})
+
+    kis.get("/test", {}, "TR001")
+
+    assert m.snapshot()["requests"]["TR001"]["buckets"][0.1] == 1
+
+
+def test_switch_keeps_metrics():
+    m = Metrics()
+    kis = KIS("key", "secret", "12345678-01", metrics=m)
+    assert kis.switch("prod").metrics is m
+
+
+@patch("kis.async_client.get_token_async", new_callable=AsyncMock, return_value="test_token")
+@patch("kis.async_client.asyncio.sleep", new_callable=AsyncMock)
+async def test_async_client_records(mock_sleep, _, httpx_mock):
+    m = Metrics()
+    kis = AsyncKIS("key", "secret", "12345678-01", retry_delay=1.0, metrics=m)
+    httpx_mock.add_response(status_code=429)
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {}})
+
+    await kis.get("/test", {}, "TR001")
+
+    snap = m.snapshot()
+    assert snap["requests"]["TR001"]["count"] == 2
+    assert snap["retries"] == {"429": 1} and snap["backoff"]["seconds"] == 1.0
+    await kis.close()
+
+
+async def _slow_token_async(*_):
+    await asyncio.sleep(0.2)
+    return "test_token"
+
+
+@patch("kis.async_client.get_token_async", side_effect=_slow_token_async)
+async def test_async_latency_excludes_token_issuance(_, httpx_mock):
+    m = Metrics(buckets=(0.1,))
+    kis = AsyncKIS("key", "secret", "12345678-01", metrics=m)
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {}})
+
+    await kis.get("/test", {}, "TR001")
+
+    assert m.snapshot()["requests"]["TR001"]["buckets"][0.1] == 1
+    await kis.close()
+
+
+def test_prometheus_text():
+    m = Metrics(buckets=(0.1,))
+    m.observe("TR001", 0.05)
+    m.throttled(0.5)
+    m.retried("429", 1.0)
+    m.error(NetworkError("NETWORK", "x"))
+
+    text = m.prometheus()
+
+    assert "# TYPE kis_request_duration_seconds histogram" in text
+    assert 'kis_request_duration_seconds_bucket{tr_id="TR001",le="0.1"} 1' in text
+    assert 'kis_request_duration_seconds_bucket{tr_id="TR001",le="+Inf"} 1' in text
+    assert 'kis_request_duration_seconds_count{tr_id="TR001"} 1' in text
+    assert "kis_throttle_waits_total 1" in text and "kis_throttle_seconds_total 0.5" in text
+    assert 'kis_retries_total{reason="429"} 1' in text
+    assert 'kis_errors_total{error="NetworkError"} 1' in text
+    assert text.endswith("\n")
+
+
+def test_prometheus_circuit_gauge():
+    m = Metrics()
+    kis = KIS("key", "secret", "12345678-01", cb_threshold=1, metrics=m)
+    kis._breaker("overseas").on_failure(time.time())
+
+    assert 'kis_circuit_state{group="overseas"} 1' in m.prometheus()
@@ -2,10 +2,12 @@ import json
 from pathlib import Path
 from unittest.mock import patch
 
+import httpx
 import pytest
 
 from kis import overseas
 from kis.errors import KISError
+from kis.types import OverseasQuote
 
 FIXTURES = Path(__file__).parent / "fixtures"
 
@@ -56,6 +58,45 @@ def test_price_returns_required_fields(kis, httpx_mock):
     assert result["rate"] == "1.69"
 
 
+def test_price_typed(kis, httpx_mock):
+    httpx_mock.add_response(json={"rt_cd": "0", "output": load_fixture("overseas_price.json")})
+
+    q = overseas.price(kis, "AAPL", "NAS", typed=True)
+
+    assert q == OverseasQuote("DNASAAPL", 150.25, 2.5, 1.69, 12345678)
+
+
+def test_prices_keyed_by_symbol_and_exchange(kis, httpx_mock):
+    def respond(request):
+        symb = request.url.params["SYMB"]
+        if symb == "NONE":
+            return httpx.Response(200, json={"rt_cd": "1", "msg_cd": "X", "msg1": "없음"})
+        return httpx.Response(200, json={"rt_cd": "0", "output": {"rsym": symb, "last": "1"}})
+
+    httpx_mock.add_callback(respond, is_reusable=True)
+
+    results, errors = overseas.prices(kis, [("AAPL", "NAS"), ("IBM", "NYS"), ("NONE", "NAS")])
+
+    assert results[("AAPL", "NAS")]["rsym"] == "AAPL"
+    assert results[("IBM", "NYS")]["rsym"] == "IBM"
+    assert isinstance(errors[("NONE", "NAS")], KISError)
+
+
+def test_iter_positions_follows_continuation(kis, httpx_mock):
+    pages = iter([
+        ({"rt_cd": "0", "output1": [{"ovrs_pdno": "AAPL"}], "output2": {},
+          "ctx_area_fk200": "F", "ctx_area_nk200": "N1"}, "M"),
+        ({"rt_cd": "0", "output1": [{"ovrs_pdno": "TSLA"}], "output2": {}}, "D"),
+    ])
+    httpx_mock.add_callback(
+        lambda request: httpx.Response(200, json=(p := next(pages))[0], headers={"tr_cont": p[1]}),
+        is_reusable=True,
+    )
+
+    assert [p["ovrs_pdno"] for p in overseas.iter_positions(kis, "NAS")] == ["AAPL", "TSLA"]
+    assert httpx_mock.get_requests()[1].url.params["CTX_AREA_NK200"] == "N1"
+
+
 def test_price_sends_correct_params(kis, httpx_mock):
     httpx_mock.add_response(json={"rt_cd": "0", "output": load_fixture("overseas_price.json")})
 
@@ -90,6 +131,15 @@ def test_daily_returns_empty_list_on_non_list_output(kis, httpx_mock):
     assert result == []
 
 
+def test_daily_sends_end_date(kis, httpx_mock):
+    httpx_mock.add_response(json={"rt_cd": "0", "output1": {}, "output2": [{"xymd": "20240105"}]})
+
+    result = overseas.daily(kis, "AAPL", "NAS", end="20240105")
+
+    assert result == [{"xymd": "20240105"}]
+    assert httpx_mock.get_requests()[0].url.params["BYMD"] == "20240105"
+
+
 # === 주문 테스트 ===
 
 
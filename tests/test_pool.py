@@ -0,0 +1,76 @@
+"""pool.py 테스트"""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from kis import domestic, overseas
+from kis.async_client import AsyncKIS
+from kis.client import KIS
+from kis.pool import KISPool
+
+OK = {"rt_cd": "0", "output": {"stck_prpr": "70000"}}
+
+
+@pytest.fixture(autouse=True)
+def mock_token():
+    with patch("kis.client.get_token", return_value="test_token"):
+        yield
+
+
+def _keys(httpx_mock) -> list[str]:
+    return [r.headers["appkey"] for r in httpx_mock.get_requests()]
+
+
+def test_quotes_spread_across_keys(httpx_mock):
+    httpx_mock.add_response(json=OK, is_reusable=True)
+    pool = KISPool([KIS(f"key{i}", "secret", "12345678-01") for i in range(3)])
+
+    for _ in range(6):
+        domestic.price(pool, "005930")
+
+    assert sorted(_keys(httpx_mock)) == ["key0", "key0", "key1", "key1", "key2", "key2"]
+    pool.close()
+
+
+@patch("kis.client.sleep")
+def test_quotes_prefer_key_with_budget(mock_sleep, httpx_mock):
+    httpx_mock.add_response(json=OK, is_reusable=True)
+    busy = KIS("busy", "secret", "12345678-01", throttle_rate=1)
+    idle = KIS("idle", "secret", "12345678-01", throttle_rate=1)
+    pool = KISPool([busy, idle])
+    busy._bucket.wait(1e12)  # busy 키의 한도 소진
+
+    for _ in range(3):
+        overseas.price(pool, "AAPL", "NAS")
+
+    assert _keys(httpx_mock)[0] == "idle"
+    pool.close()
+
+
+def test_account_and_order_pinned_to_primary(httpx_mock):
+    httpx_mock.add_response(json={"rt_cd": "0", "output": {"ODNO": "1"}}, is_reusable=True)
+    pool = KISPool([KIS("other", "secret", "99999999-01"), KIS("owner", "secret", "12345678-01")],
+                   primary=1)
+
+    domestic.buy(pool, "005930", qty=1, price=70000)
+    domestic.balance(pool)
+
+    assert _keys(httpx_mock) == ["owner", "owner"]
+    assert pool.account == "12345678-01" and pool.is_paper
+    pool.close()
+
+
+def test_empty_pool_rejected():
+    with pytest.raises(ValueError):
+        KISPool([])
+
+
+@patch("kis.async_client.get_token_async", new_callable=AsyncMock, return_value="test_token")
+async def test_async_pool(_, httpx_mock):
+    httpx_mock.add_response(json=OK, is_reusable=True)
+    async with KISPool([AsyncKIS(f"key{i}", "secret", "12345678-01") for i in range(2)]) as pool:
+        for _ in range(4):
+            assert (await domestic.price(pool, "005930"))["stck_prpr"] == "70000"
+
+    assert sorted(_keys(httpx_mock)) == ["key0", "key0", "key1", "key1"]
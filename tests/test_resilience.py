@@ -1,7 +1,28 @@
+import multiprocessing
+import sys
 from collections import deque
 
-from kis.resilience import CB_CLOSED, CB_HALF_OPEN, CB_OPEN, cb_on_failure, cb_state, throttle_wait
+import pytest
 
+from kis.resilience import (
+    CB_CLOSED,
+    CB_HALF_OPEN,
+    CB_OPEN,
+    AdaptiveBucket,
+    CircuitBreaker,
+    LatencyWindow,
+    RetryBudget,
+    SharedLimiter,
+    TokenBucket,
+    backoff,
+    cb_on_failure,
+    cb_state,
+    endpoint_group,
+    gcra,
+    order_buckets,
+    throttle_wait,
+    tr_kind,
+)
 
 # === Throttle Tests ===
 
@@ -32,6 +53,197 @@ def test_throttle_cleans_old_timestamps():
     assert len(ts) == 2  # old ones removed, new one added
 
 
+# === GCRA / Shared Limiter Tests ===
+
+
+def test_gcra_allows_burst_then_spaces():
+    tat, waits = 0.0, []
+    for _ in range(4):
+        wait, tat = gcra(tat, 10, 2, 1000.0)
+        waits.append(round(wait, 6))
+    assert waits == [0.0, 0.0, 0.1, 0.2]
+
+
+def test_gcra_recovers_after_idle():
+    _, tat = gcra(0.0, 10, 1, 1000.0)
+    assert gcra(tat, 10, 1, 1001.0)[0] == 0.0
+
+
+def test_token_bucket_burst_then_rate():
+    bucket = TokenBucket(10, burst=3)
+    assert [bucket.wait(1000.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.wait(1000.0) == pytest.approx(0.1)
+    assert bucket.wait(1000.5) == 0.0  # 0.5초 동안 5토큰 회복
+
+
+def test_token_bucket_default_burst_is_rate():
+    bucket = TokenBucket(20)
+    assert all(bucket.wait(1000.0) == 0.0 for _ in range(20))
+    assert bucket.wait(1000.0) > 0
+
+
+def test_token_bucket_disabled():
+    assert TokenBucket(0).wait(1000.0) == 0.0
+
+
+def test_adaptive_bucket_aimd():
+    bucket = AdaptiveBucket(20)
+    bucket.on_overload(100.0)
+    assert bucket.rate == 10 and bucket.burst == 10
+    bucket.on_overload(100.5)  # 같은 1초 창: 무시
+    assert bucket.rate == 10
+    bucket.on_overload(101.0)
+    assert bucket.rate == 5
+    bucket.on_success(101.5)
+    assert bucket.rate == 5
+    bucket.on_success(102.0)
+    assert bucket.rate == 6
+    for t in range(103, 200):
+        bucket.on_success(float(t))
+    assert bucket.rate == 20 and bucket.burst == 20  # 상한은 초기 rate
+
+
+def test_adaptive_bucket_floor_and_disabled():
+    bucket = AdaptiveBucket(2, floor=1.0)
+    for t in range(5):
+        bucket.on_overload(float(t * 2))
+    assert bucket.rate == 1.0
+    disabled = AdaptiveBucket(0)
+    disabled.on_overload(100.0)
+    assert disabled.rate == 0 and disabled.wait(100.0) == 0.0
+
+
+@pytest.mark.parametrize(
+    "tr_id, kind",
+    [
+        ("TTTC0802U", "order"),
+        ("JTTT1006U", "order"),
+        ("VTTC8434R", "account"),
+        ("CTRP6504R", "account"),
+        ("FHKST01010100", "quote"),
+        ("HHDFS00000300", "quote"),
+    ],
+)
+def test_tr_kind(tr_id, kind):
+    assert tr_kind(tr_id) == kind
+
+
+def test_order_buckets_reserve():
+    buckets = order_buckets(20, None, 4)
+    assert "order" not in buckets
+    assert buckets["quote"] is buckets["account"] and buckets["quote"].rate == 16
+    assert order_buckets(20, None, 0) == {}
+
+
+def test_order_buckets_reserve_shared_across_processes(tmp_path):
+    limiter = SharedLimiter("paper", "key", rate=20, directory=str(tmp_path))
+    buckets = order_buckets(10, None, 4, limiter)  # 한도는 limiter 기준
+    quote = buckets["quote"]
+    assert isinstance(quote, SharedLimiter) and quote.rate == 16
+    assert quote.path != limiter.path and quote.path.parent == limiter.path.parent
+    assert quote.switch("prod").path != quote.path
+
+
+# === Retry Tests ===
+
+
+def test_backoff_exponential():
+    assert [backoff(1.0, a) for a in range(3)] == [1.0, 2.0, 4.0]
+
+
+def test_backoff_full_jitter():
+    samples = [backoff(1.0, 2, jitter=True) for _ in range(200)]
+    assert all(0 <= s <= 4.0 for s in samples)
+    assert len(set(samples)) > 1
+
+
+def test_retry_budget_exhausts_and_refills():
+    budget = RetryBudget(ratio=0.5, min_per_sec=1.0, max_balance=2.0)
+    assert budget.withdraw(100.0) and budget.withdraw(100.0)
+    assert not budget.withdraw(100.0)
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw(100.0)  # 요청 2건 * 0.5
+    assert budget.withdraw(101.0)  # 1초 경과 * min_per_sec
+    assert not budget.withdraw(101.0)
+
+
+def test_latency_window_percentile():
+    window = LatencyWindow()
+    window.add(0.1)
+    assert window.percentile(0.95) is None  # 표본 부족
+    for i in range(100):
+        window.add(i / 100)
+    assert window.percentile(0.5) == pytest.approx(0.49, abs=0.02)
+    assert window.percentile(1.0) == 0.99
+
+
+def test_shared_limiter_instances_share_budget(tmp_path):
+    a = SharedLimiter("paper", "key", rate=10, burst=1, directory=str(tmp_path))
+    b = SharedLimiter("paper", "key", rate=10, burst=1, directory=str(tmp_path))
+    assert a.path == b.path
+    assert a.wait(1000.0) == 0.0
+    assert b.wait(1000.0) == pytest.approx(0.1)
+    assert a.wait(1000.0) == pytest.approx(0.2)
+
+
+def test_shared_limiter_keyed_by_env_and_key(tmp_path):
+    a = SharedLimiter("paper", "key", rate=10, burst=1, directory=str(tmp_path))
+    assert a.wait(1000.0) == 0.0
+    other = SharedLimiter("paper", "other", rate=10, burst=1, directory=str(tmp_path))
+    assert other.wait(1000.0) == 0.0
+    assert a.switch("prod").wait(1000.0) == 0.0
+    assert "key" not in a.path.name  # app key는 파일명에 노출되지 않음
+
+
+def test_shared_limiter_disabled(tmp_path):
+    assert SharedLimiter("paper", "key", rate=0, directory=str(tmp_path)).wait(1000.0) == 0.0
+
+
+def test_shared_limiter_threads_do_not_overlap(tmp_path, monkeypatch):
+    import os
+    import threading
+    import time
+
+    limiter = SharedLimiter("paper", "key", rate=10, burst=10, directory=str(tmp_path))
+    pread = os.pread
+
+    def slow_pread(*args):
+        time.sleep(0.001)  # 읽기-쓰기 사이 창을 넓힘
+        return pread(*args)
+
+    monkeypatch.setattr("kis.resilience.os.pread", slow_pread)
+    waits = []
+    threads = [threading.Thread(target=lambda: waits.append(limiter.wait(1000.0)))
+               for _ in range(40)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(waits) == pytest.approx([0.0] * 10 + [0.1 * i for i in range(1, 31)])
+
+
+def _reserve(path: str, n: int, q) -> None:
+    limiter = SharedLimiter("paper", "key", rate=10, burst=1, directory=path)
+    q.put([limiter.wait(1000.0) for _ in range(n)])
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX only")
+def test_shared_limiter_across_processes(tmp_path):
+    limiter = SharedLimiter("paper", "key", rate=10, burst=1, directory=str(tmp_path))
+    limiter.wait(1000.0)  # fork 전에 fd를 열어 두어도 자식은 새로 연다
+    ctx = multiprocessing.get_context("fork")
+    q = ctx.Queue()
+    procs = [ctx.Process(target=_reserve, args=(str(tmp_path), 5, q)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    waits = sorted(w for _ in procs for w in q.get(timeout=10))
+    for p in procs:
+        p.join()
+    assert waits == pytest.approx([0.1 * i for i in range(1, 21)])
+
+
 # === Circuit Breaker Tests ===
 
 
@@ -62,3 +274,51 @@ def test_cb_on_failure_at_threshold():
     failures, open_until = cb_on_failure(4, 5, 30.0, 1000.0)
     assert failures == 5
     assert open_until == 1030.0
+
+
+def test_endpoint_group():
+    assert endpoint_group("/uapi/overseas-price/v1/quotations/price", "HHDFS00000300") == "overseas"
+    assert endpoint_group("/uapi/overseas-stock/v1/trading/order", "JTTT1002U") == "overseas"
+    assert endpoint_group("/uapi/domestic-stock/v1/trading/order-cash", "TTTC0802U") == (
+        "domestic-order"
+    )
+    assert endpoint_group("/uapi/domestic-stock/v1/quotations/inquire-price", "FHKST01010100") == (
+        "domestic-quote"
+    )
+
+
+def test_circuit_breaker_probe_lifecycle():
+    cb = CircuitBreaker(threshold=2, recovery=10.0)
+    cb.on_failure(100.0)
+    assert cb.allow(100.0)
+    cb.on_failure(100.0)
+    assert cb.state(105.0) == CB_OPEN and not cb.allow(105.0)
+    assert cb.allow(110.0)  # 단일 probe
+    assert not cb.allow(110.0)
+    cb.on_failure(111.0)  # probe 실패: 다시 open
+    assert cb.state(115.0) == CB_OPEN
+    assert cb.allow(121.0)
+    cb.on_success()
+    assert cb.state(121.0) == CB_CLOSED and cb.allow(121.0) and cb.allow(121.0)
+
+
+def test_circuit_breaker_stuck_probe_expires():
+    cb = CircuitBreaker(threshold=1, recovery=10.0)
+    cb.on_failure(100.0)
+    assert cb.allow(110.0)
+    assert not cb.allow(119.0)
+    assert cb.allow(120.0)  # 응답 없는 probe는 recovery 후 교체
+
+
+def test_circuit_breaker_release_frees_probe():
+    cb = CircuitBreaker(threshold=1, recovery=10.0)
+    cb.on_failure(100.0)
+    assert cb.allow(110.0)
+    cb.release()  # 429: 판정 없이 probe 반납
+    assert cb.state(111.0) == CB_HALF_OPEN and cb.allow(111.0)
+
+
+def test_circuit_breaker_disabled():
+    cb = CircuitBreaker(threshold=0, recovery=10.0)
+    cb.on_failure(100.0)
+    assert cb.allow(100.0)
@@ -0,0 +1,119 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from kis import backfill
+from kis.store import Store
+from kis.types import Candle
+
+
+def _bars(*dates: int) -> list[Candle]:
+    return [Candle(d, 1.0, 2.0, 0.5, d % 100 + 0.25, d % 1000) for d in dates]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return Store(tmp_path / "bars")
+
+
+def test_round_trip_sorted_by_date(store):
+    store.write("005930", _bars(20240105, 20240103, 20240104))
+
+    cols = store.read("005930")
+
+    assert list(cols.date) == [20240103, 20240104, 20240105]
+    assert list(cols.close) == [3.25, 4.25, 5.25]
+    assert cols.candles()[0] == Candle(20240103, 1.0, 2.0, 0.5, 3.25, 103)
+    assert store.index["005930"] == (20240103, 20240105, 3)
+
+
+def test_write_merges_and_overwrites_same_date(store):
+    store.write("005930", _bars(20240103, 20240104))
+    store.write("005930", [Candle(20240104, 9.0, 9.0, 9.0, 9.0, 9), *_bars(20240102)])
+
+    cols = store.read("005930")
+
+    assert list(cols.date) == [20240102, 20240103, 20240104]
+    assert cols.close[2] == 9.0 and len(cols) == 3
+
+
+def test_read_range_is_zero_copy_slice(store):
+    store.write("NAS:AAPL", _bars(*range(20240101, 20240131)))
+
+    cols = store.read("NAS:AAPL", 20240110, 20240112)
+
+    assert list(cols.date) == [20240110, 20240111, 20240112]
+    assert isinstance(cols.close, memoryview) and cols.close.format == "d"
+    assert cols.close.obj is cols.date.obj  # 같은 mmap을 가리킴
+    assert len(store.read("NAS:AAPL", 20240201)) == 0
+
+
+def test_unknown_symbol_is_empty(store):
+    assert len(store.read("000660")) == 0 and store.read("000660").candles() == []
+
+
+def test_index_loaded_from_headers(store, tmp_path):
+    store.write("005930", _bars(20240102, 20240103))
+    store.write("NAS:AAPL", _bars(20240105))
+
+    reopened = Store(tmp_path / "bars")
+
+    assert reopened.index == {
+        "005930": (20240102, 20240103, 2), "NAS:AAPL": (20240105, 20240105, 1),
+    }
+    assert list(reopened.read("NAS:AAPL").date) == [20240105]
+
+
+def test_views_survive_rewrite(store):
+    store.write("005930", _bars(20240102))
+    old = store.read("005930")
+
+    store.write("005930", _bars(20240103))
+
+    assert list(old.date) == [20240102]
+    assert list(store.read("005930").date) == [20240102, 20240103]
+
+
+def test_offsets_follow_mapped_file_not_stale_index(store, tmp_path):
+    store.write("005930", _bars(20240102))
+    other = Store(tmp_path / "bars")  # 같은 root를 연 두 번째 Store (index: 1개)
+
+    store.write("005930", _bars(20240103))
+    cols = other.read("005930")
+
+    assert list(cols.date) == [20240102, 20240103]
+    assert list(cols.open) == [1.0, 1.0] and list(cols.close) == [2.25, 3.25]
+
+
+def test_concurrent_read_during_writes(store):
+    store.write("005930", _bars(20240101))
+    bad, stop = [], threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            cols = store.read("005930")
+            if any(o != 1.0 for o in cols.open):
+                bad.append(list(cols.open))
+
+    t = threading.Thread(target=reader)
+    t.start()
+    for d in range(20240102, 20240131):
+        store.write("005930", _bars(d))
+    stop.set()
+    t.join()
+
+    assert bad == []
+
+
+def test_works_as_backfill_sink(kis, httpx_mock, store):
+    httpx_mock.add_response(json={"rt_cd": "0", "output2": [
+        {"stck_bsop_date": "20240103", "stck_clpr": "71000", "acml_vol": "10"},
+        {"stck_bsop_date": "20240102", "stck_clpr": "70000", "acml_vol": "20"},
+    ]})
+    httpx_mock.add_response(json={"rt_cd": "0", "output2": []})
+
+    with patch("kis.client.get_token", return_value="test_token"):
+        backfill.backfill(kis, ["005930"], "20240101", store.write, end="20240105")
+
+    assert list(store.read("005930").close) == [70000.0, 71000.0]
@@ -0,0 +1,104 @@
+"""transport.py 테스트"""
+
+import asyncio
+
+from kis import transport
+from kis.async_client import AsyncKIS
+from kis.client import KIS
+from kis.transport import PoolConfig
+
+ISOLATED = PoolConfig(timeout=9.0)  # 다른 테스트가 남긴 인스턴스와 풀 분리
+
+
+def test_instances_share_client():
+    a = KIS("key1", "secret", "12345678-01", pool=ISOLATED)
+    b = KIS("key2", "secret", "87654321-01", pool=ISOLATED)
+    assert a._client is b._client
+    a.close()
+    assert not b._client.is_closed  # 다른 인스턴스가 사용 중
+    b.close()
+    assert b._client.is_closed
+
+
+def test_close_is_idempotent():
+    a = KIS("key", "secret", "12345678-01")
+    b = KIS("key", "secret", "12345678-01")
+    a.close()
+    a.close()
+    assert not b._client.is_closed
+    b.close()
+
+
+def test_switch_reuses_env_pool():
+    paper = KIS("key", "secret", "12345678-01")
+    prod = KIS("key", "secret", "12345678-01", env="prod")
+    switched = paper.switch("prod")
+    assert switched._client is prod._client
+    assert switched.pool == paper.pool
+    for k in (paper, prod, switched):
+        k.close()
+
+
+def test_config_and_env_are_separate_pools():
+    a = KIS("key", "secret", "12345678-01")
+    b = KIS("key", "secret", "12345678-01", pool=PoolConfig(max_connections=5))
+    c = KIS("key", "secret", "12345678-01", env="prod")
+    assert a._client is not b._client and a._client is not c._client
+    assert str(c._client.base_url).startswith("https://openapi.koreainvestment.com")
+    for k in (a, b, c):
+        k.close()
+
+
+def test_closed_pool_is_rebuilt():
+    a = KIS("key", "secret", "12345678-01", pool=ISOLATED)
+    a.close()
+    b = KIS("key", "secret", "12345678-01", pool=ISOLATED)
+    assert not b._client.is_closed
+    b.close()
+
+
+def test_find_returns_live_client():
+    kis = KIS("key", "secret", "12345678-01", pool=PoolConfig(timeout=5.0))
+    assert not transport.find("paper").is_closed
+    assert transport.find("paper", is_async=True) is not kis._client
+    kis.close()
+
+
+async def test_async_instances_share_client():
+    a = AsyncKIS("key1", "secret", "12345678-01", pool=ISOLATED)
+    b = AsyncKIS("key2", "secret", "12345678-01", pool=ISOLATED)
+    assert a._client is b._client
+    await a.close()
+    assert not b._client.is_closed
+    await b.close()
+    assert b._client.is_closed
+
+
+def test_async_pool_is_per_event_loop():
+    async def make():
+        kis = AsyncKIS("key", "secret", "12345678-01", pool=ISOLATED)
+        assert transport.find("paper", is_async=True) is kis._client
+        return kis
+
+    first = asyncio.run(make())  # 닫지 않고 루프 종료
+    second = asyncio.run(make())
+    assert second._client is not first._client
+    assert transport.find("paper", is_async=True) is None  # 실행 중인 루프 없음
+
+
+def test_async_client_created_outside_loop_is_private():
+    a = AsyncKIS("key", "secret", "12345678-01", pool=ISOLATED)
+    b = AsyncKIS("key", "secret", "12345678-01", pool=ISOLATED)
+    assert a._client is not b._client
+    asyncio.run(a.close())
+    assert a._client.is_closed and not b._client.is_closed
+    asyncio.run(b.close())
+
+
+async def test_auth_async_client_is_per_loop():
+    from kis import auth
+
+    client = await auth._get_async_client()
+    assert await auth._get_async_client() is client
+    other = await asyncio.to_thread(lambda: asyncio.run(auth._get_async_client()))
+    assert other is not client
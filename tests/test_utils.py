@@ -1,6 +1,19 @@
 """utils.py 테스트"""
 
-from kis.utils import calc_cost, order_status, round_price, tick_size
+import asyncio
+
+import pytest
+
+from kis.utils import (
+    calc_cost,
+    fan_out,
+    ladder,
+    order_status,
+    round_price,
+    round_prices,
+    then,
+    tick_size,
+)
 
 
 class TestTickSize:
@@ -57,6 +70,35 @@ class TestRoundPrice:
         assert round_price(70050) == 70000
 
 
+class TestRoundPrices:
+    @pytest.mark.parametrize("direction", ["down", "up", "nearest"])
+    def test_matches_scalar(self, direction):
+        prices = [1, 1999, 2001, 4998, 19996, 20020, 70050, 199951, 499800, 1234567]
+        assert round_prices(prices, direction) == [round_price(p, direction) for p in prices]
+
+    def test_accepts_any_iterable(self):
+        assert round_prices(range(70000, 70300, 100), "up") == [70000, 70100, 70200]
+
+
+class TestLadder:
+    def test_up_crosses_band(self):
+        assert list(ladder(1997, 5)) == [1998, 1999, 2000, 2005, 2010]
+
+    def test_down_crosses_band(self):
+        assert list(ladder(2010, 5, "down")) == [2005, 2000, 1999, 1998, 1997]
+
+    def test_off_tick_reference_starts_at_nearest_valid(self):
+        assert list(ladder(70050, 2)) == [70100, 70200]
+        assert list(ladder(70050, 2, "down")) == [70000, 69900]
+
+    def test_every_price_is_valid(self):
+        for p in ladder(150, 500):
+            assert p % tick_size(p) == 0
+
+    def test_down_stops_at_one(self):
+        assert list(ladder(3, 10, "down")) == [2, 1]
+
+
 class TestCalcCost:
     def test_fee(self):
         # 0.015% = 0.00015
@@ -83,3 +125,46 @@ class TestOrderStatus:
     def test_pending(self):
         assert order_status({"ord_qty": "100", "tot_ccld_qty": "0"}) == "pending"
         assert order_status({}) == "pending"
+
+
+class TestThen:
+    def test_sync(self):
+        assert then("7", int) == 7
+
+    async def test_awaitable(self):
+        async def value():
+            return "7"
+
+        assert await then(value(), int) == 7
+
+
+class TestFanOut:
+    class Sync:
+        def get(self): ...
+
+    class Async:
+        async def get(self): ...
+
+    def test_sync(self):
+        def fn(k):
+            if k == 0:
+                raise ValueError(k)
+            return k * 2
+
+        results, errors = fan_out(self.Sync(), fn, [1, 0, 2, 1], concurrency=2)
+        assert results == {1: 2, 2: 4} and isinstance(errors[0], ValueError)
+
+    async def test_async_bounded(self):
+        running, peak = 0, 0
+
+        async def fn(k):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0)
+            running -= 1
+            return k
+
+        results, errors = await fan_out(self.Async(), fn, range(10), concurrency=3)
+        assert results == {k: k for k in range(10)} and not errors
+        assert peak == 3
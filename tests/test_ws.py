@@ -1,7 +1,10 @@
+import asyncio
 import base64
 import json
+import time
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
 
 from kis.ws import WSClient
@@ -32,6 +35,30 @@ class TestWSUrl:
         assert "21000" in ws._ws_url
 
 
+class TestConnect:
+    async def test_connect_uses_async_cached_approval_key(self, ws_client):
+        ws = AsyncMock()
+        with patch("kis.ws.get_ws_key_async", new_callable=AsyncMock, return_value="ak") as key, \
+                patch("kis.ws.websockets.connect", new_callable=AsyncMock, return_value=ws):
+            await ws_client.connect()
+
+        key.assert_awaited_once_with("test_key", "test_secret", "paper")
+        assert json.loads(ws.send.call_args[0][0])["header"]["approval_key"] == "ak"
+        assert ws_client._running
+
+    async def test_connect_with_async_kis(self):
+        from kis.async_client import AsyncKIS
+
+        kis = AsyncKIS("key", "secret", "12345678-01")
+        ws_client = WSClient(kis)
+        connect = AsyncMock(return_value=AsyncMock())
+        with patch("kis.ws.get_ws_key_async", new_callable=AsyncMock, return_value="ak"), \
+                patch("kis.ws.websockets.connect", connect):
+            await ws_client.connect()
+        assert ws_client._ws is not None
+        await kis.close()
+
+
 class TestSubscription:
     async def test_subscribe_adds_symbol_to_subscriptions(self, ws_client):
         ws_client._ws = AsyncMock()
@@ -141,6 +168,20 @@ class TestMessageHandling:
         callback.assert_called_once()
 
 
+    async def test_approval_rejection_raises_auth_error(self, ws_client):
+        from kis.errors import AuthError
+
+        raw = json.dumps({"header": {"tr_id": "H0STCNT0"}, "body": {
+            "rt_cd": "1", "msg_cd": "OPSP0011", "msg1": "invalid approval : NOT FOUND"}})
+        with pytest.raises(AuthError):
+            await ws_client._handle_message(raw)
+
+    async def test_subscribe_error_is_not_approval_failure(self, ws_client):
+        raw = json.dumps({"header": {"tr_id": "H0STCNT0"}, "body": {
+            "rt_cd": "1", "msg_cd": "OPSP0002", "msg1": "ALREADY IN SUBSCRIBE"}})
+        await ws_client._handle_message(raw)
+
+
 class TestAESDecryption:
     def test_decrypt_valid_data(self, ws_client):
         from Crypto.Cipher import AES
@@ -185,6 +226,39 @@ class TestReconnection:
             await ws_client._reconnect()
             mock_sleep.assert_called_with(4.0)
 
+    async def test_run_reissues_rejected_approval_key(self, ws_client):
+        from kis import auth
+
+        auth._ws_keys[("paper", "test_key")] = ("stale", time.time() + 3600)
+        rejected = json.dumps({"header": {}, "body": {
+            "rt_cd": "1", "msg_cd": "OPSP0011", "msg1": "invalid approval : NOT FOUND"}})
+        first, second = AsyncMock(), AsyncMock()
+
+        async def frames():
+            yield rejected
+
+        first.__aiter__.side_effect = [frames()]  # 한 번만 순회
+        second.__aiter__.return_value = []
+
+        async def restore(self):  # 두 번째 연결 후 종료
+            self._running = self._ws is not second
+
+        issued = httpx.Response(200, json={"approval_key": "new"},
+                                request=httpx.Request("POST", "https://kis/oauth2/Approval"))
+        with patch("kis.ws.websockets.connect", new_callable=AsyncMock,
+                   side_effect=[first, second]), \
+                patch("asyncio.sleep", new_callable=AsyncMock), \
+                patch("kis.auth._get_async_client", new_callable=AsyncMock,
+                      return_value=MagicMock(post=AsyncMock(return_value=issued))), \
+                patch("kis.ws.WSClient._restore_subscriptions", restore):
+            ws_client._running = True
+            await asyncio.wait_for(ws_client.run(), 1)
+
+        keys = [json.loads(ws.send.call_args_list[0][0][0])["header"]["approval_key"]
+                for ws in (first, second)]
+        assert keys == ["stale", "new"]
+        auth._ws_keys.clear()
+
     async def test_reconnect_raises_after_max_retries(self, ws_client):
         ws_client._running = True
         ws_client._retry_count = 5